@@ -0,0 +1,333 @@
+"""
+MicroManager - Transition Analytics
+Answers balancing questions from simulated games, turn by turn.
+
+transitions() plays headless games and yields one Transition per turn
+(state before, transport, event ids, actions, state after, loss reason).
+TransitionStats consumes that stream and keeps only aggregates:
+array-backed counters and histograms per turn, plus streaming quantile
+sketches for per-game totals, so memory does not grow with the number
+of games. For example:
+
+    stats = TransitionStats()
+    stats.consume(transitions(100000))
+    stats.deadliest_event(9)          # which event kills most cells on turn 9
+    stats.distribution('atp', 5)      # ATP after maintenance on turn 5
+
+Example:
+    python analytics.py -n 100000 --policy random
+    python analytics.py -n 10000 --json report.json
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from array import array
+from collections import namedtuple
+
+import micromanager as mm
+
+FIELDS = ('atp', 'glucose', 'amino_acids', 'lipids', 'health', 'membrane', 'waste')
+
+Transition = namedtuple('Transition', 'game turn before mode events actions after lost reason')
+Transition.__doc__ = """
+One turn of one game. before and after are PackedCells (after is the
+state the turn ended in: after maintenance, or after the events if the
+cell died there). events is a tuple of event ids, actions a tuple of
+(action, subchoice) that succeeded; reason is '' unless lost.
+"""
+
+# ============================================================================
+# TRANSITION STREAM
+# ============================================================================
+
+class _TurnLog:
+    """Recorder (see mm.ReplayRecorder) that keeps only the current turn"""
+
+    def turn_start(self, cell):
+        self.mode = None
+        self.event_ids = ()
+        self.actions = []
+
+    def transport(self, mode):
+        self.mode = mode
+
+    def events(self, events):
+        self.event_ids = tuple(event.id for event in events)
+
+    def action(self, action, subchoice):
+        self.actions.append((action, subchoice))
+
+    def finish(self, cell, won):
+        pass
+
+
+def transitions(games, policy='random', seed=0):
+    """
+    Yield a Transition for every turn of `games` headless games. Game g
+    gets the events of EventStream(seed, g), as in mm.simulate()
+    """
+    policy = mm.POLICIES[policy]()
+    rng = random.Random(seed)
+    log = _TurnLog()
+    for game in range(games):
+        cell = mm.CellState()
+        cell.recorder = log
+        events = mm.EventStream(seed, game)
+        while not cell.check_win_condition():
+            before = mm.PackedCell.from_cell(cell)
+            turn = cell.turn
+            lost, reason = mm.play_turn(cell, policy, rng, events)
+            yield Transition(game, turn, before, log.mode, log.event_ids, tuple(log.actions),
+                             mm.PackedCell.from_cell(cell), lost, reason)
+            if lost:
+                break
+
+# ============================================================================
+# QUANTILE SKETCH
+# ============================================================================
+
+class QuantileSketch:
+    """
+    Streaming quantiles in O(k log(n/k)) memory (a KLL-style sketch).
+    Values are kept in levels; when a level fills up it is sorted and
+    every other value moves up a level, where each value stands for
+    twice as many. Sketches with the same k can be merged.
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.count = 0
+        self.levels = [[]]
+        self._rng = random.Random(seed)
+
+    def add(self, value):
+        self.levels[0].append(value)
+        self.count += 1
+        if len(self.levels[0]) >= self.k:
+            self._compress()
+
+    def merge(self, other):
+        for height, level in enumerate(other.levels):
+            if height == len(self.levels):
+                self.levels.append([])
+            self.levels[height].extend(level)
+        self.count += other.count
+        self._compress()
+
+    def _compress(self):
+        for height, level in enumerate(self.levels):
+            if len(level) < self.k:
+                continue
+            level.sort()
+            kept = level[self._rng.random() < 0.5::2]
+            level.clear()
+            if height + 1 == len(self.levels):
+                self.levels.append([])
+            self.levels[height + 1].extend(kept)
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1); None if nothing was added"""
+        weighted = sorted((value, 1 << height)
+                          for height, level in enumerate(self.levels) for value in level)
+        if not weighted:
+            return None
+        total = sum(weight for _, weight in weighted)
+        seen = 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= q * total:
+                return value
+        return weighted[-1][0]
+
+# ============================================================================
+# AGGREGATES
+# ============================================================================
+
+class TransitionStats:
+    """
+    Per-turn aggregates of a transition stream. Every counter is a flat
+    array('q') indexed by turn (and event id, action or value):
+
+      turns[turn]                    transitions seen on that turn
+      deaths[reason][turn]           losses, by loss reason
+      event_seen[turn, event]        turns on which the event happened
+      event_deaths[turn, event]      ... and the cell died that turn
+      actions[turn, action]          successful organelle actions
+      values[field][turn, value]     field after the turn, 0..max_value
+
+    The arrays are sized from the rules in play when the stats are built
+    (mm.RULES.turns and, unless given, mm.RULES.max_value).
+    """
+
+    def __init__(self, max_value=None):
+        if max_value is None:
+            max_value = mm.RULES.max_value
+        self.max_value = max_value
+        self.n_turns = mm.RULES.turns
+        rows = self.n_turns + 1
+        self.n_events = len(mm.EVENTS)
+        self.games = 0
+        self.wins = 0
+        self.turns = array('q', bytes(8 * rows))
+        self.deaths = {}
+        self.event_seen = array('q', bytes(8 * rows * self.n_events))
+        self.event_deaths = array('q', bytes(8 * rows * self.n_events))
+        self.actions = array('q', bytes(8 * rows * (max(mm.ORGANELLE_ACTIONS) + 1)))
+        self.values = {field: array('q', bytes(8 * rows * (max_value + 1)))
+                       for field in FIELDS}
+        # Per-game totals, as quantile sketches
+        self.per_game = {key: QuantileSketch() for key in
+                         ('turns_survived', 'actions', 'active_transports', 'events')}
+        self._game = dict.fromkeys(self.per_game, 0)
+
+    def add(self, t):
+        """Count one Transition"""
+        turn = t.turn
+        self.turns[turn] += 1
+        for event in t.events:
+            self.event_seen[turn * self.n_events + event] += 1
+            if t.lost:
+                self.event_deaths[turn * self.n_events + event] += 1
+        for action, _ in t.actions:
+            self.actions[turn * (max(mm.ORGANELLE_ACTIONS) + 1) + action] += 1
+        width = self.max_value + 1
+        for field in FIELDS:
+            self.values[field][turn * width + min(getattr(t.after, field), self.max_value)] += 1
+        if t.lost:
+            if t.reason not in self.deaths:
+                self.deaths[t.reason] = array('q', bytes(8 * (self.n_turns + 1)))
+            self.deaths[t.reason][turn] += 1
+
+        game = self._game
+        game['turns_survived'] = turn - t.lost
+        game['actions'] += len(t.actions)
+        game['active_transports'] += t.mode == mm.ACTIVE_TRANSPORT
+        game['events'] += len(t.events)
+
+    def end_game(self, won):
+        """Close the game the last transitions belonged to"""
+        self.games += 1
+        self.wins += won
+        for key, value in self._game.items():
+            self.per_game[key].add(value)
+            self._game[key] = 0
+
+    def consume(self, stream):
+        """Aggregate a whole transition stream (games in order); returns self"""
+        last = None
+        for t in stream:
+            if last is not None and t.game != last.game:
+                self.end_game(not last.lost)
+            self.add(t)
+            last = t
+        if last is not None:
+            self.end_game(not last.lost)
+        return self
+
+    # Questions ---------------------------------------------------------------
+
+    def deaths_on(self, turn):
+        """{reason: losses} on a turn"""
+        return {reason: counts[turn] for reason, counts in self.deaths.items() if counts[turn]}
+
+    def deadliest_event(self, turn):
+        """(event name, deaths, death rate when it happens) for the event present in most losses"""
+        row = self.event_deaths[turn * self.n_events:(turn + 1) * self.n_events]
+        event = max(range(self.n_events), key=row.__getitem__)
+        if not row[event]:
+            return None
+        seen = self.event_seen[turn * self.n_events + event]
+        return mm.EVENTS[event].name, row[event], row[event] / seen
+
+    def distribution(self, field, turn):
+        """Share of cells ending the turn at each value of field"""
+        width = self.max_value + 1
+        counts = self.values[field][turn * width:(turn + 1) * width]
+        total = sum(counts) or 1
+        return [count / total for count in counts]
+
+    def quantile(self, field, turn, q):
+        """q-quantile of field after the turn, exact from the histogram"""
+        seen = 0
+        distribution = self.distribution(field, turn)
+        for value, share in enumerate(distribution):
+            seen += share
+            if seen >= q:
+                return value
+        return self.max_value
+
+    def report(self):
+        """Compact summary as a JSON-friendly dict"""
+        turns = {}
+        for turn in range(1, self.n_turns + 1):
+            if not self.turns[turn]:
+                continue
+            deadliest = self.deadliest_event(turn)
+            turns[turn] = {
+                'cells': self.turns[turn],
+                'deaths': self.deaths_on(turn),
+                'deadliest_event': deadliest and {'name': deadliest[0], 'deaths': deadliest[1],
+                                                  'death_rate': round(deadliest[2], 4)},
+                'after': {field: {'mean': round(sum(v * p for v, p in
+                                                    enumerate(self.distribution(field, turn))), 3),
+                                  'p10': self.quantile(field, turn, 0.1),
+                                  'median': self.quantile(field, turn, 0.5),
+                                  'p90': self.quantile(field, turn, 0.9)}
+                          for field in FIELDS},
+            }
+        return {
+            'games': self.games,
+            'win_rate': self.wins / self.games if self.games else 0.0,
+            'per_game': {key: {'median': sketch.quantile(0.5), 'p90': sketch.quantile(0.9)}
+                         for key, sketch in self.per_game.items() if sketch.count},
+            'turns': turns,
+        }
+
+
+def analyze(games, policy='random', seed=0):
+    """Simulate and aggregate `games` games. Returns a TransitionStats"""
+    return TransitionStats().consume(transitions(games, policy, seed))
+
+
+def print_report(report):
+    print(f"{report['games']:,} games, win rate {report['win_rate']:.2%}")
+    for key, q in report['per_game'].items():
+        print(f"  {key:<20} median {q['median']:>4}  p90 {q['p90']:>4}")
+    print(f"\n{'turn':>4} {'cells':>9} {'died':>7}  {'deadliest event (death rate)':<32}"
+          f"{'atp':>5} {'health':>7} {'membrane':>9} {'waste':>6}  (mean after the turn)")
+    for turn, row in report['turns'].items():
+        died = sum(row['deaths'].values())
+        deadliest = row['deadliest_event']
+        name = f"{deadliest['name']} ({deadliest['death_rate']:.0%})" if deadliest else "-"
+        after = row['after']
+        print(f"{turn:>4} {row['cells']:>9,} {died:>7,}  {name:<32}"
+              f"{after['atp']['mean']:>5.2f} {after['health']['mean']:>7.2f} "
+              f"{after['membrane']['mean']:>9.2f} {after['waste']['mean']:>6.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-turn analytics from simulated MicroManager games")
+    parser.add_argument('-n', '--games', type=int, default=10000)
+    parser.add_argument('--policy', default='random', choices=sorted(mm.POLICIES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='FILE', help="write the report as JSON ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    report = analyze(args.games, args.policy, args.seed).report()
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    print_report(report)
+    print(f"\nAnalyzed in {time.perf_counter() - start:.2f}s")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
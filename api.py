@@ -0,0 +1,540 @@
+"""
+MicroManager - HTTP API
+The game rules as a stateless JSON API, for web clients and bots.
+
+The server keeps nothing between requests: a game's whole state (the
+packed cell, the turn phase, the event seed and the end-game stats)
+travels with the client as a token, signed with HMAC-SHA256 so it
+cannot be edited. The seed is encrypted, so a client cannot read the
+coming events out of its token. Any process started with the same --secret and rules
+accepts any token, so the API scales out behind a load balancer, and
+--workers runs several processes sharing one port on this machine.
+
+Endpoints (HTTP/1.1 keep-alive, JSON request and response bodies):
+
+    GET  /rules   the RuleSet in play, its hash and the action names
+    POST /new     {"seed": 123} (optional) -> a new game
+    POST /step    {"token": ..., "action": "A", "subchoice": ...} -> the next state
+    POST /state   {"token": ...} -> the state a token holds
+
+Actions follow the in-game menu: "A" (active transport) or "B" (passive
+diffusion) at the start of a turn, then "1"-"6" for the organelles
+("2" needs a subchoice from mm.RIBOSOME_CHOICES) and "end" to skip the
+rest of the turn's actions. Every state comes back as
+
+    token, turn, phase ('transport', 'actions', 'won' or 'lost'),
+    actions_left, cell, pending (delayed cuts), stats, legal (actions)
+
+and /step adds what happened: changes ({field: [old, new]}), events
+(as apply_event describes them) and text, the screens the terminal game
+would show. Illegal actions get a 409 and change nothing. A game's
+events come from mm.EventStream(seed), so a game started with a seed
+matches the terminal game played with --seed.
+
+Example:
+    python api.py --port 8080 --secret "$API_SECRET" --workers 4
+    curl -s localhost:8080/new -d '{}'
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import hmac
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+from http import HTTPStatus
+
+import micromanager as mm
+
+API_IDLE_TIMEOUT = 60        # Seconds a keep-alive connection may sit idle
+API_HEAD_LIMIT = 8 * 1024    # Longest request line and headers, in bytes
+API_BODY_LIMIT = 16 * 1024   # Largest request body, in bytes
+API_WRITE_BUFFER = 64 * 1024 # Unsent bytes per connection before drain() waits
+
+# ============================================================================
+# TOKENS
+#    payload = version, phase, actions left, nonce, encrypted seed,
+#    pack_cell() bits and the STAT_FIELDS (varints, as in replay logs),
+#    then the first TOKEN_MAC_SIZE bytes of its HMAC, base64url without
+#    padding. The key mixes the secret with rules_hash(), so a token only
+#    loads on a server with the same rules and engine code. The seed is
+#    XORed with an HMAC of the game's random nonce, which only the server
+#    can compute. Tokens run to about 65 characters with the default rules.
+# ============================================================================
+
+TOKEN_VERSION = 2
+TOKEN_MAC_SIZE = 16
+
+# Turn phases
+TRANSPORT = 0    # Waiting for a transport mode
+ACTIONS = 1      # Waiting for organelle actions
+WON = 2
+LOST = 3
+PHASES = ('transport', 'actions', 'won', 'lost')
+
+
+class Game:
+    """
+    One game between requests: the cell, its turn phase and its event
+    seed. nonce (random unless given) keys the seed's encryption.
+    """
+
+    __slots__ = ('cell', 'seed', 'phase', 'actions_left', 'nonce')
+
+    def __init__(self, cell, seed, phase=TRANSPORT, actions_left=0, nonce=None):
+        self.cell = cell
+        self.seed = seed
+        self.phase = phase
+        self.actions_left = actions_left
+        self.nonce = int.from_bytes(os.urandom(8), 'little') if nonce is None else nonce
+
+
+class Tokens:
+    """Signs Games into tokens and checks tokens back into Games"""
+
+    def __init__(self, secret):
+        if isinstance(secret, str):
+            secret = secret.encode()
+        self.key = hmac.digest(secret, mm.rules_hash().encode(), 'sha256')
+
+    def _mac(self, payload):
+        return hmac.digest(self.key, payload, 'sha256')[:TOKEN_MAC_SIZE]
+
+    def _seed_mask(self, nonce):
+        """What a game's seed is XORed with in its tokens"""
+        digest = hmac.digest(self.key, b'seed' + nonce.to_bytes(8, 'little'), 'sha256')
+        return int.from_bytes(digest[:8], 'little')
+
+    def dump(self, game):
+        payload = bytearray((TOKEN_VERSION,))
+        for value in (game.phase, game.actions_left, game.nonce, game.seed ^ self._seed_mask(game.nonce),
+                      mm.pack_cell(game.cell), *game.cell.stats.values()):
+            mm._write_varint(payload, value)
+        return base64.urlsafe_b64encode(payload + self._mac(payload)).rstrip(b'=').decode()
+
+    def load(self, token):
+        """The Game in a token; ValueError if it is malformed or not signed with this key"""
+        try:
+            data = base64.b64decode(token + '=' * (-len(token) % 4), altchars=b'-_', validate=True)
+        except (binascii.Error, TypeError, ValueError):
+            raise ValueError("token is not valid base64url") from None
+        payload, mac = data[:-TOKEN_MAC_SIZE], data[-TOKEN_MAC_SIZE:]
+        if not payload or not hmac.compare_digest(mac, self._mac(payload)):
+            raise ValueError("token signature does not match (other secret, rules or server version?)")
+        if payload[0] != TOKEN_VERSION:
+            raise ValueError(f"unsupported token version {payload[0]}")
+
+        values = []
+        pos = 1
+        while pos < len(payload):
+            value, pos = mm._read_varint(payload, pos)
+            values.append(value)
+        if len(values) != 5 + len(mm.STAT_FIELDS):
+            raise ValueError("token has the wrong number of fields")
+        phase, actions_left, nonce, seed, bits, *stats = values
+        cell = mm.unpack_cell(bits)
+        cell.stats = dict(zip(mm.STAT_FIELDS, stats))
+        return Game(cell, seed ^ self._seed_mask(nonce), phase, actions_left, nonce)
+
+# ============================================================================
+# GAME STEPS
+#    The same turn as play_turn() and env.py, one request per decision:
+#    the transport mode runs the import and the events, each organelle
+#    action runs on its own, and "end" (or the turn's last action) runs
+#    maintenance.
+# ============================================================================
+
+END_TURN = 'end'
+_TRANSPORTS = (mm.ACTIVE_TRANSPORT, mm.PASSIVE_DIFFUSION)
+_PENDING_NAMES = tuple(f"{trigger}_{resource}_cut_{offset + 1}"
+                       for trigger, resource, offset in mm.DELAYED_SLOTS)
+
+
+class RequestError(Exception):
+    """A request the API turns down, answered with status and message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def legal_actions(game):
+    """Actions /step accepts in this state"""
+    if game.phase == TRANSPORT:
+        active = mm.PackedCell.from_cell(game.cell).transport_mask() & mm.ACTIVE_BIT
+        return list(_TRANSPORTS) if active else [mm.PASSIVE_DIFFUSION]
+    if game.phase == ACTIONS:
+        mask = mm.PackedCell.from_cell(game.cell).action_mask()
+        return [str(action) for action in mm.ORGANELLE_ACTIONS if mask >> (action - 1) & 1] + [END_TURN]
+    return []
+
+
+def describe(game, token):
+    """A game's state as the JSON-friendly dict every endpoint returns"""
+    cell = game.cell
+    return {
+        'token': token,
+        'turn': cell.turn,
+        'phase': PHASES[game.phase],
+        'actions_left': game.actions_left,
+        'cell': {name: getattr(cell, name) for name in mm.PACKED_FIELDS + mm.PACKED_FLAGS
+                 + ('atp_crisis_turns',)},
+        'pending': {name: cut for name, cut in zip(_PENDING_NAMES, cell.effects.pending()) if cut},
+        'stats': dict(cell.stats),
+        'legal': legal_actions(game),
+    }
+
+
+def _finish(game, won, reason=""):
+    """Text for the end of a game, which is now over"""
+    game.phase, game.actions_left = (WON, 0) if won else (LOST, 0)
+    text = "" if won else mm.banner(f"  {reason}")
+    return text + mm.render_summary(game.cell, won)
+
+
+def _end_turn(game):
+    """Maintenance, then the lose and win checks. Returns the text shown"""
+    cell = game.cell
+    text = mm.render_maintenance(mm.apply_maintenance(cell))
+    lost, reason = cell.check_lose_conditions()
+    if lost:
+        return text + _finish(game, False, reason)
+    cell.turn += 1
+    if cell.check_win_condition():
+        return text + _finish(game, True)
+    game.phase, game.actions_left = TRANSPORT, 0
+    return text
+
+
+def play(game, action, subchoice=None):
+    """
+    Apply one action to game in place. Returns (text, events); raises
+    RequestError for an action that is not legal now.
+    """
+    cell = game.cell
+    events = []
+    if game.phase == TRANSPORT:
+        if action not in _TRANSPORTS:
+            raise RequestError(409, "choose a transport mode first: 'A' or 'B'")
+        if action not in legal_actions(game):
+            raise RequestError(409, f"active transport needs {mm.RULES.active_cost} ATP: use 'B'")
+        text = mm.render_import(action, *mm.apply_import(cell, action))
+        events = mm.apply_events(cell, mm.EventStream(game.seed))
+        text += mm.render_events(events)
+        lost, reason = cell.check_lose_conditions()
+        if lost:
+            return text + _finish(game, False, reason), events
+        game.phase, game.actions_left = ACTIONS, mm.RULES.actions_per_turn
+        if not game.actions_left:
+            text += _end_turn(game)
+        return text, events
+
+    if game.phase != ACTIONS:
+        raise RequestError(409, "this game is over")
+    if action == END_TURN:
+        return "Skipping remaining actions...\n" + _end_turn(game), events
+    organelle = mm._MENU_ACTIONS.get(action)
+    if organelle is None:
+        raise RequestError(409, f"unknown action {action!r}: use {', '.join(legal_actions(game))}")
+    if organelle == mm.RIBOSOMES and subchoice not in mm.RIBOSOME_CHOICES:
+        raise RequestError(400, f"ribosomes need a subchoice: one of {', '.join(mm.RIBOSOME_CHOICES)}")
+
+    before = cell.mark()
+    success, message = mm.apply_action(cell, organelle, subchoice)
+    if not success:
+        raise RequestError(409, message.strip())
+    text = message + "\n" + mm.render_action_result(cell, cell.changes(before))
+    game.actions_left -= 1
+    if not game.actions_left:
+        text += _end_turn(game)
+    return text, events
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+class GameAPI:
+    """The endpoints, as plain calls from a parsed JSON body to a response dict"""
+
+    def __init__(self, secret):
+        self.tokens = Tokens(secret)
+        self.rules = {
+            'rules': mm.RULES._asdict(),
+            'hash': mm.rules_hash(),
+            'transport': list(_TRANSPORTS),
+            'organelles': {str(action): name for action, name in mm.ACTION_NAMES.items()},
+            'subchoices': list(mm.RIBOSOME_CHOICES),
+            'end_turn': END_TURN,
+        }
+        self.routes = {
+            ('GET', '/rules'): self.get_rules,
+            ('POST', '/new'): self.new_game,
+            ('POST', '/step'): self.step,
+            ('POST', '/state'): self.state,
+        }
+
+    def _game(self, body):
+        token = body.get('token')
+        if not isinstance(token, str):
+            raise RequestError(400, "missing token")
+        try:
+            return self.tokens.load(token)
+        except ValueError as e:
+            raise RequestError(400, str(e)) from None
+
+    def get_rules(self, body):
+        return self.rules
+
+    def new_game(self, body):
+        seed = body.get('seed')
+        if seed is None:
+            seed = mm.new_seed()
+        elif type(seed) is not int or not 0 <= seed < 1 << 64:
+            raise RequestError(400, "seed must be an integer from 0 to 2**64 - 1")
+        game = Game(mm.CellState(), seed)
+        return describe(game, self.tokens.dump(game))
+
+    def state(self, body):
+        game = self._game(body)
+        return describe(game, body['token'])
+
+    def step(self, body):
+        game = self._game(body)
+        action = body.get('action')
+        if not isinstance(action, (str, int)) or isinstance(action, bool):
+            raise RequestError(400, "missing action")
+        action = str(action).strip()
+        action = END_TURN if action.lower() == END_TURN else action.upper()
+        cell = game.cell
+        before = cell.mark()
+        text, events = play(game, action, body.get('subchoice'))
+        response = describe(game, self.tokens.dump(game))
+        response['changes'] = {name: list(change) for name, change in cell.changes(before).items()}
+        response['events'] = events
+        response['text'] = text
+        return response
+
+    def handle(self, method, path, body):
+        """(status, response dict) for one request; body is the raw request body"""
+        path = path.split('?', 1)[0]
+        route = self.routes.get((method, path))
+        try:
+            if route is None:
+                if any(known == path for _, known in self.routes):
+                    raise RequestError(405, f"{method} not allowed on {path}")
+                raise RequestError(404, f"no endpoint {path}")
+            try:
+                request = json.loads(body) if body else {}
+            except ValueError:
+                raise RequestError(400, "body is not valid JSON") from None
+            if not isinstance(request, dict):
+                raise RequestError(400, "body must be a JSON object")
+            return 200, route(request)
+        except RequestError as e:
+            return e.status, {'error': str(e)}
+
+# ============================================================================
+# HTTP
+#    A small HTTP/1.1 server: one asyncio.Protocol per connection, which
+#    answers every complete request in its buffer as soon as data arrives
+#    (keep-alive by default, pipelined requests answered in order). The
+#    endpoints never wait on anything, so no coroutine or task is needed
+#    per request. Only Content-Length bodies are read. A connection that
+#    stops reading stops being read from until its output drains, and
+#    one that sends nothing for idle_timeout seconds is closed.
+# ============================================================================
+
+_CLOSE = "Connection: close\r\n"
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"{'' if keep_alive else _CLOSE}\r\n")
+    return head.encode() + body
+
+
+def parse_head(head):
+    """(method, path, headers) of a request head, without its blank line"""
+    request, *lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, path, version = request.split()
+    except ValueError:
+        raise RequestError(400, "malformed request line") from None
+    headers = {'version': version}
+    for line in lines:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if 'transfer-encoding' in headers:
+        raise RequestError(501, "only Content-Length bodies are supported")
+    return method, path, headers
+
+
+def _body_length(headers):
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise RequestError(400, "bad Content-Length") from None
+    if not 0 <= length <= API_BODY_LIMIT:
+        raise RequestError(413, f"body over {API_BODY_LIMIT} bytes")
+    return length
+
+
+def _keep_alive(headers):
+    connection = headers.get('connection', '').lower()
+    if headers['version'] == 'HTTP/1.0':
+        return connection == 'keep-alive'
+    return connection != 'close'
+
+
+class _Connection(asyncio.Protocol):
+    """One client connection to a GameAPI"""
+
+    def __init__(self, api, idle_timeout):
+        self.api = api
+        self.idle_timeout = idle_timeout
+        self.buffer = bytearray()
+        self.request = None      # (method, path, headers, body length) while the body arrives
+        self.transport = None
+        self.last_data = 0.0
+        self.idle_check = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.set_write_buffer_limits(high=API_WRITE_BUFFER)
+        loop = asyncio.get_running_loop()
+        self.last_data = loop.time()
+        self.idle_check = loop.call_later(self.idle_timeout, self._check_idle)
+
+    def connection_lost(self, exc):
+        self.idle_check.cancel()
+
+    def _check_idle(self):
+        """Close the connection if it went quiet, else look again when it could have"""
+        loop = asyncio.get_running_loop()
+        quiet = loop.time() - self.last_data
+        if quiet >= self.idle_timeout:
+            self.transport.close()
+        else:
+            self.idle_check = loop.call_later(self.idle_timeout - quiet, self._check_idle)
+
+    def pause_writing(self):
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        self.transport.resume_reading()
+
+    def data_received(self, data):
+        self.last_data = asyncio.get_running_loop().time()
+        buffer = self.buffer
+        buffer += data
+        start = 0
+        try:
+            while True:
+                if self.request is None:
+                    end = buffer.find(b'\r\n\r\n', start)
+                    if end < 0:
+                        if len(buffer) - start > API_HEAD_LIMIT:
+                            raise RequestError(431, f"request head over {API_HEAD_LIMIT} bytes")
+                        break
+                    method, path, headers = parse_head(bytes(buffer[start:end]))
+                    self.request = method, path, headers, _body_length(headers)
+                    start = end + 4
+                method, path, headers, length = self.request
+                if len(buffer) - start < length:
+                    break
+                body = bytes(buffer[start:start + length])
+                start += length
+                self.request = None
+                status, payload = self.api.handle(method, path, body)
+                keep_alive = _keep_alive(headers)
+                self.transport.write(_response(status, payload, keep_alive))
+                if not keep_alive:
+                    self.transport.close()
+                    return
+        except RequestError as e:
+            self.transport.write(_response(e.status, {'error': str(e)}, False))
+            self.transport.close()
+            return
+        del buffer[:start]
+
+
+async def serve(api, host='127.0.0.1', port=8080, idle_timeout=API_IDLE_TIMEOUT,
+                reuse_port=False, ready=None):
+    """
+    Serve a GameAPI until cancelled. reuse_port lets several processes
+    listen on the same port; ready, if given, is an asyncio.Event set
+    once the server listens.
+    """
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(lambda: _Connection(api, idle_timeout), host, port,
+                                      backlog=1024, reuse_port=reuse_port)
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def _worker(secret, rules, host, port, idle_timeout, reuse_port):
+    mm.use_rules(rules)
+    try:
+        asyncio.run(serve(GameAPI(secret), host, port, idle_timeout, reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the MicroManager rules as a stateless JSON API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--secret', default=os.environ.get('MICROMANAGER_API_SECRET'),
+                        help="token signing secret, shared by every server behind one address "
+                             "(default $MICROMANAGER_API_SECRET, else random per start)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="server processes sharing the port (default 1)")
+    parser.add_argument('--idle-timeout', type=float, default=API_IDLE_TIMEOUT,
+                        help=f"seconds before an idle connection is closed (default {API_IDLE_TIMEOUT})")
+    mm.add_rule_arguments(parser)
+    args = parser.parse_args(argv)
+    mm.rules_from_args(parser, args)
+    if args.workers > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        parser.error("--workers needs SO_REUSEPORT, which this platform lacks")
+
+    secret = args.secret
+    if not secret:
+        secret = os.urandom(32)
+        print("No --secret given: tokens only work until this server stops")
+    print(f"Serving the MicroManager API on http://{args.host}:{args.port} "
+          f"({args.workers} worker{'s' if args.workers != 1 else ''}, rules {mm.rules_hash()})")
+
+    if args.workers == 1:
+        _worker(secret, mm.RULES, args.host, args.port, args.idle_timeout, False)
+        return
+    processes = [multiprocessing.Process(target=_worker, daemon=True,
+                                         args=(secret, mm.RULES, args.host, args.port,
+                                               args.idle_timeout, True))
+                 for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,592 @@
+"""
+MicroManager - Batch Simulator
+Runs many MicroManager games at once for balancing experiments.
+
+Instead of one CellState object per cell, a CellBatch keeps N cells as
+parallel NumPy integer arrays (one array per resource) and applies each
+game phase to the whole population with clipped, masked array updates.
+The rules mirror the engine in micromanager.py exactly, under its
+default RuleSet (mm.DEFAULT_RULES).
+
+Requires NumPy (the game itself does not).
+
+Example:
+    python batch.py 1000000
+"""
+
+import sys
+import time
+
+import numpy as np
+
+import micromanager as mm
+
+# ============================================================================
+# STATE LAYOUT
+# ============================================================================
+
+RESOURCES = ('atp', 'glucose', 'amino_acids', 'lipids', 'health', 'membrane', 'waste')
+STATS = ('atp_generated', 'proteins_made', 'waste_cleaned',
+         'active_transports', 'passive_transports')
+
+# Bits in CellBatch.flags
+DEFENDER = 1   # has_defender
+ENZYME = 2     # enzyme_boost
+GOLGI = 4      # golgi_bonus
+
+# Loss reasons, in the order check_lose_conditions tests them
+ALIVE = 0
+LOST_HEALTH = 1
+LOST_MEMBRANE = 2
+LOST_ATP = 3
+LOSS_NAMES = ('alive', 'health', 'membrane', 'atp')
+
+# Columns of CellBatch.cuts: the pending delayed cut at each of
+# mm.DELAYED_SLOTS. Each (trigger, resource) owns a run of columns, one
+# per use from now, that shifts down by one whenever the trigger fires:
+# the heaps of mm.TimedEffects, flattened to fixed slots.
+def _cut_groups():
+    """{(trigger, resource): (first column, number of columns)}"""
+    groups = {}
+    for column, (trigger, resource, _) in enumerate(mm.DELAYED_SLOTS):
+        start, depth = groups.get((trigger, resource), (column, 0))
+        groups[trigger, resource] = (start, depth + 1)
+    return groups
+
+CUT_GROUPS = _cut_groups()
+
+# ============================================================================
+# EVENT TABLES
+#    Columns of the micromanager.EVENTS registry, indexed by event id, and
+#    each tier's probability table as outcome rows so a whole population
+#    samples with one searchsorted
+# ============================================================================
+
+NO_EVENT = -1
+_FLAG_BITS = {'has_defender': DEFENDER, 'enzyme_boost': ENZYME, 'golgi_bonus': GOLGI}
+
+EVENT_HEALTH = np.array([event.health for event in mm.EVENTS], dtype=np.int8)
+EVENT_MEMBRANE = np.array([event.membrane for event in mm.EVENTS], dtype=np.int8)
+EVENT_WASTE = np.array([event.waste for event in mm.EVENTS], dtype=np.int8)
+EVENT_SETS = np.array([sum(_FLAG_BITS[flag] for flag in event.sets) for event in mm.EVENTS],
+                      dtype=np.uint8)
+EVENT_BLOCKABLE = np.array([event.blockable for event in mm.EVENTS])
+EVENT_CUTS = np.array([mm.delayed_cuts(event) for event in mm.EVENTS], dtype=np.int8)
+EVENT_DELAYS = EVENT_CUTS.any(axis=1)
+
+def _outcome_rows(table):
+    rows = np.full((len(table), 2), NO_EVENT, dtype=np.int8)
+    for row, (_, events) in enumerate(table):
+        rows[row, :len(events)] = [event.id for event in events]
+    return rows
+
+EVENT_OUTCOMES = tuple(_outcome_rows(table) for table in mm.EVENT_TABLES)
+EVENT_CUMULATIVE = tuple(np.array(cumulative) for cumulative in mm.EVENT_CUMULATIVE)
+
+
+def _events_for(turn, uniform):
+    tier = mm.event_tier(turn)
+    cumulative = EVENT_CUMULATIVE[tier]
+    draw = np.searchsorted(cumulative, uniform * cumulative[-1], side='right')
+    return EVENT_OUTCOMES[tier][np.minimum(draw, len(cumulative) - 1)]
+
+def sample_events(turn, n, rng):
+    """
+    Draw events for n cells on this turn.
+    Returns an (n, 2) array of event ids, NO_EVENT where a cell has
+    only one event.
+    """
+    return _events_for(turn, rng.random(n))
+
+def stream_events(turn, keys):
+    """
+    Events on this turn from turn_keys(): row i is what
+    mm.EventStream(seed, games[i]) draws. Same layout as sample_events.
+    """
+    return _events_for(turn, draw(keys, 0))
+
+# ============================================================================
+# EVENT STREAMS
+#    mm.counter_random for whole arrays of games, bit for bit: the same
+#    SplitMix64 steps in wrapping uint64 arithmetic
+# ============================================================================
+
+_GOLDEN = np.uint64(mm._GOLDEN)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+def _mix64(key, part):
+    x = (key ^ part) + _GOLDEN
+    x = (x ^ x >> np.uint64(30)) * _MIX1
+    x = (x ^ x >> np.uint64(27)) * _MIX2
+    return x ^ x >> np.uint64(31)
+
+def turn_keys(seed, games, turn):
+    """Counter stream key of a turn for every game index in games"""
+    keys = _mix64(np.uint64(mm._mix64(0, seed)), np.asarray(games, dtype=np.uint64))
+    return _mix64(keys, np.uint64(turn & mm._MASK64))
+
+def draw(keys, slot):
+    """Draw number slot from turn_keys() (float64 array in [0, 1))"""
+    return (_mix64(keys, np.uint64(slot)) >> np.uint64(11)).astype(np.float64) / 2.0 ** 53
+
+def counter_random(seed, games, turn, slot):
+    """Draw number slot of a turn for every game index in games"""
+    return draw(turn_keys(seed, games, turn), slot)
+
+# ============================================================================
+# CELL BATCH
+# ============================================================================
+
+class CellBatch:
+    """
+    N cells stored as parallel arrays, all on the same turn. Cell i
+    plays game number first_game + i (see apply_events).
+    """
+
+    def __init__(self, n, first_game=0):
+        self.n = n
+        self.turn = 1
+        self.game = np.arange(first_game, first_game + n, dtype=np.uint64)
+        self._keys = (None, None)
+
+        # Same starting values as CellState
+        start = mm.CellState()
+        for name in RESOURCES:
+            setattr(self, name, np.full(n, getattr(start, name), dtype=np.int8))
+        self.flags = np.zeros(n, dtype=np.uint8)
+        self.atp_crisis_turns = np.zeros(n, dtype=np.int8)
+        self.cuts = np.zeros((n, len(mm.DELAYED_SLOTS)), dtype=np.int8)
+
+        # Game outcome
+        self.alive = np.ones(n, dtype=bool)
+        self.loss_reason = np.zeros(n, dtype=np.int8)
+        self.turns_survived = np.zeros(n, dtype=np.int8)
+
+        for name in STATS:
+            setattr(self, name, np.zeros(n, dtype=np.int32))
+
+    @classmethod
+    def from_cells(cls, cells):
+        """Build a batch from CellState objects (all must be on the same turn)"""
+        batch = cls(len(cells))
+        batch.turn = cells[0].turn
+        for name in RESOURCES + ('atp_crisis_turns',):
+            getattr(batch, name)[:] = [getattr(cell, name) for cell in cells]
+        for name in STATS:
+            getattr(batch, name)[:] = [cell.stats[name] for cell in cells]
+        batch.flags[:] = [cell.has_defender * DEFENDER + cell.enzyme_boost * ENZYME
+                          + cell.golgi_bonus * GOLGI for cell in cells]
+        batch.cuts[:] = np.minimum([cell.effects.pending() for cell in cells], 5)
+        return batch
+
+    def to_cell(self, i):
+        """Copy cell i back into a CellState (e.g. to display_status it)"""
+        cell = mm.CellState()
+        cell.turn = self.turn
+        for name in RESOURCES + ('atp_crisis_turns',):
+            setattr(cell, name, int(getattr(self, name)[i]))
+        for name in STATS:
+            cell.stats[name] = int(getattr(self, name)[i])
+        flags = int(self.flags[i])
+        cell.has_defender = bool(flags & DEFENDER)
+        cell.enzyme_boost = bool(flags & ENZYME)
+        cell.golgi_bonus = bool(flags & GOLGI)
+        cell.effects.load(self.cuts[i].tolist())
+        return cell
+
+    def copy(self):
+        """Independent copy of the whole batch"""
+        clone = CellBatch.__new__(CellBatch)
+        for name, value in vars(self).items():
+            setattr(clone, name, value.copy() if isinstance(value, np.ndarray) else value)
+        return clone
+
+    def turn_keys(self, seed):
+        """Counter stream keys of every game for the current turn (cached)"""
+        if self._keys[0] != (seed, self.turn):
+            self._keys = (seed, self.turn), turn_keys(seed, self.game, self.turn)
+        return self._keys[1]
+
+    def _flag(self, bit):
+        return (self.flags & bit).astype(bool)
+
+    def _set_flag(self, bit, mask):
+        self.flags[mask] |= bit
+
+    def _clear_flag(self, bit, mask):
+        self.flags[mask] &= ~np.uint8(bit)
+
+    def _take_cuts(self, trigger, who):
+        """
+        Use trigger once for the cells in who: returns {resource: cut due
+        now} (int8 arrays, 0 outside who) and moves their later cuts up
+        """
+        taken = {}
+        for (slot_trigger, resource), (start, depth) in CUT_GROUPS.items():
+            if slot_trigger != trigger:
+                continue
+            slots = self.cuts[:, start:start + depth]
+            taken[resource] = slots[:, 0] * who
+            if depth > 1:
+                slots[:, :-1] = np.where(who[:, None], slots[:, 1:], slots[:, :-1])
+            slots[:, -1] *= ~who
+        return taken
+
+    # ------------------------------------------------------------------------
+    # Phase 1: Import
+    # ------------------------------------------------------------------------
+
+    def apply_import(self, active):
+        """active is a bool array: True for active transport, False for passive"""
+        alive = self.alive
+        active = active & alive & (self.atp >= 1)
+        passive = alive & ~active
+
+        self.atp[active] -= 1
+        self.active_transports[active] += 1
+        self.passive_transports[passive] += 1
+
+        glucose_gain = 1 + active.astype(np.int8)
+        golgi = alive & self._flag(GOLGI)
+        glucose_gain[golgi] += 1
+        self._clear_flag(GOLGI, golgi)
+
+        # Delayed cuts due at this import
+        cuts = self._take_cuts(mm.ON_IMPORT, alive)
+        glucose_gain -= cuts['glucose']
+        np.maximum(glucose_gain, 0, out=glucose_gain)
+        aa_gain = np.maximum(alive - cuts['amino_acids'], 0).astype(np.int8)
+
+        self.glucose += glucose_gain * alive
+        np.minimum(self.glucose, 5, out=self.glucose)
+        self.amino_acids += aa_gain
+        np.minimum(self.amino_acids, 5, out=self.amino_acids)
+
+    # ------------------------------------------------------------------------
+    # Phase 2: Events
+    # ------------------------------------------------------------------------
+
+    def apply_events(self, rng, seed=None):
+        """
+        Sample and apply this turn's events: from each game's counter
+        stream if seed is given, otherwise from rng.
+        Returns the (n, 2) event ids
+        """
+        if seed is None:
+            events = sample_events(self.turn, self.n, rng)
+        else:
+            events = stream_events(self.turn, self.turn_keys(seed))
+        events[~self.alive] = NO_EVENT
+        for slot in range(events.shape[1]):
+            self.apply_event(events[:, slot])
+        return events
+
+    def apply_event(self, event):
+        """Apply one event id per cell (NO_EVENT for none)"""
+        happened = event != NO_EVENT
+        idx = np.where(happened, event, 0)
+
+        # Defensive proteins block the whole event (and are used up)
+        blocked = happened & EVENT_BLOCKABLE[idx] & self._flag(DEFENDER)
+        self._clear_flag(DEFENDER, blocked)
+        applies = happened & ~blocked
+
+        self.health += EVENT_HEALTH[idx] * applies
+        self.membrane += EVENT_MEMBRANE[idx] * applies
+        self.waste += EVENT_WASTE[idx] * applies
+        for name in ('health', 'membrane', 'waste'):
+            np.clip(getattr(self, name), 0, 5, out=getattr(self, name))
+        self.flags |= EVENT_SETS[idx] * applies
+
+        # Delayed cuts, queued for the next uses of their trigger (only the
+        # few cells with such an event are touched)
+        queued = np.flatnonzero(applies & EVENT_DELAYS[idx])
+        if queued.size:
+            self.cuts[queued] = np.minimum(self.cuts[queued] + EVENT_CUTS[idx[queued]], 5)
+
+    # ------------------------------------------------------------------------
+    # Phase 3: Organelle actions
+    # ------------------------------------------------------------------------
+
+    def action_bits(self):
+        """uint8 array: bit a-1 is set where organelle action a is legal (see PackedCell.action_mask)"""
+        has_atp = self.atp >= 1
+        glucose = self.glucose >= 1
+        protein = (self.amino_acids >= 1) & has_atp
+        bits = glucose.view(np.uint8) << (mm.MITOCHONDRIA - 1)
+        for action, legal in ((mm.RIBOSOMES, protein),
+                              (mm.SMOOTH_ER, glucose & has_atp),
+                              (mm.LYSOSOMES, has_atp & (self.waste > 0)),
+                              (mm.GOLGI, protein),
+                              (mm.MEMBRANE_REPAIR, self.lipids >= 2)):
+            bits |= legal.view(np.uint8) << (action - 1)
+        bits *= self.alive
+        return bits
+
+    def action_mask(self):
+        """(n, 6) bool array: column a-1 is True where organelle action a is legal"""
+        mask = np.empty((self.n, len(mm.ORGANELLE_ACTIONS)), dtype=bool)
+        has_atp = self.atp >= 1
+        mask[:, mm.MITOCHONDRIA - 1] = self.glucose >= 1
+        mask[:, mm.RIBOSOMES - 1] = (self.amino_acids >= 1) & has_atp
+        mask[:, mm.SMOOTH_ER - 1] = (self.glucose >= 1) & has_atp
+        mask[:, mm.LYSOSOMES - 1] = has_atp & (self.waste > 0)
+        mask[:, mm.GOLGI - 1] = mask[:, mm.RIBOSOMES - 1]
+        mask[:, mm.MEMBRANE_REPAIR - 1] = self.lipids >= 2
+        mask &= self.alive[:, None]
+        return mask
+
+    def apply_actions(self, actions, subchoices):
+        """
+        Apply one organelle action per cell (0 = no action).
+        subchoices indexes RIBOSOME_CHOICES for cells using RIBOSOMES.
+        Illegal actions are ignored, like apply_action returning False.
+        Returns the bool array of cells whose action succeeded.
+        """
+        legal = (self.action_bits() >> np.maximum(actions - 1, 0) & 1).astype(bool)
+        legal &= actions > 0
+
+        # Mitochondria: 1 Glucose -> 2 ATP (+1 with enzyme boost, minus any
+        # metabolic crisis cut), Waste +1
+        m = legal & (actions == mm.MITOCHONDRIA)
+        boost = m & self._flag(ENZYME)
+        cut = self._take_cuts(mm.ON_MITOCHONDRIA, m)['atp']
+        gain = np.maximum(2 * m + boost - cut, 0).astype(np.int8)
+        self._clear_flag(ENZYME, boost)
+        self.glucose -= m
+        self.atp += gain
+        self.waste += m
+        self.atp_generated += gain
+
+        # Ribosomes: 1 Amino Acid + 1 ATP -> protein
+        r = legal & (actions == mm.RIBOSOMES)
+        self._set_flag(ENZYME, r & (subchoices == 0))
+        self.health += r & (subchoices == 1)
+        self.membrane += r & (subchoices == 2)
+        self._set_flag(DEFENDER, r & (subchoices == 3))
+        self.proteins_made += r
+
+        # Smooth ER: 1 Glucose + 1 ATP -> 2 Lipids
+        s = legal & (actions == mm.SMOOTH_ER)
+        self.glucose -= s
+        self.lipids += 2 * s
+
+        # Lysosomes: 1 ATP -> Waste -2, Amino Acid +1
+        lyso = legal & (actions == mm.LYSOSOMES)
+        self.waste -= 2 * lyso
+        self.amino_acids += lyso
+        self.waste_cleaned += 2 * lyso
+
+        # Golgi: 1 Amino Acid + 1 ATP -> bonus glucose next import
+        g = legal & (actions == mm.GOLGI)
+        self._set_flag(GOLGI, g)
+
+        # Shared costs
+        self.atp -= r | s | lyso | g
+        self.amino_acids -= r | g
+
+        # Membrane repair: 2 Lipids -> Membrane +1
+        rep = legal & (actions == mm.MEMBRANE_REPAIR)
+        self.lipids -= 2 * rep
+        self.membrane += rep
+
+        for name in ('atp', 'amino_acids', 'lipids', 'health', 'membrane'):
+            np.minimum(getattr(self, name), 5, out=getattr(self, name))
+        np.clip(self.waste, 0, 5, out=self.waste)
+        return legal
+
+    # ------------------------------------------------------------------------
+    # Phase 4: Maintenance and lose conditions
+    # ------------------------------------------------------------------------
+
+    def apply_maintenance(self):
+        alive = self.alive
+        self.membrane -= alive
+        np.maximum(self.membrane, 0, out=self.membrane)
+        self.atp -= alive
+        np.maximum(self.atp, 0, out=self.atp)
+        self.health -= alive * ((self.waste >= 3).astype(np.int8) + (self.waste >= 4))
+        np.maximum(self.health, 0, out=self.health)
+
+    def check_lose_conditions(self):
+        """Vectorized CellState.check_lose_conditions; kills and records losers"""
+        alive = self.alive
+        reason = np.zeros(self.n, dtype=np.int8)
+
+        # Crisis counter only moves when health and membrane are fine
+        counting = alive & (self.health > 0) & (self.membrane > 0)
+        empty = self.atp <= 0
+        self.atp_crisis_turns[counting & empty] += 1
+        self.atp_crisis_turns[counting & ~empty] = 0
+
+        reason[alive & (self.atp_crisis_turns >= 2)] = LOST_ATP
+        reason[alive & (self.membrane <= 0)] = LOST_MEMBRANE
+        reason[alive & (self.health <= 0)] = LOST_HEALTH
+
+        lost = reason > 0
+        self.loss_reason[lost] = reason[lost]
+        self.turns_survived[lost] = self.turn - 1
+        self.alive &= ~lost
+
+    # ------------------------------------------------------------------------
+    # Whole turns
+    # ------------------------------------------------------------------------
+
+    def play_turn(self, policy, rng, seed=None):
+        """One turn for every living cell, in the same order as play_turn() (seed as in apply_events)"""
+        self.apply_import(policy.transport(self, rng))
+        self.apply_events(rng, seed)
+        self.check_lose_conditions()
+        for _ in range(mm.ACTIONS_PER_TURN):
+            actions, subchoices = policy.action(self, rng)
+            self.apply_actions(actions, subchoices)
+        self.apply_maintenance()
+        self.check_lose_conditions()
+        self.turns_survived[self.alive] = self.turn
+        self.turn += 1
+
+    def won(self):
+        return self.alive & (self.turn > 10)
+
+# ============================================================================
+# POLICIES
+# ============================================================================
+
+# By action_bits() value: how many (action, subchoice) choices are legal,
+# each ribosome protein type counted as its own choice like
+# mm.ORGANELLE_CHOICES, and the k-th of them (0 past the last)
+def _legal_choices():
+    count = np.zeros(64, dtype=np.int8)
+    actions = np.zeros((64, len(mm.ORGANELLE_CHOICES)), dtype=np.int8)
+    subchoices = np.zeros((64, len(mm.ORGANELLE_CHOICES)), dtype=np.int8)
+    for bits in range(64):
+        legal = [(action, mm.RIBOSOME_CHOICES.index(subchoice) if subchoice else 0)
+                 for action, subchoice in mm.ORGANELLE_CHOICES if bits >> (action - 1) & 1]
+        count[bits] = len(legal)
+        for k, (action, sub) in enumerate(legal):
+            actions[bits, k], subchoices[bits, k] = action, sub
+    return count, actions, subchoices
+
+LEGAL_COUNT, NTH_LEGAL, NTH_SUBCHOICE = _legal_choices()
+
+
+class RandomBatchPolicy:
+    """
+    Picks uniformly among each cell's legal choices, with each ribosome
+    protein type a choice of its own as in mm.RandomPolicy (which also
+    never repeats a choice within a turn; this policy draws afresh for
+    every action). With a seed, the draws come from each game's counter stream (slots after the event
+    draw), so results do not depend on how games are chunked; otherwise
+    from the rng passed in.
+    """
+
+    def __init__(self, seed=None):
+        self.seed = seed
+        self._slot = 0
+
+    def _random(self, batch, rng):
+        """One uniform draw per cell"""
+        if self.seed is None:
+            return rng.random(batch.n)
+        self._slot += 1
+        return draw(batch.turn_keys(self.seed), self._slot)
+
+    def transport(self, batch, rng):
+        self._slot = 0  # First draw of the turn
+        return self._random(batch, rng) < 0.5
+
+    def action(self, batch, rng):
+        bits = batch.action_bits()
+        # Take the pick-th legal choice
+        pick = (self._random(batch, rng) * LEGAL_COUNT[bits]).astype(np.int8)
+        return NTH_LEGAL[bits, pick], NTH_SUBCHOICE[bits, pick]
+
+
+class GreedyBatchPolicy:
+    """
+    mm.GreedyPolicy for a whole batch: each action goes to the most urgent
+    warning of the action menu, in the same order, with the same fallbacks
+    """
+
+    HEALTH = mm.RIBOSOME_CHOICES.index('health')
+    DEFENSE = mm.RIBOSOME_CHOICES.index('defense')
+
+    def transport(self, batch, rng):
+        return batch.atp >= 3
+
+    def action(self, batch, rng):
+        bits = batch.action_bits()
+        can = {action: (bits >> (action - 1) & 1).astype(bool) for action in mm.ORGANELLE_ACTIONS}
+        low_membrane = batch.membrane <= 2
+        banked = batch.atp >= 3
+        rules = (
+            (can[mm.MITOCHONDRIA] & (batch.atp <= 2), mm.MITOCHONDRIA, 0),
+            (can[mm.LYSOSOMES] & (batch.waste >= 3), mm.LYSOSOMES, 0),
+            (can[mm.MEMBRANE_REPAIR] & low_membrane, mm.MEMBRANE_REPAIR, 0),
+            (can[mm.SMOOTH_ER] & low_membrane, mm.SMOOTH_ER, 0),
+            (can[mm.RIBOSOMES] & (batch.health <= 2), mm.RIBOSOMES, self.HEALTH),
+            (can[mm.RIBOSOMES] & ~batch._flag(DEFENDER) & banked, mm.RIBOSOMES, self.DEFENSE),
+            (can[mm.SMOOTH_ER] & (batch.lipids < 2) & banked, mm.SMOOTH_ER, 0),
+            (can[mm.MITOCHONDRIA] & (batch.atp <= 3), mm.MITOCHONDRIA, 0),
+        )
+        conditions = [condition for condition, _, _ in rules]
+        actions = np.select(conditions, [action for _, action, _ in rules], 0).astype(np.int8)
+        subchoices = np.select(conditions, [sub for _, _, sub in rules], 0).astype(np.int8)
+        return actions, subchoices
+
+
+POLICIES = {'random': RandomBatchPolicy, 'greedy': GreedyBatchPolicy}
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def run_games(n_games, policy=None, seed=None, chunk_size=1 << 17):
+    """
+    Play n_games full games in chunks of chunk_size cells.
+    With a seed, game g draws its events from EventStream(seed, g) like
+    simulate() does, and the default policy uses counter streams too, so
+    results do not depend on chunk_size.
+    Returns a summary dict: wins, losses by reason, turns survived
+    histogram and mean end-of-game stats.
+    """
+    policy = policy or RandomBatchPolicy(seed)
+    rng = np.random.default_rng(seed)
+
+    wins = 0
+    losses = np.zeros(len(LOSS_NAMES), dtype=np.int64)
+    survived = np.zeros(11, dtype=np.int64)
+    stat_totals = dict.fromkeys(STATS, 0)
+
+    remaining = n_games
+    while remaining > 0:
+        batch = CellBatch(min(chunk_size, remaining), n_games - remaining)
+        remaining -= batch.n
+        while batch.turn <= 10 and batch.alive.any():
+            batch.play_turn(policy, rng, seed)
+
+        wins += int(batch.won().sum())
+        losses += np.bincount(batch.loss_reason, minlength=len(LOSS_NAMES))
+        survived += np.bincount(batch.turns_survived, minlength=11)
+        for name in STATS:
+            stat_totals[name] += int(getattr(batch, name).sum())
+
+    return {
+        'games': n_games,
+        'wins': wins,
+        'losses': {LOSS_NAMES[i]: int(losses[i]) for i in range(1, len(LOSS_NAMES))},
+        'turns_survived': survived.tolist(),
+        'mean_stats': {name: total / n_games for name, total in stat_totals.items()},
+    }
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    start = time.perf_counter()
+    summary = run_games(n, seed=0)
+    elapsed = time.perf_counter() - start
+    print(f"{n} games in {elapsed:.2f}s ({n / elapsed:,.0f} games/s)")
+    print(f"Win rate: {summary['wins'] / n:.2%}")
+    print(f"Losses: {summary['losses']}")
+    print(f"Turns survived: {summary['turns_survived']}")
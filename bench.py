@@ -0,0 +1,338 @@
+"""
+MicroManager - Benchmarks
+Times the hot paths of the game so slowdowns get noticed.
+
+Covers the rules engine phase by phase, event sampling, terminal
+rendering (printed into a throwaway buffer), whole headless turns and
+games, an HTTP API step, and the NumPy batch simulator, tissue mode and
+training envs when NumPy is installed.
+
+Examples:
+    python bench.py                          # print results
+    python bench.py --json results.json      # machine-readable output
+    python bench.py --save-baseline          # store bench_baseline.json
+    python bench.py --compare                # fail if slower than baseline
+"""
+
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+import timeit
+
+import micromanager as mm
+
+DEFAULT_BASELINE = "bench_baseline.json"
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    """Register a setup function that returns the callable to time"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+# ============================================================================
+# ENGINE
+# ============================================================================
+
+START = mm.pack_cell(mm.CellState())
+
+def _mid_game():
+    """A typical mid-game cell with something to do for every organelle"""
+    cell = mm.CellState()
+    cell.atp, cell.glucose, cell.amino_acids, cell.lipids = 4, 3, 3, 4
+    cell.waste, cell.turn = 3, 5
+    return mm.pack_cell(cell)
+
+MID_GAME = _mid_game()
+
+
+@benchmark("engine.import")
+def _():
+    cell = mm.CellState()
+    def run():
+        mm.unpack_cell(START, cell)
+        mm.apply_import(cell, mm.ACTIVE_TRANSPORT)
+    return run
+
+
+@benchmark("engine.events")
+def _():
+    cell = mm.CellState()
+    rng = random.Random(0)
+    def run():
+        mm.unpack_cell(MID_GAME, cell)
+        mm.apply_events(cell, rng)
+    return run
+
+
+@benchmark("engine.actions")
+def _():
+    """All six organelles (ribosomes once per protein type) on a fresh cell each"""
+    cell = mm.CellState()
+    choices = mm.RandomPolicy.choices
+    def run():
+        for action, subchoice in choices:
+            mm.unpack_cell(MID_GAME, cell)
+            mm.apply_action(cell, action, subchoice)
+    return run
+
+
+@benchmark("engine.action_undo")
+def _():
+    """Apply, inspect and roll back one action on a JournaledCell"""
+    cell = mm.unpack_cell(MID_GAME, mm.JournaledCell())
+    def run():
+        mark = cell.mark()
+        mm.apply_action(cell, mm.LYSOSOMES)
+        cell.changes(mark)
+        cell.undo(mark)
+    return run
+
+
+@benchmark("engine.stacked_cuts")
+def _():
+    """Take the cuts due at an import and queue another, with ~100 pending"""
+    effects = mm.TimedEffects()
+    effects.schedule(mm.Delayed(mm.ON_IMPORT, 'glucose', 1, 100))
+    again = mm.Delayed(mm.ON_IMPORT, 'glucose', 1, 1)
+    def run():
+        effects.take(mm.ON_IMPORT)
+        effects.schedule(again)
+    return run
+
+
+@benchmark("engine.maintenance")
+def _():
+    cell = mm.CellState()
+    def run():
+        mm.unpack_cell(MID_GAME, cell)
+        mm.apply_maintenance(cell)
+        cell.check_lose_conditions()
+    return run
+
+
+@benchmark("engine.turn")
+def _():
+    cell = mm.CellState()
+    policy = mm.RandomPolicy()
+    rng = random.Random(0)
+    def run():
+        mm.unpack_cell(MID_GAME, cell)
+        mm.play_turn(cell, policy, rng)
+    return run
+
+
+def _bot(name):
+    def setup():
+        policy = mm.POLICIES[name]()
+        view = mm.PackedCell(MID_GAME)
+        legal = mm.legal_choices(view)
+        rng = random.Random(0)
+        def run():
+            policy.transport(view, rng)
+            policy.actions(view, legal, rng)
+        return run
+    return setup
+
+benchmark("bots.random")(_bot('random'))
+benchmark("bots.greedy")(_bot('greedy'))
+benchmark("bots.lookahead")(_bot('lookahead'))
+
+# ============================================================================
+# EVENT SAMPLING
+# ============================================================================
+
+def _sampling(turn):
+    def setup():
+        rng = random.Random(0)
+        return lambda: mm.get_event_for_turn(turn, rng)
+    return setup
+
+benchmark("events.sample.gentle")(_sampling(1))
+benchmark("events.sample.moderate")(_sampling(5))
+benchmark("events.sample.severe")(_sampling(9))
+
+# ============================================================================
+# RENDERING
+#    Output goes to an in-memory buffer so only the formatting and write
+#    calls are measured, not the terminal
+# ============================================================================
+
+@benchmark("render.display_status")
+def _():
+    cell = mm.unpack_cell(MID_GAME)
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            cell.display_status()
+    return run
+
+
+@benchmark("render.action_menu")
+def _():
+    """One pass of the action phase: header, status, warnings and menu, then skip"""
+    cell = mm.unpack_cell(MID_GAME)
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()), _answers('7'):
+            mm.action_phase(cell)
+    return run
+
+
+@contextlib.contextmanager
+def _answers(answer):
+    """Make input() return `answer` without blocking"""
+    original = builtins.input
+    builtins.input = lambda prompt="": answer
+    try:
+        yield
+    finally:
+        builtins.input = original
+
+# ============================================================================
+# WHOLE GAMES
+# ============================================================================
+
+@benchmark("game.random_policy")
+def _():
+    policy = mm.RandomPolicy()
+    rng = random.Random(0)
+    return lambda: mm.play_game(policy, rng)
+
+
+@benchmark("batch.games_x10000")
+def _():
+    try:
+        import batch
+    except ImportError:
+        return None
+    return lambda: batch.run_games(10000, seed=0)
+
+
+@benchmark("tissue.turn_250x250")
+def _():
+    """First turn of a fresh tissue (every cell alive)"""
+    try:
+        import batch
+        import tissue
+    except ImportError:
+        return None
+    policy = batch.RandomBatchPolicy()
+    def run():
+        tissue.Tissue(250, 250, seed=0).play_turn(policy)
+    return run
+
+
+@benchmark("env.step_x256")
+def _():
+    """One random legal action in each of 256 training envs"""
+    try:
+        import numpy as np
+        import env
+    except ImportError:
+        return None
+    envs = env.VectorEnv(256, seed=0)
+    rng = np.random.default_rng(0)
+    _, info = envs.reset()
+    def run():
+        nonlocal info
+        info = envs.step(env.sample_actions(info['action_mask'], rng))[4]
+    return run
+
+
+@benchmark("api.step")
+def _():
+    """One /step request body to response dict: check the token, import and events, sign"""
+    import api
+    games = api.GameAPI(b'bench')
+    body = json.dumps({'token': games.new_game({'seed': 0})['token'], 'action': 'B'}).encode()
+    return lambda: games.handle('POST', '/step', body)
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def run_benchmarks(names=None, repeat=5):
+    """Time each benchmark; returns {name: {'usec_per_op', 'ops_per_sec'}}"""
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        func = setup()
+        if func is None:
+            continue
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=number)) / number
+        results[name] = {'usec_per_op': best * 1e6, 'ops_per_sec': 1 / best}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print the change against a baseline. Returns the names that regressed"""
+    regressions = []
+    print(f"\n{'benchmark':<28}{'baseline µs':>14}{'now µs':>12}{'change':>10}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['usec_per_op']
+        now = result['usec_per_op']
+        change = now / before - 1
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  SLOWER"
+        print(f"{name:<28}{before:>14.2f}{now:>12.2f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark MicroManager hot paths")
+    parser.add_argument('names', nargs='*', help="only run benchmarks starting with these")
+    parser.add_argument('--json', metavar='FILE', help="write results as JSON ('-' for stdout)")
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, metavar='FILE')
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, metavar='FILE')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="allowed slowdown before --compare fails (default 0.15)")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.names, args.repeat)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        for name, result in results.items():
+            print(f"{name:<28}{result['usec_per_op']:>12.2f} µs/op{result['ops_per_sec']:>14,.0f} ops/s")
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than baseline: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+MicroManager - Training Environments
+Gym-style reset()/step() over batches of games, for training agents.
+
+A VectorEnv plays n games side by side with the rules engine in
+micromanager.py. Each step takes one action per game (an index into
+the action space below) and returns NumPy arrays:
+
+    observation   (n, len(OBSERVATION)) float32, the CellState fields
+    reward        (n,) float32: +1 on the step a game is won, -1 when lost
+    terminated    (n,) bool: the game was won or lost on this step
+    truncated     (n,) bool: the game hit STEP_LIMIT_FACTOR times the
+                  steps of the longest game without a result
+    info          {'action_mask': (n, N_ACTIONS) bool of legal actions,
+                   'final_observation': last observation of finished games,
+                   'won': (n,) bool}
+
+A turn takes several steps: choosing the transport mode runs the import
+and the events; each organelle choice runs that action; END_TURN (or the
+last action of the turn) runs maintenance. Illegal actions change
+nothing, as in play_turn(). Finished games start over on their own, so
+observation holds the new game's first state and the old game's last
+one is in info['final_observation'].
+
+Every game draws its events from its own counter stream
+(mm.EventStream), keyed by the seed, the game's env index and how many
+games that env has played. Results therefore do not depend on how envs
+are split over processes: SubprocVectorEnv runs slices of
+the same envs in worker processes (one per core by default) and returns
+exactly what a VectorEnv would.
+
+Requires NumPy.
+
+Example:
+    env = VectorEnv(256, seed=0)
+    observation, info = env.reset()
+    for _ in range(1000):
+        actions = sample_actions(info['action_mask'], rng)
+        observation, reward, terminated, truncated, info = env.step(actions)
+"""
+
+import multiprocessing
+import os
+
+import numpy as np
+
+import micromanager as mm
+
+# ============================================================================
+# SPACES
+# ============================================================================
+
+# Actions: the two transport modes, every organelle choice, and ending
+# the action phase early
+PASSIVE = 0
+ACTIVE = 1
+CHOICES = mm.ORGANELLE_CHOICES         # (action, subchoice), from index FIRST_CHOICE
+FIRST_CHOICE = 2
+END_TURN = FIRST_CHOICE + len(CHOICES)
+N_ACTIONS = END_TURN + 1
+
+OBSERVATION = mm.PACKED_FIELDS + mm.PACKED_FLAGS + (
+    'atp_crisis_turns', 'turn',
+    'actions_left',         # Organelle actions left this turn
+    'choosing_transport',   # 1 while the next action is a transport mode
+) + tuple(                  # Pending delayed cuts, e.g. 'import_glucose_cut_1'
+    f"{trigger}_{resource}_cut_{offset + 1}" for trigger, resource, offset in mm.DELAYED_SLOTS
+)
+
+STEP_LIMIT_FACTOR = 2
+
+def _mask_rows():
+    """Action mask rows for every transport mask and every organelle action mask"""
+    transport = np.zeros(((mm.ACTIVE_BIT | mm.PASSIVE_BIT) + 1, N_ACTIONS), dtype=bool)
+    for mask in range(len(transport)):
+        transport[mask, PASSIVE] = bool(mask & mm.PASSIVE_BIT)
+        transport[mask, ACTIVE] = bool(mask & mm.ACTIVE_BIT)
+    organelle = np.zeros((1 << len(mm.ORGANELLE_ACTIONS), N_ACTIONS), dtype=bool)
+    for mask in range(len(organelle)):
+        for i, (action, _) in enumerate(CHOICES):
+            organelle[mask, FIRST_CHOICE + i] = bool(mask >> (action - 1) & 1)
+    organelle[:, END_TURN] = True
+    return transport, organelle
+
+TRANSPORT_MASKS, ORGANELLE_MASKS = _mask_rows()
+
+
+def sample_actions(action_mask, rng):
+    """A uniformly random legal action for each row of an action mask"""
+    scores = rng.random(action_mask.shape)
+    scores[~action_mask] = -1.0
+    return scores.argmax(axis=1)
+
+# ============================================================================
+# GAMES
+# ============================================================================
+
+def game_events(seed, env, episode):
+    """Event stream of the episode-th game played by env number `env`"""
+    return mm.EventStream(seed, env << 32 | episode)
+
+
+class _Game:
+    """One env's game in progress"""
+
+    __slots__ = ('cell', 'events', 'episode', 'steps', 'choosing_transport', 'actions_left')
+
+    def __init__(self, seed, env, episode):
+        self.cell = mm.CellState()
+        self.events = game_events(seed, env, episode)
+        self.episode = episode
+        self.steps = 0
+        self.choosing_transport = True
+        self.actions_left = 0
+
+    def observation(self):
+        cell = self.cell
+        return (cell.atp, cell.glucose, cell.amino_acids, cell.lipids, cell.waste,
+                cell.health, cell.membrane, cell.has_defender, cell.enzyme_boost,
+                cell.golgi_bonus, cell.atp_crisis_turns, cell.turn,
+                self.actions_left, self.choosing_transport, *cell.effects.pending())
+
+    def mask(self):
+        view = mm.PackedCell.from_cell(self.cell)
+        if self.choosing_transport:
+            return TRANSPORT_MASKS[view.transport_mask()]
+        return ORGANELLE_MASKS[view.action_mask()]
+
+    def step(self, action):
+        """Apply one action. Returns (reward, terminated)"""
+        cell = self.cell
+        self.steps += 1
+        if self.choosing_transport:
+            if action == ACTIVE and cell.atp >= mm.RULES.active_cost:
+                mode = mm.ACTIVE_TRANSPORT
+            elif action == PASSIVE:
+                mode = mm.PASSIVE_DIFFUSION
+            else:
+                return 0.0, False
+            mm.apply_import(cell, mode)
+            mm.apply_events(cell, self.events)
+            if cell.check_lose_conditions()[0]:
+                return -1.0, True
+            self.choosing_transport = False
+            self.actions_left = mm.RULES.actions_per_turn
+            if self.actions_left:
+                return 0.0, False
+        elif FIRST_CHOICE <= action < END_TURN:
+            if not mm.apply_action(cell, *CHOICES[action - FIRST_CHOICE])[0]:
+                return 0.0, False
+            self.actions_left -= 1
+            if self.actions_left:
+                return 0.0, False
+        elif action != END_TURN:
+            return 0.0, False
+        return self._end_turn()
+
+    def _end_turn(self):
+        cell = self.cell
+        mm.apply_maintenance(cell)
+        if cell.check_lose_conditions()[0]:
+            return -1.0, True
+        cell.turn += 1
+        self.choosing_transport = True
+        self.actions_left = 0
+        if cell.check_win_condition():
+            return 1.0, True
+        return 0.0, False
+
+# ============================================================================
+# VECTOR ENVS
+# ============================================================================
+
+class VectorEnv:
+    """
+    n games stepped together in this process. offset numbers the envs
+    from offset to offset + n - 1 (SubprocVectorEnv gives each worker a
+    slice of one numbering).
+    """
+
+    def __init__(self, n, seed=0, offset=0):
+        self.n = n
+        self.seed = seed
+        self.offset = offset
+        self.step_limit = STEP_LIMIT_FACTOR * mm.RULES.turns * (mm.RULES.actions_per_turn + 2)
+        self.games = []
+
+    def reset(self, seed=None):
+        """Start every game over. Returns (observation, info)"""
+        if seed is not None:
+            self.seed = seed
+        self.games = [_Game(self.seed, self.offset + i, 0) for i in range(self.n)]
+        observation = np.array([game.observation() for game in self.games], dtype=np.float32)
+        return observation, {'action_mask': self.action_masks()}
+
+    def action_masks(self):
+        """(n, N_ACTIONS) bool: the actions legal in each game right now"""
+        return np.array([game.mask() for game in self.games])
+
+    def step(self, actions):
+        """One action per game. Returns (observation, reward, terminated, truncated, info)"""
+        reward = np.zeros(self.n, dtype=np.float32)
+        terminated = np.zeros(self.n, dtype=bool)
+        truncated = np.zeros(self.n, dtype=bool)
+        won = np.zeros(self.n, dtype=bool)
+        rows = []
+        final = {}
+        for i, action in enumerate(np.asarray(actions).tolist()):
+            game = self.games[i]
+            reward[i], terminated[i] = game.step(action)
+            truncated[i] = not terminated[i] and game.steps >= self.step_limit
+            if terminated[i] or truncated[i]:
+                won[i] = reward[i] > 0
+                final[i] = game.observation()
+                game = self.games[i] = _Game(self.seed, self.offset + i, game.episode + 1)
+            rows.append(game.observation())
+
+        observation = np.array(rows, dtype=np.float32)
+        final_observation = np.zeros_like(observation)
+        for i, row in final.items():
+            final_observation[i] = row
+        info = {'action_mask': self.action_masks(), 'final_observation': final_observation,
+                'won': won}
+        return observation, reward, terminated, truncated, info
+
+    def close(self):
+        pass
+
+# ============================================================================
+# SUBPROCESS VECTOR ENVS
+# ============================================================================
+
+def _worker(conn, n, seed, offset, rules):
+    """Serve a VectorEnv slice over a pipe until told to close"""
+    mm.use_rules(rules)
+    env = VectorEnv(n, seed, offset)
+    while True:
+        command, argument = conn.recv()
+        if command == 'step':
+            conn.send(env.step(argument))
+        elif command == 'reset':
+            conn.send(env.reset(argument))
+        elif command == 'masks':
+            conn.send(env.action_masks())
+        else:
+            conn.close()
+            return
+
+
+class SubprocVectorEnv:
+    """
+    A VectorEnv split over worker processes (default: one per CPU, at
+    most one per env). Same interface and same results; worth it when
+    each worker gets enough envs to outweigh the pipe round trip.
+    """
+
+    def __init__(self, n, seed=0, workers=None):
+        self.n = n
+        workers = max(1, min(workers or os.cpu_count() or 1, n))
+        bounds = [n * w // workers for w in range(workers + 1)]
+        self.slices = [(bounds[w], bounds[w + 1]) for w in range(workers)]
+        context = multiprocessing.get_context()
+        self.conns = []
+        self.processes = []
+        for start, end in self.slices:
+            parent, child = context.Pipe()
+            process = context.Process(target=_worker, args=(child, end - start, seed, start, mm.RULES),
+                                      daemon=True)
+            process.start()
+            child.close()
+            self.conns.append(parent)
+            self.processes.append(process)
+
+    def _gather(self):
+        return [conn.recv() for conn in self.conns]
+
+    def reset(self, seed=None):
+        for conn in self.conns:
+            conn.send(('reset', seed))
+        results = self._gather()
+        observation = np.concatenate([observation for observation, _ in results])
+        return observation, {'action_mask': np.concatenate([info['action_mask'] for _, info in results])}
+
+    def action_masks(self):
+        for conn in self.conns:
+            conn.send(('masks', None))
+        return np.concatenate(self._gather())
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        for conn, (start, end) in zip(self.conns, self.slices):
+            conn.send(('step', actions[start:end]))
+        results = self._gather()
+        observation, reward, terminated, truncated = (np.concatenate([result[k] for result in results])
+                                                      for k in range(4))
+        info = {key: np.concatenate([result[4][key] for result in results])
+                for key in results[0][4]}
+        return observation, reward, terminated, truncated, info
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=1)
+        self.conns, self.processes = [], []
+
+    def __del__(self):
+        if getattr(self, 'processes', None):
+            self.close()
@@ -22,190 +22,141 @@ GAME MECHANICS:
 
 """
 
+import argparse
+import asyncio
+import atexit
+import hashlib
+import heapq
+import inspect
+import json
+import math
+import os
 import random
+import re
+import sqlite3
+import struct
+import sys
 import time
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from difflib import get_close_matches
+from functools import lru_cache, wraps
+from itertools import accumulate
 
 # ============================================================================
 #  Learn More Educational System
 #    Detailed biological explanations for every term
 #    Players can access this during gameplay by typing "learn [topic]"
+#    The text lives in learn_more.txt and is only read the first time a
+#    player asks for it; topics are kept zlib-compressed in memory, and
+#    "learn" searches topic names and an inverted index of every word.
 #    Sources: Human Anatomy and Physiology, 11e 
 #    Author(s): Elaine N. Marieb; Katja Hoehn
 # ============================================================================
 
-LEARN_MORE = {
-    "atp": """
-    WHAT IS ATP?
-ATP, Adenosine Triphosphate, is produced by mitochondria through aerobic cellular respiration. It is the energy currency of cells.
+LEARN_MORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'learn_more.txt')
 
-Think of it like batteries: cells store ATP to power their various cell processes!
+_TOPIC_HEADER = re.compile(r"^@@ (.+)\n", re.MULTILINE)
+_WORD = re.compile(r"[a-z0-9]+")
 
-\u21AA ATP contains an adenine base, a ribose sugar, and three phosphate groups.
+def index_words(text):
+    """{word: count} of the lowercase words in text"""
+    counts = {}
+    for word in _WORD.findall(text.lower()):
+        counts[word] = counts.get(word, 0) + 1
+    return counts
 
-ATP can store energy because its three negatively charged phosphate groups are closely packed and repel each other. When its terminal, high-energy phosphate bond is hydrolyzed, the chemical “spring” relaxes and the molecule as a whole becomes more stable.
-
-\u21AA So, when the terminal phosphate breaks, ATP releases energy, converting into ADP (Adenosine Diphosphate)!
-
-In your body: ATP hydrolysis is essential for many cellular activities, like primary active transport, protein synthesis, mitosis, and muscle contractions. Every time you move and breathe, your cells are spending ATP!
-
-\u235F In this game: ATP is your spendable energy. Every action, like repairing damage, running organelles, or defending against threats, costs ATP. You'll need a steady supply to keep the cell alive and functioning!
-
-""",
-    
-    "glucose": """
-    WHAT IS GLUCOSE?
-Glucose is a monosaccharide, or simple sugar, that serves as the primary fuel for cells. The energy released during glucose catabolism is used to create ATP, which then powers cellular work!
-
-Glucose is a crucial energy source for the body, particularly in forming ATP, the energy currency of cells. Think of glucose as your salary, and ATP as cash in your pocket!
-
-\u21AA Glycogenesis: Glucose is converted into glycogen for storage in liver and muscle cells.
-
-\u21AA Glycogenolysis: When blood glucose levels drop, glycogen is broken down to release glucose.
-
-\u21AA Gluconeogenesis: Glucose is synthesized from non-carbohydrate sources when dietary glucose is insufficient.
-
-In your body: When you eat food, it gets broken down into glucose and your blood delivers it to every cell in your body.
-
-\u235F In this game: Glucose is the cell's income stream. Mitochondria consume glucose to produce ATP, so you'll need to constantly import glucose through the membrane to keep your energy economy running.
-
-""",
-    
-    "amino acids": """
-    WHAT ARE AMINO ACIDS?
-Ribosomes link amino acids, small molecules acting like building blocks, together during protein synthesis, forming long chains that fold into functional proteins. 
-
-Think of it like this: The order of amino acids determines a protein’s shape and function just like the same Lego pieces can be used to build different structures.
-
-Your liver is capable of producing most of the 20 different types of amino acids; the remaining 9, called "essential amino acids," must come from your diet by eating protein-rich foods. 
-
-In your body: Amino acids can be broken down to generate ATP and ATP provides the energy needed to assemble amino acids into proteins!
-
-\u235F In this game: Amino acids serve as your building blocks. Ribosomes use them to assemble proteins for repairs, defense, and metabolic boosts. Without amino acids, you can't build the specialized proteins your cell needs to survive threats.
-
-""",
-    
-    "lipids": """
-    WHAT ARE LIPIDS?
-Lipids are fats and oils, insoluble in water but dissolve in organic solvents, that make up cell membranes. 
-
-Types of Lipids:
-\u21AA Triglycerides: Composed of glycerol and three fatty acids, they store energy and insulate organs.
-\u21AA Phospholipids: These are key components of cell membranes, having both polar and nonpolar regions.
-\u21AA Steroids: Cholesterol is a major steroid found in cell membranes and is a precursor for hormones like estrogen and testosterone.
-
-In your body: The cell membrane is made of a phospholipid bilayer: two layers of lipid molecules with hydrophilic heads and hydrophobic tails. This structure allows the membrane to be fluid, with phospholipids moving freely side-to-side but rarely flipping across the bilayer.
-
-Think of the membrane like a vinaigrette settling in a cup. The natural separation of the oil and vinegar creates a smooth, bendy barrier that's always in motion when you swirl it.
-
-\u235F In this game: Lipids are used to maintain and repair the cell membrane. Whenever the membrane is damaged by toxins, attacks, or instability, you'll spend lipids to patch it up and protect the cell from death.
-
-""",
-    
-    "mitochondria": """
-    WHAT ARE MITOCHONDRIA?
-
-Yes, mitochondria are the powerhouses of cells. Their role is turning food into ATP, the energy your body uses as currency.
-
-Mitochondria also have two membranes. The outer membrane is smooth, while the inner membrane folds into structures called cristae, which increase the surface area for energy production. The mitochondrial matrix, wrapped inside the inner membrane, contains enzymes that help break down food molecules into water and carbon dioxide, capturing energy to form ATP through aerobic respiration.
-
-\u21AA Glycolysis: First, glucose is broken down inside the cytosol into smaller pieces called pyruvic acid, making a little bit of energy. Think of glycolysis scrunching a soaked towel in your fist. You only squeeze out a small amount of ATP.
-
-\u21AA Citric Acid Cycle (Krebs Cycle): Next, the pyruvic acid goes into the mitochondria where it gets turned into carbon dioxide and more energy is made. You twist the towel tight, squeezing out more energy-rich molecules that your cell can use.
-
-\u21AA Oxidative Phosphorylation: Finally, those energy-rich electrons flow through the electron transport chain on the inner membrane. This is the strongest twist of the wet towel, where your cell squeezes out every last drop of usable energy to produce the bulk of its ATP.
-
-In your body: Mitochondria used to be separate bacteria that merged with cells billions of years ago (endosymbiotic theory). You have about 2000 mitochondria in each cell. Very active cells (like muscle and brain) have even more!
-
-\u235F In this game: Mitochondria convert glucose into ATP through cellular respiration, powering all your organelle actions. They're your primary energy source, but they also produce waste as a byproduct of metabolism. 
-
-""",
-    
-    "ribosomes": """
-    WHAT ARE RIBOSOMES?
-
-Ribosomes are made of protein and RNA, a family of single-stranded nucleic acid molecules. They read mRNA in groups of three letters (codons), each one telling the ribosome which amino acid to add to snap on next.
-
-Think of ribosomes as robotic arms programmed to read an mRNA instruction sheet and snap amino acid Lego bricks together to build a protein.
-
-DNA → RNA → Protein
-1. Transcription: DNA → mRNA
-\u21AA Inside the nucleus, the cell copies a gene from DNA into mRNA.
-2. Translation: mRNA → Protein
-\u21AA The ribosome reads the mRNA instructions and builds the protein out of amino acid “Lego bricks.”
-
-In your body: A single cell can have millions of ribosomes working at once! Each ribosome can make a protein in about 1 minute.
-
-\u235F In this game: Ribosomes use amino acids to build three types of proteins: Metabolic Enzymes (boost ATP production), Structural Proteins (repair health and membrane), and Defensive Proteins (block harmful events). Choose wisely based on what threats you're facing!
- 
-""",
-    
-    "smooth er": """
-    WHAT IS THE SMOOTH ER?
-
-Unlike the rough endoplasmic reticulum, which is studded with ribosomes, the smooth ER appears as a network of naked looping tubules. 
-
-The smooth ER's functions vary across cell types, including:
-\u21AA Lipid Metabolism: Synthesizes lipids, phospholipids, and cholesterol
-\u21AA Hormone Synthesis: Produces steroid-based hormones, such as testosterone
-\u21AA Detoxification: Filters drugs and harmful chemicals
-\u21AA Glycogen Breakdown: Converts stored glycogen into glucose
-\u21AA Calcium Storage: Stores calcium ions
-
-Think of the smooth endoplasmic reticulum as an oil refinery. It produces oil (lipids, etc) and handles all their chemical processing.
-
-In Your Body: Cell membranes are made of a phospholipid bilayer. These lipids constantly need replacement because they break down or
-get damaged. Liver cells have many smooth ER because they detoxify
-drugs and alcohol. 
-
-\u235F In this game: The Smooth ER synthesizes lipids from glucose and ATP. These lipids are essential for maintaining membrane integrity, which naturally decays each turn. Keep producing lipids to prevent membrane failure!
-
-""",
-    
-    "lysosomes": """
-    WHAT ARE LYSOSOMES?
-
-Lysosomes contain digestive enzymes, called acid hydrolases, that break down waste.  Cells produce tons of waste in the form of damaged proteins, old organelles, and debris. Without lysosomes, waste piles up and cells die. 
-
-Lysosomes:
-\u21AA Digest bacteria and viruses from endocytosis 
-\u21AA Autophagy (meaning "self-devouring"): lysosomes digest damaged organelles and recycle their parts. Think of them as the cell's "demolition crew," breaking down old parts to reuse the materials.
-\u21AA Break down glycogen into glucose and bone to release calcium
-
-The lysosomal membrane safely contains the acid hydrolases; if lysosomes burst, they can trigger autolysis, causing the cell to digest itself.
-
-\u235F In this game: Lysosomes digest cellular waste through autophagy, reducing your waste level and recycling materials back into usable amino acids. High waste damages your cell's health each turn, so regular cleanup is essential for survival.
-
-""",
-    
-    "golgi": """
-    WHAT IS THE GOLGI APPARATUS?
-
-The primary function of the Golgi apparatus is modifying, packaging, and sorting proteins for delivery. 
-
-The journey: Rough ER → Golgi → Vesicle → Destination
-\u21AA Cis Face: Transport vesicles from the rough ER deliver proteins and lipids. ("Receiving" center.)
-\u21AA Inside the Golgi Apparatus: Proteins are sorted and undergo modifications (sugar trimmming, phosphorylation, etc)
-\u21AA Trans Face: Vesicles form and pinch off. ("Shipping center.)
-\u21AA Vesicle Formation: Secretory vesicles migrate to the plasma membrane to expel contents. Transport vesicles deliver materials to other organelles or to the plasma membrane.
-
-The main functions remain handling proteins and lipids for export from the cell. Think of the golgi apparatus as Amazon fulfillment centers.
-
-\u235F In this game: The Golgi packages and exports proteins to trade with the extracellular environment. By exporting proteins now, you'll receive bonus glucose on your next nutrient import. What a strategic way to invest resources for future returns!
-
-""",
-    
-    "membrane": """
-    WHAT IS THE CELL MEMBRANE?
-
-Also known as the plasma membrane, the dynamic structure separating the intracellular fluid inside a cell from the extracellular fluid outside of it. The membrane is composed of a double phospholipid layer with embedded proteins forming a fluid bilayer. The phospholipids have hydrophilic heads and hydrophobic tails and is constantly assembling and repairing itself. The cholesterol stabilizes the membrane by wedging between the phospholipid tails and the proteins have functions such as transport and cell signaling. 
+class LearnStore(Mapping):
+    """
+    Read-only {topic: text} loaded lazily from a learn_more.txt file.
+
+    search(query) answers from an index built on first use:
+      - an exact topic ("learn golgi")
+      - topics starting with the query ("learn mito")
+      - topics containing every query word, by word prefix ("learn krebs",
+        "learn autoph"), with close spellings as a fallback ("learn mitocondria")
+    Results are ranked by how often the words occur, topic names counting most.
+    """
 
-\u21AA Selective Permeability: The cell membrane controls the movement of substances in and out of the cell. Passive transport uses no energy (diffusion, osmosis) and active transport requires ATP (pumps molecules against concentration gradient)
-\u21AA Cell Communication: Proteins act as receptors for hormones and neurotransmitters, allowing communication between cells. Glycoproteins and glycolipids on the surface facilitate cell identification.
+    def __init__(self, path=LEARN_MORE_PATH):
+        self.path = path
+        self._bodies = None   # topic -> zlib-compressed text
+        self._topics = None   # sorted topic names
+        self._index = None    # word -> {topic: score}
+        self._words = None    # sorted vocabulary, for prefix lookups
+
+    def _load(self):
+        with open(self.path, encoding='utf-8') as f:
+            parts = _TOPIC_HEADER.split(f.read())[1:]
+        bodies = {}
+        index = {}
+        for topic, text in zip(parts[::2], parts[1::2]):
+            bodies[topic] = zlib.compress(text.encode())
+            counts = index_words(text)
+            for word in _WORD.findall(topic):
+                counts[word] = counts.get(word, 0) + 10
+            for word, count in counts.items():
+                index.setdefault(word, {})[topic] = count
+        self._index = index
+        self._words = sorted(index)
+        self._topics = sorted(bodies)
+        self._bodies = bodies
+
+    def __getitem__(self, topic):
+        if self._bodies is None:
+            self._load()
+        return zlib.decompress(self._bodies[topic]).decode()
+
+    def __iter__(self):
+        if self._bodies is None:
+            self._load()
+        return iter(self._bodies)
+
+    def __len__(self):
+        if self._bodies is None:
+            self._load()
+        return len(self._bodies)
+
+    def _prefixed(self, names, prefix):
+        """Entries of the sorted list names that start with prefix"""
+        start = bisect_left(names, prefix)
+        end = bisect_left(names, prefix + "\uffff", start)
+        return names[start:end]
+
+    def search(self, query, limit=3):
+        """Best matching topics for query, best first (empty if nothing matches)"""
+        if self._bodies is None:
+            self._load()
+        query = " ".join(query.lower().split())
+        if not query:
+            return []
+        if query in self._bodies:
+            return [query]
+        topics = self._prefixed(self._topics, query)
+        if topics:
+            return topics[:limit]
+
+        scores = None
+        for word in _WORD.findall(query):
+            words = self._prefixed(self._words, word) or get_close_matches(word, self._words, n=3, cutoff=0.8)
+            found = {}
+            for match in words:
+                for topic, count in self._index[match].items():
+                    found[topic] = found.get(topic, 0) + count
+            if scores is None:
+                scores = found
+            else:
+                scores = {topic: score + found[topic] for topic, score in scores.items() if topic in found}
+        if not scores:
+            return []
+        return sorted(scores, key=lambda topic: (-scores[topic], topic))[:limit]
 
-\u235F In this game: The cell membrane controls nutrient import through active transport (costs ATP but brings more resources) or passive diffusion (free but slower). Membrane integrity naturally decays each turn and can be damaged by events. If a cell membrane breaks, or, in this case reaches zero, the cell dies! That's why Membrane Integrity is a lose condition in this game.
+LEARN_MORE = LearnStore()
 
-"""
-}
 
 # ============================================================================
 # I HOPE THIS MAKES SENSE
@@ -215,16 +166,18 @@ class CellState:
     """Manages all cell resources and status"""
     
     def __init__(self):
+        rules = RULES
+
         # Resources (0-5 dots each)
-        self.atp = 3          # Energy currency
-        self.glucose = 2      # Fuel for respiration
-        self.amino_acids = 3  # Building blocks for proteins
-        self.lipids = 3       # Membrane materials
-        
+        self.atp = rules.start_atp                  # Energy currency
+        self.glucose = rules.start_glucose          # Fuel for respiration
+        self.amino_acids = rules.start_amino_acids  # Building blocks for proteins
+        self.lipids = rules.start_lipids            # Membrane materials
+
         # Status (0-5 dots each)
-        self.health = 5       # Overall cell health
-        self.membrane = 4     # Membrane integrity
-        self.waste = 1        # Waste accumulation
+        self.health = rules.start_health            # Overall cell health
+        self.membrane = rules.start_membrane        # Membrane integrity
+        self.waste = rules.start_waste              # Waste accumulation
         
         # Turns
         self.turn = 1
@@ -232,6 +185,7 @@ class CellState:
         self.has_defender = False  # Defensive protein active
         self.enzyme_boost = False  # Metabolic enzyme active
         self.golgi_bonus = False   # Trade bonus active
+        self.effects = TimedEffects()  # Delayed cuts from events (see TIMED EFFECTS)
         
         # End game statistics
         self.stats = {
@@ -241,54 +195,21 @@ class CellState:
             'active_transports': 0,
             'passive_transports': 0
         }
+
+        # ReplayRecorder logging this game, if any (see REPLAY LOGS)
+        self.recorder = None
     
-    def display_dots(self, value, max_val=5):
-        """Convert numeric value to dot display (●●●○○)"""
-        filled = min(value, max_val)
-        empty = max_val - filled
-        return "●" * filled + "○" * empty
-    
-    def get_status_label(self, value, max_val=5):
+    def display_dots(self, value, max_val=None):
+        """Convert numeric value to dot display (●●●○○), or a bar for large scales"""
+        return meter_bar(value, RULES.max_value if max_val is None else max_val)
+
+    def get_status_label(self, value, max_val=None):
         """Get status label based on value"""
-        ratio = value / max_val
-        if ratio >= 0.8:
-            return "EXCELLENT"
-        elif ratio >= 0.6:
-            return "GOOD"
-        elif ratio >= 0.4:
-            return "STABLE"
-        elif ratio >= 0.2:
-            return "LOW"
-        else:
-            return "CRITICAL"
+        return status_label(value, RULES.max_value if max_val is None else max_val)
     
     def display_status(self):
         """Display current cell status"""
-        print("\n" + "="*60)
-        print(f"{'TURN ' + str(self.turn) + '/10':^60}")
-        print("="*60)
-        print("\nRESOURCES:")
-        print(f"  ATP (Energy):           {self.display_dots(self.atp)}  {self.get_status_label(self.atp)}")
-        print(f"  GLUCOSE (Fuel):         {self.display_dots(self.glucose)}  {self.get_status_label(self.glucose)}")
-        print(f"  AMINO ACIDS (Building): {self.display_dots(self.amino_acids)}  {self.get_status_label(self.amino_acids)}")
-        print(f"  LIPIDS (Membranes):     {self.display_dots(self.lipids)}  {self.get_status_label(self.lipids)}")
-        print("\nCELL STATUS:")
-        print(f"  CELL HEALTH:            {self.display_dots(self.health)}  {self.get_status_label(self.health)}")
-        print(f"  MEMBRANE INTEGRITY:     {self.display_dots(self.membrane)}  {self.get_status_label(self.membrane)}")
-        # Waste display (more waste is bad)
-        print("\n")
-        waste_status = "CLEAN" if self.waste <= 1 else "MODERATE" if self.waste <= 3 else "HIGH"
-        print(f"  WASTE LEVEL: {self.display_dots(self.waste)} {waste_status}")
-        
-        # Active effects
-        if self.has_defender:
-            print("\n  ACTIVE: Defensive Proteins (next event blocked!)")
-        if self.enzyme_boost:
-            print("  ACTIVE: Metabolic Enzymes (+1 ATP bonus this turn!)")
-        if self.golgi_bonus:
-            print("  ACTIVE: Golgi Trade Bonus (+1 Glucose next import!)")
-        
-        print()
+        write(render_status(self))
     
     def check_lose_conditions(self):
         """Check if player has lost the game"""
@@ -298,11 +219,11 @@ class CellState:
         # Membrane ≤ 0: Cell death due to membrane rupture
         if self.membrane <= 0:
             return True, "Membrane integrity reached 0! The cell has burst. "
-        # Energy crisis 
+        # Energy crisis
         if self.atp <= 0:
             self.atp_crisis_turns += 1
-            if self.atp_crisis_turns >= 2:
-                return True, "ATP depleted for 2 consecutive turns! Energy crisis. "
+            if self.atp_crisis_turns >= RULES.crisis_turns:
+                return True, f"ATP depleted for {RULES.crisis_turns} consecutive turns! Energy crisis. "
         else:
             self.atp_crisis_turns = 0
         
@@ -310,15 +231,219 @@ class CellState:
     
     def check_win_condition(self):
         """Check if player has won"""
-        return self.turn > 10
+        return self.turn > RULES.turns
+
+    # Rollback ----------------------------------------------------------------
+    # mark() returns a point to diff against or roll back to. Here that is
+    # a copy of every field; JournaledCell does the same in O(changes).
+
+    def mark(self):
+        """Point to compare against with changes() or roll back to with undo()"""
+        return dict(self.__dict__, stats=dict(self.stats), effects=self.effects.copy())
+
+    def changes(self, mark):
+        """{field: (old, new)} for every field (not stats or effects) changed since mark"""
+        fields = self.__dict__
+        return {name: (old, fields[name]) for name, old in mark.items()
+                if name not in ('stats', 'effects') and fields[name] != old}
+
+    def undo(self, mark):
+        """Roll every field, stats and effects included, back to mark"""
+        self.__dict__.update(mark)
+        self.stats = dict(mark['stats'])
+        self.effects = mark['effects'].copy()
+
+    def forget(self):
+        """Drop rollback history; a plain CellState keeps none"""
+
+
+# Journal "old value" of a key that did not exist yet: undo deletes it
+_ABSENT = object()
+
+class _JournaledStats(dict):
+    """CellState.stats that logs changes (new keys included) to its cell's journal"""
+
+    __slots__ = ('journal',)
+
+    def __setitem__(self, key, value):
+        self.journal.append((self, key, self.get(key, _ABSENT)))
+        dict.__setitem__(self, key, value)
+
+
+class JournaledCell(CellState):
+    """
+    CellState that logs every change (stats and effects included) to an
+    undo journal as (dict, key, old value) entries, with _ABSENT as the
+    old value of a key that was added, so mark(), changes() and undo()
+    cost O(changes since the mark) instead of copying the whole cell. Assignments cost a
+    few times more than on CellState, so the interactive game uses it and
+    the headless engine does not.
+    """
+
+    def __init__(self):
+        object.__setattr__(self, 'journal', [])
+        super().__init__()
+        stats = _JournaledStats(self.stats)
+        stats.journal = self.journal
+        self.stats = stats
+        self.effects = _JournaledEffects(self.journal)
+        self.journal.clear()
+
+    def __setattr__(self, name, value):
+        fields = self.__dict__
+        self.journal.append((fields, name, fields.get(name, _ABSENT)))
+        fields[name] = value
+
+    def mark(self):
+        return len(self.journal)
+
+    def changes(self, mark):
+        fields = self.__dict__
+        first = {}
+        for target, name, old in self.journal[mark:]:
+            if target is fields:
+                first.setdefault(name, old)
+        return {name: (None if old is _ABSENT else old, fields[name])
+                for name, old in first.items() if fields[name] != old}
+
+    def undo(self, mark):
+        journal = self.journal
+        while len(journal) > mark:
+            target, name, old = journal.pop()
+            if old is _ABSENT:
+                dict.pop(target, name, None)
+            else:
+                dict.__setitem__(target, name, old)
+
+    def forget(self):
+        """Keep the current state and drop the journal (and all earlier marks)"""
+        self.journal.clear()
 
 # ============================================================================
 # EVENTS SYSTEM
 # ============================================================================
 
-def get_event_for_turn(turn):
+# Every event in the game. Effects are declarative so the engine, the
+# batch simulator and the solver all read the same numbers:
+#   health/membrane/waste  change applied to that status (clipped to 0-5)
+#   sets                   CellState flags switched on
+#   blockable              Defensive Proteins block the whole event
+#   note                   extra warning line for events with no direct effect
+#   hint                   key into EVENT_HINTS ("How to respond")
+#   delayed                Delayed cuts to later imports or mitochondria uses
+#                          (see TIMED EFFECTS)
+Event = namedtuple('Event', 'id name description health membrane waste sets blockable note hint delayed')
+
+# What a delayed cut hits: the import phase or a mitochondria use
+ON_IMPORT = 'import'
+ON_MITOCHONDRIA = 'mitochondria'
+TRIGGERS = (ON_IMPORT, ON_MITOCHONDRIA)
+
+# A delayed effect: the next `uses` triggers yield `cut` less of resource
+# (times RULES.event_scale, never below 0)
+Delayed = namedtuple('Delayed', 'trigger resource cut uses')
+
+def _event(event_id, name, description, health=0, membrane=0, waste=0, sets=(),
+           blockable=False, note=None, hint=None, delayed=()):
+    return Event(event_id, name, description, health, membrane, waste, sets,
+                 blockable, note, hint, delayed)
+
+EVENTS = (
+    # Gentle events (turns 1-3)
+    _event(0, " Everything's Normal!", "No threats detected. Practice your strategy!"),
+    _event(1, " Nutrient Windfall!", "Extra nutrients float by from the environment!",
+           sets=('golgi_bonus',)),
+    _event(2, " Minor Membrane Wear", "Small wear on the phospholipid bilayer.",
+           membrane=-1, hint='membrane'),
+    _event(3, " Metabolic Waste Buildup", "Normal cellular processes produce waste.",
+           waste=1, hint='waste'),
+
+    # Moderate events (turns 4-7)
+    _event(4, " Toxic Exposure!", "Environmental toxins damage the cell!",
+           health=-1, waste=2, hint='toxin'),
+    _event(5, " Glucose Scarcity!", "Nutrient availability drops in environment!",
+           note="  Next import will yield less glucose!", hint='scarcity',
+           delayed=(Delayed(ON_IMPORT, 'glucose', 1, 1),)),
+    _event(6, " Oxidative Stress!", "Reactive oxygen species (ROS) damage structures!",
+           health=-1, membrane=-1, hint='toxin'),
+    _event(7, " Pathogen Detected!", "Harmful microorganism nearby!",
+           health=-1, blockable=True),
+    _event(8, " Membrane Breach!", "Phospholipid damage detected!",
+           membrane=-2, hint='membrane'),
+
+    # Severe events (turns 8-10)
+    _event(9, " SEVERE STARVATION!", "Critical nutrient shortage in environment!",
+           note=" Next 2 imports will be severely reduced!", hint='scarcity',
+           delayed=(Delayed(ON_IMPORT, 'glucose', 2, 2), Delayed(ON_IMPORT, 'amino_acids', 1, 2))),
+    _event(10, " TOXIC OVERLOAD!", "Multiple toxins attacking the cell!",
+           health=-2, membrane=-1, waste=3, hint='toxin'),
+    _event(11, " VIRAL ATTACK!", "Virus attempting to hijack cellular machinery!",
+           health=-2, blockable=True),
+    _event(12, " METABOLIC CRISIS!", "ATP production severely disrupted!",
+           note=" Mitochondria efficiency reduced next use!",
+           delayed=(Delayed(ON_MITOCHONDRIA, 'atp', 1, 1),)),
+    _event(13, " WASTE OVERLOAD!", "Cellular waste reaching critical levels!",
+           waste=3, hint='waste'),
+)
+
+GENTLE_EVENTS = EVENTS[0:4]
+MODERATE_EVENTS = EVENTS[4:9]
+SEVERE_EVENTS = EVENTS[9:14]
+ALL_EVENTS = EVENTS
+
+EVENT_HINTS = {
+    'toxin': ("Use RIBOSOMES → Structural Proteins to repair health",
+              "Use LYSOSOMES to clean up the extra waste"),
+    'membrane': ("Use SMOOTH ER to make lipids",
+                 "Use MEMBRANE REPAIR to restore integrity"),
+    'scarcity': ("Use GOLGI now for bonus glucose next turn",
+                 "Use LYSOSOMES to recycle amino acids",
+                 "Conserve ATP - use Passive Diffusion next import"),
+    'waste': ("Use LYSOSOMES immediately!",
+              "High waste damages health each turn"),
+}
+
+def _build_event_table(tier):
+    """
+    Every possible draw for a difficulty tier as (probability, events) pairs
+    """
+    if tier == 0:
+        # One gentle event
+        p = 1 / len(GENTLE_EVENTS)
+        return tuple((p, (event,)) for event in GENTLE_EVENTS)
+    elif tier == 1:
+        # 50% chance of 2 different moderate events
+        n = len(MODERATE_EVENTS)
+        single = tuple((0.5 / n, (event,)) for event in MODERATE_EVENTS)
+        pairs = tuple((0.5 / (n * (n - 1)), (first, second))
+                      for first in MODERATE_EVENTS for second in MODERATE_EVENTS
+                      if first is not second)
+        return single + pairs
+    else:
+        # 1 severe event + 1 random event from any tier
+        p = 1 / (len(SEVERE_EVENTS) * len(ALL_EVENTS))
+        return tuple((p, (severe, other)) for severe in SEVERE_EVENTS for other in ALL_EVENTS)
+
+EVENT_TABLES = tuple(_build_event_table(tier) for tier in range(3))
+EVENT_CUMULATIVE = tuple(tuple(accumulate(p for p, _ in table)) for table in EVENT_TABLES)
+
+def event_tier(turn):
+    """
+    Difficulty tier: 0 for the first 30% of the game (turns 1-3 of 10),
+    1 up to 70% (turns 4-7), 2 after that (turns 8-10)
+    """
+    turns = RULES.turns
+    if turn * 10 <= 3 * turns:
+        return 0
+    elif turn * 10 <= 7 * turns:
+        return 1
+    return 2
+
+def get_event_for_turn(turn, rng=random):
     """
     Get appropriate event(s) based on turn number
+    (rng can be any object with random(), e.g. random.Random(seed), or
+    an EventStream, which draws from the turn's own counter stream)
 
     DIFFICULTY SCALING:
     Turns 1-3: Tutorial
@@ -336,607 +461,2367 @@ def get_event_for_turn(turn):
     - Goal: Test mastery of all systems
     - Mimics how real cells face multiple simultaneous stresses
     """
-    
-    # Turns 1-3: Gentle introduction
-    if turn <= 3:
-        events = [
-            (" Everything's Normal!", "No threats detected. Practice your strategy!", None),
-            (" Nutrient Windfall!", "Extra nutrients float by from the environment!", 
-             lambda cell: setattr(cell, 'golgi_bonus', True)),
-            (" Minor Membrane Wear", "Small wear on the phospholipid bilayer.", 
-             lambda cell: setattr(cell, 'membrane', max(0, cell.membrane - 1))),
-            (" Metabolic Waste Buildup", "Normal cellular processes produce waste.", 
-             lambda cell: setattr(cell, 'waste', min(5, cell.waste + 1))),
-        ]
-        return [random.choice(events)]
-    
-    # Turns 4-7: Increased challenge
-    elif turn <= 7:
-        events = [
-            (" Toxic Exposure!", "Environmental toxins damage the cell!",
-             lambda cell: (setattr(cell, 'health', max(0, cell.health - 1)),
-                          setattr(cell, 'waste', min(5, cell.waste + 2)))),
-            (" Glucose Scarcity!", "Nutrient availability drops in environment!",
-             lambda cell: print("  Next import will yield less glucose!")),
-            (" Oxidative Stress!", "Reactive oxygen species (ROS) damage structures!",
-             lambda cell: (setattr(cell, 'health', max(0, cell.health - 1)),
-                          setattr(cell, 'membrane', max(0, cell.membrane - 1)))),
-            (" Pathogen Detected!", "Harmful microorganism nearby!",
-             lambda cell: None),  # Handled separately for defender check
-            (" Membrane Breach!", "Phospholipid damage detected!",
-             lambda cell: setattr(cell, 'membrane', max(0, cell.membrane - 2))),
-        ]
-        
-        # 50% chance of 2 events
-        if random.random() < 0.5:
-            return random.sample(events, 2)
-        return [random.choice(events)]
-    
-        # Turns 8-10: Survival mode
-    else:
-        # ONE severe event from survival pool
-        severe_events = [
-            (" SEVERE STARVATION!", "Critical nutrient shortage in environment!",
-             lambda cell: print(" Next 2 imports will be severely reduced!")),
-            (" TOXIC OVERLOAD!", "Multiple toxins attacking the cell!",
-             lambda cell: (setattr(cell, 'health', max(0, cell.health - 2)),
-                          setattr(cell, 'membrane', max(0, cell.membrane - 1)),
-                          setattr(cell, 'waste', min(5, cell.waste + 3)))),
-            (" VIRAL ATTACK!", "Virus attempting to hijack cellular machinery!",
-             lambda cell: None),  # Handled separately for defender check
-            (" METABOLIC CRISIS!", "ATP production severely disrupted!",
-             lambda cell: print(" Mitochondria efficiency reduced next use!")),
-            (" WASTE OVERLOAD!", "Cellular waste reaching critical levels!",
-             lambda cell: setattr(cell, 'waste', min(5, cell.waste + 3))),
-        ]
-        
-        # ONE event from ANY difficulty tier (gentle, moderate, or severe)
-        all_events = [
-            # Gentle events (from turns 1-3)
-            (" Everything's Normal!", "No threats detected. Practice your strategy!", None),
-            (" Nutrient Windfall!", "Extra nutrients float by from the environment!", 
-             lambda cell: setattr(cell, 'golgi_bonus', True)),
-            (" Minor Membrane Wear", "Small wear on the phospholipid bilayer.", 
-             lambda cell: setattr(cell, 'membrane', max(0, cell.membrane - 1))),
-            (" Metabolic Waste Buildup", "Normal cellular processes produce waste.", 
-             lambda cell: setattr(cell, 'waste', min(5, cell.waste + 1))),
-            
-            # Moderate events (from turns 4-7)
-            (" Toxic Exposure!", "Environmental toxins damage the cell!",
-             lambda cell: (setattr(cell, 'health', max(0, cell.health - 1)),
-                          setattr(cell, 'waste', min(5, cell.waste + 2)))),
-            (" Glucose Scarcity!", "Nutrient availability drops in environment!",
-             lambda cell: print(" Next import will yield less glucose!")),
-            (" Oxidative Stress!", "Reactive oxygen species (ROS) damage structures!",
-             lambda cell: (setattr(cell, 'health', max(0, cell.health - 1)),
-                          setattr(cell, 'membrane', max(0, cell.membrane - 1)))),
-            (" Pathogen Detected!", "Harmful microorganism nearby!",
-             lambda cell: None),  # Handled separately for defender check
-            (" Membrane Breach!", "Phospholipid damage detected!",
-             lambda cell: setattr(cell, 'membrane', max(0, cell.membrane - 2))),
-        ] + severe_events  # Add severe events to the pool
-        
-        # Pick 1 severe event + 1 random event from any tier
-        severe_event = random.choice(severe_events)
-        random_event = random.choice(all_events)
-        
-        # Return both events
-        return [severe_event, random_event]
+    if isinstance(rng, EventStream):
+        rng = rng.at(turn)
+    tier = event_tier(turn)
+    cumulative = EVENT_CUMULATIVE[tier]
+    draw = bisect_right(cumulative, rng.random() * cumulative[-1])
+    return EVENT_TABLES[tier][min(draw, len(cumulative) - 1)][1]
+
+def event_distribution(turn):
+    """
+    Every possible result of get_event_for_turn(turn) with its probability,
+    as (probability, events) pairs. Used by the solver.
+    """
+    return EVENT_TABLES[event_tier(turn)]
 
 # ============================================================================
-# ORGANELLE ACTIONS
+# EVENT STREAMS
+#    Counter-based randomness for events: every draw is a pure function
+#    of (seed, game, turn, slot), hashed with the SplitMix64 mixer, so
+#    any game's events on any turn can be generated directly, without
+#    replaying earlier draws. Simulations give game g of a seed the same
+#    events whichever worker plays it and whichever policy is playing
+#    (common random numbers). batch.py computes the same draws with NumPy.
 # ============================================================================
 
-def action_mitochondria(cell):
-    """Mitochondria: Cellular Respiration"""
-    print("\n  MITOCHONDRIA - Cellular Respiration")
-    print("Uses: 1 Glucose → Produces: 2 ATP")
-    print("Converts glucose into usable energy through cellular respiration.")
-    
-    if cell.glucose < 1:
-        print("  Not enough glucose!")
-        return False
-    
-    cell.glucose -= 1
-    atp_gain = 2
-    
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+
+def _mix64(key, part):
+    """Fold part into a 64-bit key (SplitMix64 step and finalizer)"""
+    x = ((key ^ part & _MASK64) + _GOLDEN) & _MASK64
+    x = (x ^ x >> 30) * 0xBF58476D1CE4E5B9 & _MASK64
+    x = (x ^ x >> 27) * 0x94D049BB133111EB & _MASK64
+    return x ^ x >> 31
+
+def counter_random(seed, game, turn, slot):
+    """The uniform [0, 1) draw number slot of a game's turn"""
+    return (_mix64(_mix64(_mix64(_mix64(0, seed), game), turn), slot) >> 11) / 2 ** 53
+
+
+class EventStream:
+    """
+    The event draws of one game. Pass it wherever an rng for events is
+    expected (get_event_for_turn, apply_events, play_game's events);
+    at(turn) gives that turn's draws directly.
+    """
+
+    __slots__ = ('seed', 'game', '_key')
+
+    def __init__(self, seed, game=0):
+        self.seed = seed
+        self.game = game
+        self._key = _mix64(_mix64(0, seed), game)
+
+    def at(self, turn):
+        return _TurnDraws(_mix64(self._key, turn))
+
+    def events(self, turn):
+        """What get_event_for_turn draws for this game on `turn`"""
+        return get_event_for_turn(turn, self)
+
+
+class _TurnDraws:
+    """Slots 0, 1, 2... of one turn's counter stream, as random() calls"""
+
+    __slots__ = ('key', 'slot')
+
+    def __init__(self, key):
+        self.key = key
+        self.slot = 0
+
+    def random(self):
+        x = _mix64(self.key, self.slot)
+        self.slot += 1
+        return (x >> 11) / 2 ** 53
+
+# ============================================================================
+# TIMED EFFECTS
+#    Some events strike later: Glucose Scarcity and SEVERE STARVATION cut
+#    the next imports, METABOLIC CRISIS the next mitochondria use. A cell
+#    keeps its pending cuts in one heap per trigger, keyed by the number
+#    of the trigger (first import, second import...) they are due at, so
+#    a trigger pops only the cuts due, O(log n) each, and nothing is
+#    scanned on turns where no cut applies however many are stacked.
+# ============================================================================
+
+# Every (trigger, resource, uses from now) a cut can be pending at, for
+# packed cells and batch.py: the 2nd use of SEVERE STARVATION's glucose
+# cut waits at ('import', 'glucose', 1)
+DELAYED_SLOTS = tuple(
+    (trigger, resource, offset)
+    for trigger, resource in dict.fromkeys((d.trigger, d.resource) for event in EVENTS
+                                           for d in event.delayed)
+    for offset in range(max(d.uses for event in EVENTS for d in event.delayed
+                            if (d.trigger, d.resource) == (trigger, resource)))
+)
+
+_NO_CUTS = {}
+_NONE_PENDING = (0,) * len(DELAYED_SLOTS)
+
+def delayed_cuts(event):
+    """Cut an event schedules at each of DELAYED_SLOTS, before event_scale"""
+    return tuple(sum(d.cut for d in event.delayed
+                     if (d.trigger, d.resource) == (trigger, resource) and offset < d.uses)
+                 for trigger, resource, offset in DELAYED_SLOTS)
+
+
+class TimedEffects:
+    """
+    Pending delayed cuts of one cell. heaps[trigger] holds (due, resource,
+    cut) entries, where due counts that trigger's uses; counts[trigger]
+    is how many have happened since its heap was last empty. queued is
+    the number of entries in all heaps, so callers can skip empty ones.
+    """
+
+    def __init__(self):
+        self.heaps = {trigger: [] for trigger in TRIGGERS}
+        self.counts = dict.fromkeys(TRIGGERS, 0)
+        self.queued = 0
+
+    def _changing(self, trigger):
+        """Called before heaps[trigger], counts[trigger] or queued change"""
+
+    def schedule(self, delayed, scale=1):
+        """Queue a Delayed cut for the next delayed.uses triggers"""
+        trigger = delayed.trigger
+        self._changing(trigger)
+        heap, count = self.heaps[trigger], self.counts[trigger]
+        for use in range(1, delayed.uses + 1):
+            heapq.heappush(heap, (count + use, delayed.resource, delayed.cut * scale))
+        self.queued += delayed.uses
+
+    def take(self, trigger):
+        """Count one use of trigger and pop the cuts due. Returns {resource: total cut}"""
+        heap = self.heaps[trigger]
+        if not heap:
+            return _NO_CUTS
+        self._changing(trigger)
+        count = self.counts[trigger] = self.counts[trigger] + 1
+        cuts = {}
+        while heap and heap[0][0] <= count:
+            _, resource, cut = heapq.heappop(heap)
+            cuts[resource] = cuts.get(resource, 0) + cut
+            self.queued -= 1
+        if not heap:
+            self.counts[trigger] = 0
+        return cuts
+
+    def pending(self):
+        """Total cut waiting at each of DELAYED_SLOTS"""
+        if not self.queued:
+            return _NONE_PENDING
+        totals = dict.fromkeys(DELAYED_SLOTS, 0)
+        for trigger, heap in self.heaps.items():
+            count = self.counts[trigger]
+            for due, resource, cut in heap:
+                totals[trigger, resource, due - count - 1] += cut
+        return tuple(totals.values())
+
+    def load(self, cuts):
+        """Replace everything pending with cuts, one per DELAYED_SLOTS entry"""
+        for trigger in TRIGGERS:
+            self._changing(trigger)
+            self.heaps[trigger] = []
+            self.counts[trigger] = 0
+        self.queued = 0
+        for (trigger, resource, offset), cut in zip(DELAYED_SLOTS, cuts):
+            if cut:
+                heapq.heappush(self.heaps[trigger], (offset + 1, resource, cut))
+                self.queued += 1
+
+    def copy(self):
+        clone = TimedEffects()
+        clone.heaps = {trigger: list(heap) for trigger, heap in self.heaps.items()}
+        clone.counts = dict(self.counts)
+        clone.queued = self.queued
+        return clone
+
+
+class _JournaledEffects(TimedEffects):
+    """TimedEffects of a JournaledCell: logs a trigger's heap and count before they change"""
+
+    def __init__(self, journal):
+        super().__init__()
+        self.journal = journal
+
+    def _changing(self, trigger):
+        journal = self.journal
+        journal.append((self.heaps, trigger, list(self.heaps[trigger])))
+        journal.append((self.counts, trigger, self.counts[trigger]))
+        journal.append((self.__dict__, 'queued', self.queued))
+
+# ============================================================================
+# RULES ENGINE
+#    Pure game rules: no print() or input() in here, so bots and
+#    simulations can drive a CellState directly. The interactive
+#    phases below call into these and only handle the terminal.
+# ============================================================================
+
+# Transport modes (Phase 1)
+ACTIVE_TRANSPORT = 'A'
+PASSIVE_DIFFUSION = 'B'
+
+# Organelle actions (Phase 3), numbered like the in-game menu
+MITOCHONDRIA = 1
+RIBOSOMES = 2
+SMOOTH_ER = 3
+LYSOSOMES = 4
+GOLGI = 5
+MEMBRANE_REPAIR = 6
+ORGANELLE_ACTIONS = (MITOCHONDRIA, RIBOSOMES, SMOOTH_ER, LYSOSOMES, GOLGI, MEMBRANE_REPAIR)
+
+# Ribosome protein types
+RIBOSOME_CHOICES = ('enzyme', 'health', 'membrane', 'defense')
+
+# Every number the rules use. The engine reads the module-level RULES, so
+# a variant is just RuleSet(mito_atp=3, ...) passed to use_rules() (or to
+# simulate()). Events keep their own numbers in EVENTS.
+RuleSet = namedtuple('RuleSet', (
+    'turns actions_per_turn max_value crisis_turns '
+    # New cell
+    'start_atp start_glucose start_amino_acids start_lipids start_health start_membrane start_waste '
+    # Phase 1: import
+    'active_cost active_glucose passive_glucose import_amino_acids golgi_glucose '
+    # Phase 3: organelles (costs, then what they make)
+    'mito_glucose mito_atp enzyme_atp mito_waste '
+    'protein_amino_acids protein_atp protein_health protein_membrane '
+    'er_glucose er_atp er_lipids '
+    'lyso_atp lyso_waste lyso_amino_acids '
+    'golgi_amino_acids golgi_atp '
+    'repair_lipids repair_membrane '
+    # Phase 4: maintenance (waste at or above waste_damage_at costs
+    # waste_damage health, at or above high_waste_at high_waste_damage)
+    'membrane_decay atp_upkeep waste_damage_at waste_damage high_waste_at high_waste_damage '
+    # Multiplier on every EVENTS effect; delayed_effects 0 leaves out the
+    # delayed cuts (as games were played before they existed)
+    'event_scale delayed_effects'
+), defaults=(
+    10, 3, 5, 2,
+    3, 2, 3, 3, 5, 4, 1,
+    1, 2, 1, 1, 1,
+    1, 2, 1, 1,
+    1, 1, 1, 1,
+    1, 1, 2,
+    1, 2, 1,
+    1, 1,
+    2, 1,
+    1, 1, 3, 1, 4, 2,
+    1, 1,
+))
+
+DEFAULT_RULES = RuleSet()
+RULES = DEFAULT_RULES
+
+# batch.py and the solver model the default rules only
+ACTIONS_PER_TURN = DEFAULT_RULES.actions_per_turn
+
+
+# RuleSet fields that are counts of turns or actions rather than amounts
+_UNSCALED_RULES = ('turns', 'actions_per_turn', 'crisis_turns', 'delayed_effects')
+
+def scaled_rules(scale=1, turns=None, rules=DEFAULT_RULES):
+    """
+    rules with every amount (caps, costs, yields, thresholds, event
+    effects) multiplied by scale, e.g. scale=200 for resources of 0-1000,
+    and optionally a different game length.
+    """
+    changes = {field: value * scale for field, value in rules._asdict().items()
+               if field not in _UNSCALED_RULES}
+    if turns is not None:
+        changes['turns'] = turns
+    return rules._replace(**changes)
+
+def check_rules(rules):
+    """Raise ValueError for a RuleSet the engine can't play"""
+    if rules.max_value < 1 or rules.turns < 1 or rules.crisis_turns < 1 or rules.actions_per_turn < 0:
+        raise ValueError(f"max_value, turns and crisis_turns must be at least 1 and actions_per_turn "
+                         f"at least 0, got {rules.max_value}, {rules.turns}, {rules.crisis_turns} "
+                         f"and {rules.actions_per_turn}")
+
+def use_rules(rules):
+    """
+    Make rules the RuleSet the engine plays by. Returns the previous one,
+    so callers can put it back. Caches built from the old rules are dropped.
+    """
+    global RULES, _MAINTENANCE_MESSAGES, _legality_table
+    check_rules(rules)
+    previous, RULES = RULES, rules
+    _MAINTENANCE_MESSAGES = _maintenance_messages(rules)
+    _set_layout(rules)
+    _set_screens(rules)
+    _legality_table = None
+    for cached in (_after_import, _after_action, _end_of_turn_score, _best_plan):
+        cached.cache_clear()
+    return previous
+
+@contextmanager
+def rules_in_use(rules):
+    """Play by rules inside a with block, then put the previous RuleSet back"""
+    if rules == RULES:
+        yield rules
+        return
+    previous = use_rules(rules)
+    try:
+        yield rules
+    finally:
+        use_rules(previous)
+
+
+def rules_hash(rules=None):
+    """Hash of a RuleSet (default: RULES) together with the engine code that reads it"""
+    digest = hashlib.sha256(repr(RULES if rules is None else rules).encode())
+    for part in (CellState.__init__, CellState.check_lose_conditions, CellState.check_win_condition,
+                 apply_import, apply_event, apply_events, can_act, apply_action, apply_maintenance,
+                 play_turn, play_game, get_event_for_turn, TimedEffects.schedule,
+                 TimedEffects.take, *_ACTION_RULES.values()):
+        digest.update(inspect.getsource(part).encode())
+    digest.update(repr((EVENTS, EVENT_TABLES)).encode())
+    return digest.hexdigest()[:16]
+
+
+def apply_import(cell, mode):
+    """
+    Phase 1 rules: import nutrients with ACTIVE_TRANSPORT or PASSIVE_DIFFUSION.
+    Active transport falls back to passive diffusion without ATP, and
+    delayed cuts due at this import (see TIMED EFFECTS) come off the yield.
+    Returns (mode used, glucose gained, amino acids gained, golgi bonus
+    used, {resource: cut applied})
+    """
+    if cell.recorder is not None:
+        cell.recorder.turn_start(cell)
+
+    rules = RULES
+    if mode == ACTIVE_TRANSPORT and cell.atp >= rules.active_cost:
+        cell.atp -= rules.active_cost
+        glucose_gain = rules.active_glucose
+        cell.stats['active_transports'] += 1
+    elif mode in (ACTIVE_TRANSPORT, PASSIVE_DIFFUSION):
+        mode = PASSIVE_DIFFUSION
+        glucose_gain = rules.passive_glucose
+        cell.stats['passive_transports'] += 1
+    else:
+        raise ValueError(f"Unknown transport mode: {mode!r}")
+    aa_gain = rules.import_amino_acids
+
+    # Apply Golgi bonus if active
+    golgi_used = cell.golgi_bonus
+    if golgi_used:
+        glucose_gain += rules.golgi_glucose
+        cell.golgi_bonus = False
+
+    cuts = cell.effects.take(ON_IMPORT) if cell.effects.queued else _NO_CUTS
+    if cuts:
+        cuts = {resource: min(cut, rules.max_value) for resource, cut in cuts.items()}
+        glucose_gain = max(0, glucose_gain - cuts.get('glucose', 0))
+        aa_gain = max(0, aa_gain - cuts.get('amino_acids', 0))
+
+    cell.glucose = min(rules.max_value, cell.glucose + glucose_gain)
+    cell.amino_acids = min(rules.max_value, cell.amino_acids + aa_gain)
+
+    if cell.recorder is not None:
+        cell.recorder.transport(mode)
+    return mode, glucose_gain, aa_gain, golgi_used, cuts
+
+
+def apply_event(cell, event):
+    """
+    Apply one Event from get_event_for_turn; its delayed cuts are queued
+    on cell.effects (unless RULES.delayed_effects is 0).
+    Returns a dict describing what happened, for display or logging.
+    """
+    result = {'id': event.id, 'name': event.name, 'description': event.description,
+              'note': event.note, 'blocked': False, 'damage': 0}
+
+    # Defensive proteins block the whole event
+    if event.blockable:
+        if cell.has_defender:
+            cell.has_defender = False
+            result['blocked'] = True
+            return result
+        result['damage'] = -event.health * RULES.event_scale
+
+    cap, scale = RULES.max_value, RULES.event_scale
+    if event.health:
+        cell.health = max(0, min(cap, cell.health + event.health * scale))
+    if event.membrane:
+        cell.membrane = max(0, min(cap, cell.membrane + event.membrane * scale))
+    if event.waste:
+        cell.waste = max(0, min(cap, cell.waste + event.waste * scale))
+    for flag in event.sets:
+        setattr(cell, flag, True)
+    if event.delayed and RULES.delayed_effects:
+        for delayed in event.delayed:
+            cell.effects.schedule(delayed, scale)
+    return result
+
+
+def apply_events(cell, rng=random):
+    """
+    Phase 2 rules: draw this turn's events (from rng, a random.Random or
+    an EventStream) and apply them in order
+    """
+    events = get_event_for_turn(cell.turn, rng)
+    if cell.recorder is not None:
+        cell.recorder.events(events)
+    return [apply_event(cell, event) for event in events]
+
+
+def _mitochondria(cell, subchoice):
+    rules = RULES
+    if cell.glucose < rules.mito_glucose:
+        return False, "  Not enough glucose!"
+
+    cell.glucose -= rules.mito_glucose
+    atp_gain = rules.mito_atp
+    message = ""
+
     # Enzyme boost effect
     if cell.enzyme_boost:
-        atp_gain += 1
-        print("  Metabolic enzyme boost active! +1 extra ATP")
+        atp_gain += rules.enzyme_atp
+        message = f"  Metabolic enzyme boost active! +{rules.enzyme_atp} extra ATP\n"
         cell.enzyme_boost = False
-    
-    cell.atp = min(5, cell.atp + atp_gain)
-    cell.waste = min(5, cell.waste + 1)  # Respiration produces some waste
+
+    # Metabolic crisis
+    if cell.effects.queued:
+        cut = min(cell.effects.take(ON_MITOCHONDRIA).get('atp', 0), rules.max_value)
+        if cut:
+            atp_gain = max(0, atp_gain - cut)
+            message += f"  Metabolic crisis! Mitochondria made {cut} less ATP\n"
+
+    cell.atp = min(rules.max_value, cell.atp + atp_gain)
+    cell.waste = min(rules.max_value, cell.waste + rules.mito_waste)  # Respiration produces some waste
     cell.stats['atp_generated'] += atp_gain
-    
-    print(f"✓ Generated {atp_gain} ATP! (Waste +1)")
-    return True
+    return True, message + f"✓ Generated {atp_gain} ATP! (Waste +{rules.mito_waste})"
 
-def action_ribosomes(cell):
-    """Ribosomes: Protein Synthesis"""
-    print("\n  RIBOSOMES - Protein Synthesis")
-    print("Uses: 1 Amino Acid + 1 ATP")
-    print("\nChoose protein type:")
-    print("1. Metabolic Enzymes - Boost next ATP production (+1 ATP)")
-    print("2. Structural Proteins - Repair damage (+1 Health OR Membrane)")
-    print("3. Defensive Proteins - Block next harmful event")
-    
-    if cell.amino_acids < 1 or cell.atp < 1:
-        print("  Not enough resources! Need 1 Amino Acid + 1 ATP")
-        return False
-    
-    choice = input("Choose (1/2/3): ").strip()
-    
-    if choice == '1':
+
+def _ribosomes(cell, subchoice):
+    rules = RULES
+    if cell.amino_acids < rules.protein_amino_acids or cell.atp < rules.protein_atp:
+        return False, (f"  Not enough resources! Need {rules.protein_amino_acids} Amino Acid"
+                       f" + {rules.protein_atp} ATP")
+
+    if subchoice == 'enzyme':
         cell.enzyme_boost = True
-        print("✓ Synthesized Metabolic Enzymes! Next mitochondria action gets +1 ATP")
-    elif choice == '2':
-        repair_choice = input("Repair Health or Membrane? (h/m): ").strip().lower()
-        if repair_choice == 'h':
-            cell.health = min(5, cell.health + 1)
-            print("✓ Synthesized Structural Proteins! Health +1")
-        else:
-            cell.membrane = min(5, cell.membrane + 1)
-            print("✓ Synthesized Structural Proteins! Membrane +1")
-    elif choice == '3':
+        message = f"✓ Synthesized Metabolic Enzymes! Next mitochondria action gets +{rules.enzyme_atp} ATP"
+    elif subchoice == 'health':
+        cell.health = min(rules.max_value, cell.health + rules.protein_health)
+        message = f"✓ Synthesized Structural Proteins! Health +{rules.protein_health}"
+    elif subchoice == 'membrane':
+        cell.membrane = min(rules.max_value, cell.membrane + rules.protein_membrane)
+        message = f"✓ Synthesized Structural Proteins! Membrane +{rules.protein_membrane}"
+    elif subchoice == 'defense':
         cell.has_defender = True
-        print("✓ Synthesized Defensive Proteins! Next event will be blocked")
+        message = "✓ Synthesized Defensive Proteins! Next event will be blocked"
     else:
-        print("Invalid choice!")
-        return False
-    
-    cell.amino_acids -= 1
-    cell.atp -= 1
+        return False, "Invalid choice!"
+
+    cell.amino_acids -= rules.protein_amino_acids
+    cell.atp -= rules.protein_atp
     cell.stats['proteins_made'] += 1
-    return True
+    return True, message
 
-def action_smooth_er(cell):
-    """Smooth ER: Lipid Synthesis"""
-    print("\n  SMOOTH ER - Lipid Synthesis")
-    print("Uses: 1 Glucose + 1 ATP → Produces: 2 Lipids")
-    print("Manufactures phospholipids for cell membrane maintenance.")
-    
-    if cell.glucose < 1 or cell.atp < 1:
-        print("  Not enough resources! Need 1 Glucose + 1 ATP")
-        return False
-    
-    cell.glucose -= 1
-    cell.atp -= 1
-    cell.lipids = min(5, cell.lipids + 2)
-    
-    print("✓ Synthesized 2 Lipids!")
-    return True
 
-def action_lysosomes(cell):
-    """Lysosomes: Waste Digestion & Recycling"""
-    print("\n  LYSOSOMES - Waste Digestion & Autophagy")
-    print("Uses: 1 ATP → Removes: 2 Waste, Produces: 1 Amino Acid")
-    print("Breaks down cellular waste and recycles components!")
-    
-    if cell.atp < 1:
-        print("  Not enough ATP!")
-        return False
-    
+def _smooth_er(cell, subchoice):
+    rules = RULES
+    if cell.glucose < rules.er_glucose or cell.atp < rules.er_atp:
+        return False, f"  Not enough resources! Need {rules.er_glucose} Glucose + {rules.er_atp} ATP"
+
+    cell.glucose -= rules.er_glucose
+    cell.atp -= rules.er_atp
+    cell.lipids = min(rules.max_value, cell.lipids + rules.er_lipids)
+    return True, f"✓ Synthesized {rules.er_lipids} Lipids!"
+
+
+def _lysosomes(cell, subchoice):
+    rules = RULES
+    if cell.atp < rules.lyso_atp:
+        return False, "  Not enough ATP!"
     if cell.waste == 0:
-        print("  No waste to clean!")
-        return False
-    
-    cell.atp -= 1
-    cell.waste = max(0, cell.waste - 2)
-    cell.amino_acids = min(5, cell.amino_acids + 1)
-    cell.stats['waste_cleaned'] += 2
-    
-    print("✓ Digested waste and recycled 1 Amino Acid!")
-    return True
+        return False, "  No waste to clean!"
 
-def action_golgi(cell):
-    """Golgi: Package & Export"""
-    print("\n  GOLGI APPARATUS - Package & Export Proteins")
-    print("Uses: 1 Amino Acid + 1 ATP")
-    print("Export proteins for trade: Next import gets +1 Glucose bonus!")
-    
-    if cell.amino_acids < 1 or cell.atp < 1:
-        print("  Not enough resources! Need 1 Amino Acid + 1 ATP")
-        return False
-    
-    cell.amino_acids -= 1
-    cell.atp -= 1
+    cell.atp -= rules.lyso_atp
+    cell.waste = max(0, cell.waste - rules.lyso_waste)
+    cell.amino_acids = min(rules.max_value, cell.amino_acids + rules.lyso_amino_acids)
+    cell.stats['waste_cleaned'] += rules.lyso_waste
+    return True, f"✓ Digested waste and recycled {rules.lyso_amino_acids} Amino Acid!"
+
+
+def _golgi(cell, subchoice):
+    rules = RULES
+    if cell.amino_acids < rules.golgi_amino_acids or cell.atp < rules.golgi_atp:
+        return False, (f"  Not enough resources! Need {rules.golgi_amino_acids} Amino Acid"
+                       f" + {rules.golgi_atp} ATP")
+
+    cell.amino_acids -= rules.golgi_amino_acids
+    cell.atp -= rules.golgi_atp
     cell.golgi_bonus = True
-    
-    print("✓ Packaged proteins for export! Next import gets bonus glucose")
-    return True
+    return True, "✓ Packaged proteins for export! Next import gets bonus glucose"
 
-def action_membrane_repair(cell):
-    """Membrane: Direct Lipid Repair"""
-    print("\n  MEMBRANE REPAIR - Phospholipid Replacement")
-    print("Uses: 2 Lipids → Restores: 1 Membrane Integrity")
-    print("Directly repair the phospholipid bilayer.")
-    
-    if cell.lipids < 2:
-        print("  Not enough lipids! Need 2 Lipids")
-        return False
-    
-    cell.lipids -= 2
-    cell.membrane = min(5, cell.membrane + 1)
-    
-    print("✓ Repaired membrane structure!")
-    return True
 
-# ============================================================================
-# GAME PHASES
-# ============================================================================
+def _membrane_repair(cell, subchoice):
+    rules = RULES
+    if cell.lipids < rules.repair_lipids:
+        return False, f"  Not enough lipids! Need {rules.repair_lipids} Lipids"
 
-def import_phase(cell):
-    """Phase 1: Import nutrients from environment"""
-    print("\n" + "="*60)
-    print("PHASE 1: NUTRIENT IMPORT")
-    print("="*60)
-    print("\nThe cell membrane controls what enters the cell.")
-    print("Choose your transport method:\n")
-    print("A.   ACTIVE TRANSPORT - Costs 1 ATP")
-    print("   Uses ATP-powered pumps to import: 2 Glucose + 1 Amino Acid")
-    print("   (Pumps molecules AGAINST concentration gradient)\n")
-    print("B.   PASSIVE DIFFUSION - FREE")
-    print("   Molecules naturally flow in: 1 Glucose + 1 Amino Acid")
-    print("   (Slower, but no energy cost)\n")
-    
-    while True:
-        choice = input("Choose (A/B): ").strip().upper()
-        
-        if choice == 'A':
-            if cell.atp < 1:
-                print("  Not enough ATP for active transport!")
-                print("Falling back to passive diffusion...\n")
-                choice = 'B'
-            else:
-                cell.atp -= 1
-                glucose_gain = 2
-                aa_gain = 1
-                cell.stats['active_transports'] += 1
-                print("\n✓ Active transport engaged!")
-                break
-        
-        if choice == 'B':
-            glucose_gain = 1
-            aa_gain = 1
-            cell.stats['passive_transports'] += 1
-            print("\n✓ Passive diffusion occurring...")
-            break
-        
-        print("Invalid choice! Please enter A or B")
-    
-    # Apply Golgi bonus if active
-    if cell.golgi_bonus:
-        glucose_gain += 1
-        print("  Golgi trade bonus applied! +1 extra Glucose")
-        cell.golgi_bonus = False
-    
-    cell.glucose = min(5, cell.glucose + glucose_gain)
-    cell.amino_acids = min(5, cell.amino_acids + aa_gain)
-    
-    print(f"Imported: {glucose_gain} Glucose, {aa_gain} Amino Acids")
-    input("\nPress ENTER to continue...")
+    cell.lipids -= rules.repair_lipids
+    cell.membrane = min(rules.max_value, cell.membrane + rules.repair_membrane)
+    return True, "✓ Repaired membrane structure!"
 
-def event_phase(cell):
-    """Phase 2: Random stress events"""
-    print("\n" + "="*60)
-    print("PHASE 2: CELLULAR EVENTS")
-    print("="*60)
-    
-    events = get_event_for_turn(cell.turn)
-    
-    for event_name, event_desc, event_effect in events:
-        print(f"\n  EVENT: {event_name}")
-        print(f"   {event_desc}")
-        
-        # Special handling for pathogen events (check defender)
-        if "Pathogen" in event_name or "Viral" in event_name:
-            if cell.has_defender:
-                print("     Defensive Proteins activated! Attack blocked!")
-                cell.has_defender = False
-            else:
-                damage = 2 if "VIRAL" in event_name else 1
-                cell.health = max(0, cell.health - damage)
-                print(f"     No defensive proteins! Health -{damage}")
-        elif event_effect:
-            event_effect(cell)
 
-        #Helpful Hints
-        if "Toxic" in event_name or "Oxidative" in event_name:
-            print("\n      How to respond:")
-            print("      • Use RIBOSOMES → Structural Proteins to repair health")
-            print("      • Use LYSOSOMES to clean up the extra waste")
-        
-        elif "Membrane" in event_name:
-            print("\n      How to respond:")
-            print("      • Use SMOOTH ER to make lipids")
-            print("      • Use MEMBRANE REPAIR to restore integrity")
-        
-        elif "Scarcity" in event_name or "Starvation" in event_name:
-            print("\n      How to respond:")
-            print("      • Use GOLGI now for bonus glucose next turn")
-            print("      • Use LYSOSOMES to recycle amino acids")
-            print("      • Conserve ATP - use Passive Diffusion next import")
-        
-        elif "Waste" in event_name:
-            print("\n      How to respond:")
-            print("      • Use LYSOSOMES immediately!")
-            print("      • High waste damages health each turn")
-    
-    input("\nPress ENTER to continue...")
-
-def action_phase(cell):
-    """Phase 3: Player chooses organelle actions"""
-    print("\n" + "="*60)
-    print("PHASE 3: ORGANELLE ACTIONS")
-    print("="*60)
-    print("\nYou can use 3 ORGANELLES this turn.")
-    print("\nChoose wisely to keep your cell alive!\n")
-
-    #Turn Order
-    print("  WHAT HAPPENS EACH TURN:")
-    print("  ✓ Import nutrients (Phase 1)")
-    print("  ✓ Events occur (Phase 2)")
-    print("  → Choose 3 organelle actions (Phase 3) ← YOU ARE HERE")
-    print("  → Automatic maintenance:")
-    print("      • Membrane -1 (natural decay)")
-    print("      • ATP -1 (basic functions)")
-    if cell.waste >= 3:
-        print(f"      • Waste damaging health (currently -{2 if cell.waste >= 4 else 1})")
-    print()
-
-    actions_remaining = 3
-
-    def show_compact_status():
-        """Display compact resource bar at top of menu"""
-        print("CELL STATUS")
-        print(f" ATP:       {cell.display_dots(cell.atp)}")
-        print(f" Glucose:   {cell.display_dots(cell.glucose)}")
-        print(f" Amino:     {cell.display_dots(cell.amino_acids)}")
-        print(f" Lipids:    {cell.display_dots(cell.lipids)}")
-        print(f" Health:    {cell.display_dots(cell.health)}")
-        print(f" Membrane:  {cell.display_dots(cell.membrane)}")
-
-        # Show waste warning if high
-        waste_display = f"Waste: {cell.display_dots(cell.waste)}"
-        if cell.waste >= 3:
-            waste_display += " (HIGH!)"
-        print(f" {waste_display:<55}\n")
-
-    def show_warnings_and_tips():
-        """Display contextual warnings based on current cell state"""
-        warnings = []
-        tips = []
-        
-        # Check for critical conditions
-        if cell.atp <= 1:
-            warnings.append("ATP is CRITICAL! Generate energy NOW or enter crisis mode")
-        elif cell.atp <= 2:
-            warnings.append("ATP is LOW! Consider using Mitochondria")
-        
-        if cell.waste >= 4:
-            warnings.append("Waste is VERY HIGH! Damaging health each turn (-2)")
-        elif cell.waste >= 3:
-            warnings.append("Waste is HIGH (≥3)! Currently damaging health (-1/turn)")
-        
-        if cell.membrane <= 1:
-            warnings.append("Membrane CRITICAL! Cell will burst at 0!")
-        
-        elif cell.membrane <= 2:
-            warnings.append("Membrane is LOW! Consider making lipids or repairing")
-        
-        if cell.health <= 2:
-            warnings.append("Health is LOW! Make Structural Proteins to recover")
-        
-        # Strategic tips
-        if cell.has_defender:
-            tips.append("You have Defensive Protein active - next event blocked!")
-        
-        if cell.enzyme_boost:
-            tips.append("Metabolic enzyme ready - next Mitochondria gives +1 ATP bonus!")
-        
-        if cell.golgi_bonus:
-            tips.append("Golgi bonus active - next import gives +1 Glucose!")
-        
-        if cell.glucose >= 4 and cell.atp >= 3:
-            tips.append("Good resource levels! You're in a strong position")
-        
-        # Display warnings
-        if warnings:
-            print("\n   CRITICAL WARNINGS:")
-            for warning in warnings:
-                print(f"  • {warning}")
-        
-        # Display tips
-        if tips:
-            print("\n  STRATEGIC INFO:")
-            for tip in tips:
-                print(f"  • {tip}")
-        
-        print()  # Blank line for spacing
+_ACTION_RULES = {
+    MITOCHONDRIA: _mitochondria,
+    RIBOSOMES: _ribosomes,
+    SMOOTH_ER: _smooth_er,
+    LYSOSOMES: _lysosomes,
+    GOLGI: _golgi,
+    MEMBRANE_REPAIR: _membrane_repair,
+}
 
-    def show_action_result(before_atp, before_glucose, before_aa, before_lipids, before_waste):
-        """Show before/after comparison after an action"""
-        print("\n" + "-"*60)
-        print("RESULT:")
-        
-        # Show resources that changed only
-        changes = []
-        if cell.atp != before_atp:
-            changes.append(f"  ATP: {cell.display_dots(before_atp)} → {cell.display_dots(cell.atp)}")
-        if cell.glucose != before_glucose:
-            changes.append(f"  Glucose: {cell.display_dots(before_glucose)} → {cell.display_dots(cell.glucose)}")
-        if cell.amino_acids != before_aa:
-            changes.append(f"  Amino Acids: {cell.display_dots(before_aa)} → {cell.display_dots(cell.amino_acids)}")
-        if cell.lipids != before_lipids:
-            changes.append(f"  Lipids: {cell.display_dots(before_lipids)} → {cell.display_dots(cell.lipids)}")
-        if cell.waste != before_waste:
-            changes.append(f"  Waste: {cell.display_dots(before_waste)} → {cell.display_dots(cell.waste)}")
-        
-        for change in changes:
-            print(f"  {change}")
-        
-        print("-"*60)
+
+def can_act(cell, action):
+    """True if the cell has the resources for this organelle action"""
+    rules = RULES
+    if action == MITOCHONDRIA:
+        return cell.glucose >= rules.mito_glucose
+    if action == RIBOSOMES:
+        return cell.amino_acids >= rules.protein_amino_acids and cell.atp >= rules.protein_atp
+    if action == GOLGI:
+        return cell.amino_acids >= rules.golgi_amino_acids and cell.atp >= rules.golgi_atp
+    if action == SMOOTH_ER:
+        return cell.glucose >= rules.er_glucose and cell.atp >= rules.er_atp
+    if action == LYSOSOMES:
+        return cell.atp >= rules.lyso_atp and cell.waste > 0
+    if action == MEMBRANE_REPAIR:
+        return cell.lipids >= rules.repair_lipids
+    return False
+
+
+def apply_action(cell, action, subchoice=None):
+    """
+    Phase 3 rules: use one organelle (MITOCHONDRIA ... MEMBRANE_REPAIR).
+    subchoice is one of RIBOSOME_CHOICES for RIBOSOMES, ignored otherwise.
+    Returns (success, message); nothing changes when success is False.
+    """
+    rule = _ACTION_RULES.get(action)
+    if rule is None:
+        return False, "Invalid choice!"
+    success, message = rule(cell, subchoice)
+    if success and cell.recorder is not None:
+        cell.recorder.action(action, subchoice)
+    return success, message
+
+
+def _maintenance_messages(rules):
+    return (f"  Membrane naturally decayed (-{rules.membrane_decay}) - lipid turnover",
+            f"  Basic cellular functions consumed ATP (-{rules.atp_upkeep})",
+            f"  HIGH waste levels damaged cell health (-{rules.high_waste_damage})!",
+            f"  Waste accumulation damaged health (-{rules.waste_damage})")
+
+_MAINTENANCE_MESSAGES = _maintenance_messages(DEFAULT_RULES)
+
+def apply_maintenance(cell):
+    """Phase 4 rules: automatic upkeep. Returns the list of changes applied"""
+    rules = RULES
+    decay, upkeep, high_waste, waste = _MAINTENANCE_MESSAGES
+    changes = []
+
+    # Membrane naturally decays (lipid turnover)
+    cell.membrane = max(0, cell.membrane - rules.membrane_decay)
+    changes.append(decay)
+
+    # Base ATP upkeep
+    cell.atp = max(0, cell.atp - rules.atp_upkeep)
+    changes.append(upkeep)
+
+    # Waste damage to health
+    if cell.waste >= rules.high_waste_at:
+        cell.health = max(0, cell.health - rules.high_waste_damage)
+        changes.append(high_waste)
+    elif cell.waste >= rules.waste_damage_at:
+        cell.health = max(0, cell.health - rules.waste_damage)
+        changes.append(waste)
+
+    return changes
+
+
+def play_turn(cell, policy, rng=random, events=None):
+    """
+    Run one full turn without any I/O, in the same order as main().
+
+    policy is a Policy (see BOTS): it picks the transport mode before
+    import and (action, subchoice) pairs after the events, from read-only
+    views of the cell; only the first RULES.actions_per_turn successful
+    actions count, failed ones are skipped. Events are drawn from events
+    (e.g. an EventStream) if given, otherwise from rng like the policy.
+    Returns (lost, reason); cell.turn advances if the cell survived.
+    """
+    # One view for the whole turn, repacked after the events
+    view = PackedCell(pack_cell(cell))
+    apply_import(cell, policy.transport(view, rng))
+    apply_events(cell, rng if events is None else events)
+
+    lost, reason = cell.check_lose_conditions()
+    if lost:
+        return lost, reason
+
+    view.bits = pack_cell(cell)
+    limit = RULES.actions_per_turn
+    used = 0
+    for action, subchoice in policy.actions(view, legal_choices(view), rng):
+        if used == limit:
+            break
+        if apply_action(cell, action, subchoice)[0]:
+            used += 1
+
+    apply_maintenance(cell)
+
+    lost, reason = cell.check_lose_conditions()
+    if not lost:
+        cell.turn += 1
+    return lost, reason
+
+
+def play_game(policy, rng=random, recorder=None, events=None):
+    """Play a whole game headless (events as in play_turn). Returns (cell, won, loss reason)"""
+    cell = CellState()
+    cell.recorder = recorder
+    won, reason = True, ""
+    while not cell.check_win_condition():
+        lost, reason = play_turn(cell, policy, rng, events)
+        if lost:
+            won = False
+            break
+    if recorder is not None:
+        recorder.finish(cell, won)
+    return cell, won, reason
+
+
+# ============================================================================
+# COMPACT STATE
+#    A whole CellState (minus the end-game stats) packed into one int, for
+#    search and caching where states get copied, hashed and stored a lot.
+#    Field widths follow RULES: w bits hold 0..max_value (3 for 0-5, 10
+#    for 0-1000), and the turn gets enough bits for RULES.turns. With the
+#    default rules:
+#
+#    bits  0-14  atp, glucose, amino_acids, lipids, waste (3 bits each)
+#    bits 15-20  health, membrane (3 bits each)
+#    bits 21-23  has_defender, enzyme_boost, golgi_bonus
+#    bits 24-25  atp_crisis_turns
+#    bits 26-29  turn
+#    bits 30-44  pending delayed cuts, one DELAYED_SLOTS entry each
+#                (3 bits, capped at max_value like the cut itself)
+#
+#    The low 5*w bits are exactly the fields the action and transport
+#    checks read, so for small scales legality is one table lookup.
+# ============================================================================
+
+PACKED_FIELDS = ('atp', 'glucose', 'amino_acids', 'lipids', 'waste', 'health', 'membrane')
+PACKED_FLAGS = ('has_defender', 'enzyme_boost', 'golgi_bonus')
+
+# Transport mask bits
+ACTIVE_BIT = 1
+PASSIVE_BIT = 2
+
+# Largest legality table built (2 bytes per entry); above this the
+# checks run on the unpacked fields instead
+_LEGALITY_TABLE_BITS = 15
+
+def _set_layout(rules):
+    """Bit layout of packed cells for a RuleSet"""
+    global _WIDTH, _MASK, _FIELD_SHIFT, _FLAG_SHIFT, _CRISIS_SHIFT, _CRISIS_MASK
+    global _TURN_SHIFT, _TURN_MASK, _EFFECT_SHIFT, _LEGALITY_BITS
+    _WIDTH = rules.max_value.bit_length()
+    _MASK = (1 << _WIDTH) - 1
+    _FIELD_SHIFT = {name: _WIDTH * i for i, name in enumerate(PACKED_FIELDS)}
+    _FLAG_SHIFT = {name: _WIDTH * len(PACKED_FIELDS) + i for i, name in enumerate(PACKED_FLAGS)}
+    _CRISIS_SHIFT = _WIDTH * len(PACKED_FIELDS) + len(PACKED_FLAGS)
+    _CRISIS_MASK = (1 << rules.crisis_turns.bit_length()) - 1
+    _TURN_SHIFT = _CRISIS_SHIFT + rules.crisis_turns.bit_length()
+    _TURN_MASK = (1 << (rules.turns + 1).bit_length()) - 1
+    _EFFECT_SHIFT = _TURN_SHIFT + (rules.turns + 1).bit_length()
+    _LEGALITY_BITS = 5 * _WIDTH
+
+_set_layout(DEFAULT_RULES)
+
+_legality_table = None
+
+def pack_cell(cell):
+    """Pack a CellState into an int"""
+    w, flags = _WIDTH, _CRISIS_SHIFT - 3
+    bits = (cell.atp | cell.glucose << w | cell.amino_acids << 2 * w | cell.lipids << 3 * w
+            | cell.waste << 4 * w | cell.health << 5 * w | cell.membrane << 6 * w
+            | cell.has_defender << flags | cell.enzyme_boost << flags + 1
+            | cell.golgi_bonus << flags + 2
+            | cell.atp_crisis_turns << _CRISIS_SHIFT | cell.turn << _TURN_SHIFT)
+    if cell.effects.queued:
+        cap, shift = RULES.max_value, _EFFECT_SHIFT
+        for cut in cell.effects.pending():
+            bits |= min(cut, cap) << shift
+            shift += w
+    return bits
+
+def packed_cuts(bits):
+    """Pending cut at each of DELAYED_SLOTS in packed bits"""
+    bits >>= _EFFECT_SHIFT
+    return tuple(bits >> _WIDTH * i & _MASK for i in range(len(DELAYED_SLOTS)))
+
+def unpack_cell(bits, cell=None):
+    """Load packed bits into cell (a new CellState by default). Stats are not packed"""
+    if cell is None:
+        cell = CellState()
+    w, mask, flags = _WIDTH, _MASK, _CRISIS_SHIFT - 3
+    cell.atp = bits & mask
+    cell.glucose = bits >> w & mask
+    cell.amino_acids = bits >> 2 * w & mask
+    cell.lipids = bits >> 3 * w & mask
+    cell.waste = bits >> 4 * w & mask
+    cell.health = bits >> 5 * w & mask
+    cell.membrane = bits >> 6 * w & mask
+    cell.has_defender = bool(bits >> flags & 1)
+    cell.enzyme_boost = bool(bits >> flags + 1 & 1)
+    cell.golgi_bonus = bool(bits >> flags + 2 & 1)
+    cell.atp_crisis_turns = bits >> _CRISIS_SHIFT & _CRISIS_MASK
+    cell.turn = bits >> _TURN_SHIFT & _TURN_MASK
+    if bits >> _EFFECT_SHIFT or cell.effects.queued:
+        cell.effects.load(packed_cuts(bits))
+    return cell
+
+def _legality(cell):
+    """(organelle action mask, transport mask) of a cell, straight from the rules"""
+    mask = 0
+    for action in ORGANELLE_ACTIONS:
+        if can_act(cell, action):
+            mask |= 1 << (action - 1)
+    return mask, PASSIVE_BIT | (ACTIVE_BIT if cell.atp >= RULES.active_cost else 0)
+
+def _build_legality_table():
+    """
+    For every value of the low 5*w bits: organelle action mask (bit a-1
+    set when action a is legal) in the low byte, transport mask above it.
+    Built once from can_act so it can never disagree with the rules.
+    """
+    table = bytearray(2 * (1 << _LEGALITY_BITS))
+    cell = CellState()
+    for low in range(1 << _LEGALITY_BITS):
+        unpack_cell(low, cell)
+        if max(cell.atp, cell.glucose, cell.amino_acids, cell.lipids, cell.waste) > RULES.max_value:
+            continue
+        table[2 * low], table[2 * low + 1] = _legality(cell)
+    return bytes(table)
+
+def _legality_index(bits):
+    global _legality_table
+    if _legality_table is None:
+        _legality_table = _build_legality_table()
+    return 2 * (bits & ((1 << _LEGALITY_BITS) - 1))
+
+def _masks(bits):
+    """(action mask, transport mask) of packed bits, by table when the scale allows"""
+    if _LEGALITY_BITS <= _LEGALITY_TABLE_BITS:
+        i = _legality_index(bits)
+        return _legality_table[i], _legality_table[i + 1]
+    return _legality(unpack_cell(bits, _LEGALITY_CELL))
+
+_LEGALITY_CELL = CellState()
+
+
+class PackedCell:
+    """
+    Hashable CellState packed into a single int. Treat it as immutable:
+    only play_turn() repacks its own per-turn view in place.
+    """
+
+    __slots__ = ('bits',)
+
+    def __init__(self, bits):
+        self.bits = bits
+
+    @classmethod
+    def from_cell(cls, cell):
+        return cls(pack_cell(cell))
+
+    def to_cell(self):
+        """A full CellState again (e.g. to call display_status on it)"""
+        return unpack_cell(self.bits)
+
+    def __getattr__(self, name):
+        shift = _FIELD_SHIFT.get(name)
+        if shift is not None:
+            return self.bits >> shift & _MASK
+        shift = _FLAG_SHIFT.get(name)
+        if shift is not None:
+            return bool(self.bits >> shift & 1)
+        if name == 'atp_crisis_turns':
+            return self.bits >> _CRISIS_SHIFT & _CRISIS_MASK
+        if name == 'turn':
+            return self.bits >> _TURN_SHIFT & _TURN_MASK
+        raise AttributeError(name)
+
+    def replace(self, **changes):
+        """New PackedCell with some fields changed"""
+        bits = self.bits
+        for name, value in changes.items():
+            if name in _FIELD_SHIFT:
+                shift, mask = _FIELD_SHIFT[name], _MASK
+            elif name in _FLAG_SHIFT:
+                shift, mask = _FLAG_SHIFT[name], 1
+            elif name == 'atp_crisis_turns':
+                shift, mask = _CRISIS_SHIFT, _CRISIS_MASK
+            elif name == 'turn':
+                shift, mask = _TURN_SHIFT, _TURN_MASK
+            else:
+                raise AttributeError(name)
+            bits = bits & ~(mask << shift) | (int(value) & mask) << shift
+        return PackedCell(bits)
+
+    def action_mask(self):
+        """Bit a-1 is set when organelle action a is legal"""
+        return _masks(self.bits)[0]
+
+    def can_act(self, action):
+        return bool(self.action_mask() >> (action - 1) & 1)
+
+    def transport_mask(self):
+        """ACTIVE_BIT and/or PASSIVE_BIT for the legal transport modes"""
+        return _masks(self.bits)[1]
+
+    def __eq__(self, other):
+        return isinstance(other, PackedCell) and self.bits == other.bits
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)}" for name in PACKED_FIELDS)
+        return f"PackedCell(turn={self.turn}, {fields})"
+
+# ============================================================================
+# BOTS
+#    Policies play headless games through play_turn(). A policy gets a
+#    read-only PackedCell view of the cell (never the CellState itself)
+#    and answers with plain values, so bots are cheap enough to run inside
+#    large simulations. To add a bot, subclass Policy and register it in
+#    POLICIES (see SIMULATION).
+# ============================================================================
+
+# Every organelle choice, with each ribosome protein type as its own choice
+ORGANELLE_CHOICES = tuple((action, subchoice) for action in ORGANELLE_ACTIONS
+                          for subchoice in (RIBOSOME_CHOICES if action == RIBOSOMES else (None,)))
+
+# Legal choices for each PackedCell.action_mask()
+_LEGAL_CHOICES = tuple(
+    tuple(choice for choice in ORGANELLE_CHOICES if mask >> (choice[0] - 1) & 1)
+    for mask in range(1 << len(ORGANELLE_ACTIONS))
+)
+
+def legal_choices(view):
+    """(action, subchoice) pairs that are legal for a PackedCell"""
+    return _LEGAL_CHOICES[view.action_mask()]
+
+
+class Policy:
+    """
+    Interface for bots.
+
+    transport(view, rng) returns ACTIVE_TRANSPORT or PASSIVE_DIFFUSION
+    before the import phase. actions(view, legal, rng) returns
+    (action, subchoice) pairs after the events, given the choices legal
+    right now; they are tried in order and the first actions_per_turn
+    that succeed are used, so later ones can be fallbacks. view is a
+    PackedCell and rng the game's random.Random. play_turn() repacks the
+    same view for both calls, so keep view.bits (or a replace()d copy)
+    rather than the view itself.
+    """
+
+    def transport(self, view, rng):
+        return ACTIVE_TRANSPORT if view.atp >= RULES.active_cost else PASSIVE_DIFFUSION
+
+    def actions(self, view, legal, rng):
+        return ()
+
+
+class RandomPolicy(Policy):
+    """Plays uniformly random legal choices"""
+
+    choices = ORGANELLE_CHOICES
+
+    def transport(self, view, rng):
+        return rng.choice((ACTIVE_TRANSPORT, PASSIVE_DIFFUSION))
+
+    def actions(self, view, legal, rng):
+        return rng.sample(legal, len(legal))
+
+
+class GreedyPolicy(Policy):
+    """
+    Follows the advice of the action menu (warnings_and_tips): fix the
+    most urgent warning first, one action at a time, re-checking the
+    warnings after each, then keep a defender up and bank ATP.
+    """
+
+    def __init__(self):
+        self._cell = CellState()  # Scratch cell to plan on
+
+    def transport(self, view, rng):
+        # Active transport only when it won't push ATP into the warning zone
+        return ACTIVE_TRANSPORT if level(view.atp - RULES.active_cost) >= 2 else PASSIVE_DIFFUSION
+
+    def actions(self, view, legal, rng):
+        cell = unpack_cell(view.bits, self._cell)
+        plan = []
+        for _ in range(RULES.actions_per_turn):
+            choice = self._advice(cell)
+            if choice is None:
+                break
+            apply_action(cell, *choice)
+            plan.append(choice)
+        return plan
+
+    @staticmethod
+    def _advice(cell):
+        # In the order warnings_and_tips() lists them
+        atp = level(cell.atp)
+        if atp <= 2 and can_act(cell, MITOCHONDRIA):
+            return MITOCHONDRIA, None            # "ATP is LOW! Consider using Mitochondria"
+        if cell.waste >= RULES.waste_damage_at and can_act(cell, LYSOSOMES):
+            return LYSOSOMES, None               # "Waste is HIGH"
+        if level(cell.membrane) <= 2:            # "Consider making lipids or repairing"
+            if can_act(cell, MEMBRANE_REPAIR):
+                return MEMBRANE_REPAIR, None
+            if can_act(cell, SMOOTH_ER):
+                return SMOOTH_ER, None
+        if level(cell.health) <= 2 and can_act(cell, RIBOSOMES):
+            return RIBOSOMES, 'health'           # "Make Structural Proteins to recover"
+        if not cell.has_defender and atp >= 3 and can_act(cell, RIBOSOMES):
+            return RIBOSOMES, 'defense'          # "Defensive Protein active - next event blocked!"
+        if cell.lipids < RULES.repair_lipids and atp >= 3 and can_act(cell, SMOOTH_ER):
+            return SMOOTH_ER, None               # Lipids for the next membrane repair
+        if atp <= 3 and can_act(cell, MITOCHONDRIA):
+            return MITOCHONDRIA, None
+        return None
+
+
+def state_score(cell):
+    """
+    Heuristic value of a cell after maintenance, for LookaheadPolicy
+    (higher is better). It prices in the next turn's upkeep: membrane
+    counts most until it is a few decays clear of bursting, ATP only up
+    to what upkeep and an action or two use, and waste from the level
+    one mitochondria run short of costing health. Weights were tuned by
+    simulation.
+    """
+    lost, _ = cell.check_lose_conditions()
+    if lost:
+        return -1000.0
+    health, membrane, atp, amino_acids, lipids, waste = (
+        level(cell.health), level(cell.membrane), level(cell.atp),
+        level(cell.amino_acids), level(cell.lipids), level(cell.waste))
+    waste_margin = level(RULES.waste_damage_at - RULES.mito_waste - 1)
+    return (health + 3 * min(health, 2) + membrane + 5 * min(membrane, 4) + 3 * min(atp, 3)
+            + 0.75 * min(amino_acids, 3) + 0.25 * min(lipids, 4) - 4 * max(waste - waste_margin, 0)
+            - 9 * cell.atp_crisis_turns + 2 * cell.has_defender + cell.enzyme_boost + cell.golgi_bonus)
+
+
+# Lookahead results by packed state. A turn only ever reaches a few
+# thousand distinct states, so bots pay for each rule application once.
+_SCRATCH = CellState()
+
+@lru_cache(maxsize=1 << 16)
+def _after_import(bits, mode):
+    cell = unpack_cell(bits, _SCRATCH)
+    apply_import(cell, mode)
+    return pack_cell(cell)
+
+@lru_cache(maxsize=1 << 16)
+def _after_action(bits, action, subchoice):
+    cell = unpack_cell(bits, _SCRATCH)
+    apply_action(cell, action, subchoice)
+    return pack_cell(cell)
+
+@lru_cache(maxsize=1 << 16)
+def _end_of_turn_score(bits):
+    """state_score() after the maintenance phase"""
+    cell = unpack_cell(bits, _SCRATCH)
+    apply_maintenance(cell)
+    return state_score(cell)
+
+@lru_cache(maxsize=1 << 16)
+def _best_plan(bits, left):
+    """(score, choices) of the best sequence of up to `left` actions from bits"""
+    best = (_end_of_turn_score(bits), ())
+    if left:
+        for choice in legal_choices(PackedCell(bits)):
+            score, plan = _best_plan(_after_action(bits, *choice), left - 1)
+            if score > best[0]:
+                best = (score, (choice,) + plan)
+    return best
+
+
+class LookaheadPolicy(Policy):
+    """
+    Whole-turn lookahead: tries every sequence of legal choices (stopping
+    early included), runs the end-of-turn maintenance on the result and
+    plays the sequence that scores best by state_score(). Transport is
+    chosen the same way, by the best turn each import leaves open.
+    """
+
+    def transport(self, view, rng):
+        left = RULES.actions_per_turn
+        active = _best_plan(_after_import(view.bits, ACTIVE_TRANSPORT), left)[0]
+        passive = _best_plan(_after_import(view.bits, PASSIVE_DIFFUSION), left)[0]
+        return ACTIVE_TRANSPORT if active > passive else PASSIVE_DIFFUSION
+
+    def actions(self, view, legal, rng):
+        return _best_plan(view.bits, RULES.actions_per_turn)[1]
+
+# ============================================================================
+# HINTS
+#    The in-game 'hint' command: Monte Carlo tree search (UCT) over the
+#    real rules and event distribution, from the cell's current state.
+#    Nodes are kept in a table keyed by packed state and actions left, so
+#    any state seen before - later in this turn or in a later turn - starts
+#    with the statistics earlier searches gathered for it.
+# ============================================================================
+
+HINT_BUDGET = 0.2   # Seconds a hint may search for
+HINT_EXPLORATION = 0.5
+STOP = None         # Search choice for "skip remaining actions"
+_TRANSPORT = -1     # Actions-left marker for the transport decision
+
+class _Node:
+    """Search statistics of one decision: {choice: [visits, total value]}"""
+
+    __slots__ = ('visits', 'edges')
+
+    def __init__(self, choices):
+        self.visits = 0
+        self.edges = {choice: [0, 0.0] for choice in choices}
+
+    def select(self, rng):
+        """Choice to explore next: untried ones first, then by UCB1"""
+        untried = [choice for choice, (n, _) in self.edges.items() if not n]
+        if untried:
+            return rng.choice(untried)
+        log_n = math.log(self.visits)
+        return max(self.edges, key=lambda choice: self._ucb(choice, log_n))
+
+    def _ucb(self, choice, log_n):
+        n, total = self.edges[choice]
+        return total / n + HINT_EXPLORATION * math.sqrt(log_n / n)
+
+    def update(self, choice, value):
+        self.visits += 1
+        edge = self.edges[choice]
+        edge[0] += 1
+        edge[1] += value
+
+
+def game_value(cell):
+    """Value of a finished rollout: 1 for a win, else the share of turns survived"""
+    if cell.check_win_condition():
+        return 1.0
+    return (cell.turn - 1) / RULES.turns
+
+
+class HintSearch:
+    """
+    MCTS for one game. best_action() searches for at most `budget`
+    seconds (HINT_BUDGET by default) and returns the choice it visited
+    most. Rollouts finish the game with GreedyPolicy.
+    """
+
+    def __init__(self, budget=None, seed=None):
+        self.budget = budget
+        self.nodes = {}
+        self.turn = 0
+        self.rng = random.Random(seed)
+        self.rollout = GreedyPolicy()
+        self._cell = CellState()
+        _masks(0)  # Build the legality table now rather than inside a hint's budget
+
+    def best_action(self, cell, actions_left):
+        """
+        (choice, stats) for the cell's action phase: choice is an
+        (action, subchoice) pair or STOP, and stats lists
+        (choice, visits, mean value) best first.
+        """
+        if cell.turn != self.turn:
+            # States of past turns can never come back
+            self.nodes = {key: node for key, node in self.nodes.items()
+                          if PackedCell(key[0]).turn >= cell.turn}
+            self.turn = cell.turn
+        root = (pack_cell(cell), actions_left)
+        budget = HINT_BUDGET if self.budget is None else self.budget
+        deadline = time.perf_counter() + budget
+        while True:
+            self._iterate(root)
+            if time.perf_counter() >= deadline:
+                break
+        edges = self.nodes[root].edges
+        stats = sorted(((choice, n, total / n if n else 0.0) for choice, (n, total) in edges.items()),
+                       key=lambda stat: (-stat[1], -stat[2]))
+        return stats[0][0], stats
+
+    def job(self, cell, actions_left):
+        """best_action() as a WORK step job (see GAME PHASES)"""
+        return self.best_action, cell, actions_left
+
+    def _choices(self, key):
+        bits, left = key
+        if left == _TRANSPORT:
+            return ACTIVE_TRANSPORT, PASSIVE_DIFFUSION
+        return legal_choices(PackedCell(bits)) + (STOP,) if left else (STOP,)
+
+    def _iterate(self, key):
+        """Select down the tree, add one node, roll out and back up the value"""
+        path = []
+        while key is not None:
+            node = self.nodes.get(key)
+            if node is None:
+                self.nodes[key] = node = _Node(self._choices(key))
+                value = self._rollout(key)
+                break
+            choice = node.select(self.rng)
+            path.append((node, choice))
+            key, value = self._step(key, choice)
+        for node, choice in path:
+            node.update(choice, value)
+
+    def _step(self, key, choice):
+        """Next decision after a choice; (None, value) if the game ended"""
+        bits, left = key
+        if left == _TRANSPORT:
+            cell = unpack_cell(_after_import(bits, choice), self._cell)
+            apply_events(cell, self.rng)
+            if cell.check_lose_conditions()[0]:
+                return None, game_value(cell)
+            return (pack_cell(cell), RULES.actions_per_turn), None
+        if choice is not STOP:
+            return (_after_action(bits, *choice), left - 1), None
+        cell = unpack_cell(bits, self._cell)
+        apply_maintenance(cell)
+        if cell.check_lose_conditions()[0]:
+            return None, game_value(cell)
+        cell.turn += 1
+        if cell.check_win_condition():
+            return None, 1.0
+        return (pack_cell(cell), _TRANSPORT), None
+
+    def _rollout(self, key):
+        """Finish the game from a decision with the rollout policy"""
+        bits, left = key
+        cell = unpack_cell(bits, self._cell)
+        if left != _TRANSPORT:
+            if left:
+                view = PackedCell(bits)
+                used = 0
+                for choice in self.rollout.actions(view, legal_choices(view), self.rng):
+                    if used == left:
+                        break
+                    used += apply_action(cell, *choice)[0]
+            apply_maintenance(cell)
+            if cell.check_lose_conditions()[0]:
+                return game_value(cell)
+            cell.turn += 1
+        while not cell.check_win_condition():
+            if play_turn(cell, self.rollout, self.rng)[0]:
+                break
+        return game_value(cell)
+
+# ============================================================================
+# REPLAY LOGS
+#    Every game runs on its own seeded RNG, and a ReplayRecorder attached
+#    to the cell writes a compact binary log of each decision and event:
+#
+#    header    b'MMRL', version, seed (8 bytes), RuleSet field count
+#              and values (varints)
+#    KEYFRAME  turn start: byte length and pack_cell bits, the 5 stats
+#              (4 bytes each)
+#    ACTIVE / PASSIVE  transport used (1 byte)
+#    EVENTS    count + event ids
+#    ACTION    action | ribosome choice << 4 (2 bytes)
+#    END       won flag (2 bytes)
+#    INDEX     offset of every keyframe, then the INDEX offset (4 bytes)
+#
+#    Replays apply the logged choices and events directly (no prompts, no
+#    RNG), and the keyframe index lets a replay jump straight to any turn.
+# ============================================================================
+
+REPLAY_MAGIC = b'MMRL'
+REPLAY_VERSION = 3  # 1: default rules only, fixed 4-byte cell and 2-byte stats
+                    # 2: played before events had delayed effects
+_REPLAY_HEADER = struct.Struct('<4sBQ')
+_RULE_COUNT = struct.Struct('<B')
+_KEYFRAME = struct.Struct('<BB')
+_KEYFRAME_STATS = struct.Struct('<5I')
+_KEYFRAME_V1 = struct.Struct('<BI5H')
+_OFFSET = struct.Struct('<I')
+
+KEYFRAME, ACTIVE, PASSIVE, EVENTS_RECORD, ACTION, END, INDEX = range(1, 8)
+
+ACTION_NAMES = {
+    MITOCHONDRIA: "MITOCHONDRIA",
+    RIBOSOMES: "RIBOSOMES",
+    SMOOTH_ER: "SMOOTH ER",
+    LYSOSOMES: "LYSOSOMES",
+    GOLGI: "GOLGI APPARATUS",
+    MEMBRANE_REPAIR: "MEMBRANE REPAIR",
+}
+
+def new_seed():
+    """Fresh random seed for a game"""
+    return random.SystemRandom().randrange(1 << 63)
+
+
+def _write_varint(data, value):
+    """Append a signed int to data as a zigzag LEB128 varint"""
+    value = value * 2 if value >= 0 else -value * 2 - 1
+    while value > 0x7F:
+        data.append(value & 0x7F | 0x80)
+        value >>= 7
+    data.append(value)
+
+def _read_varint(data, pos):
+    """(value, position after it) of the varint at pos"""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return (value >> 1 if value % 2 == 0 else -(value + 1 >> 1)), pos
+
+
+class ReplayRecorder:
+    """Builds the binary log for one game (attach it as cell.recorder)"""
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.data = bytearray(_REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed))
+        self.data += _RULE_COUNT.pack(len(RULES))
+        for value in RULES:
+            _write_varint(self.data, value)
+        self.keyframes = []
+
+    def turn_start(self, cell):
+        self.keyframes.append(len(self.data))
+        bits = pack_cell(cell)
+        size = (bits.bit_length() + 7) // 8
+        self.data += _KEYFRAME.pack(KEYFRAME, size) + bits.to_bytes(size, 'little')
+        self.data += _KEYFRAME_STATS.pack(*cell.stats.values())
+
+    def transport(self, mode):
+        self.data.append(ACTIVE if mode == ACTIVE_TRANSPORT else PASSIVE)
+
+    def events(self, events):
+        self.data += bytes((EVENTS_RECORD, len(events))) + bytes(event.id for event in events)
+
+    def action(self, action, subchoice):
+        choice = RIBOSOME_CHOICES.index(subchoice) + 1 if action == RIBOSOMES else 0
+        self.data += bytes((ACTION, action | choice << 4))
+
+    def finish(self, cell, won):
+        self.data += bytes((END, int(won)))
+        index = len(self.data)
+        self.data.append(INDEX)
+        self.data += _OFFSET.pack(len(self.keyframes))
+        for offset in self.keyframes:
+            self.data += _OFFSET.pack(offset)
+        self.data += _OFFSET.pack(index)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.data)
+
+
+class Replay:
+    """
+    A recorded game, loaded from the bytes a ReplayRecorder wrote.
+    rules is the RuleSet it was played under; state_at() and play() use
+    it whatever RULES is.
+    """
+
+    def __init__(self, data):
+        data = bytes(data)
+        magic, self.version, self.seed = _REPLAY_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or not 1 <= self.version <= REPLAY_VERSION:
+            raise ValueError("Not a MicroManager replay log")
+        self.rules = DEFAULT_RULES
+        if self.version > 1:
+            pos = _REPLAY_HEADER.size
+            count = _RULE_COUNT.unpack_from(data, pos)[0]
+            if count > len(RuleSet._fields):
+                raise ValueError("Replay log is from a newer version of the game")
+            pos += _RULE_COUNT.size
+            values = []
+            for _ in range(count):
+                value, pos = _read_varint(data, pos)
+                values.append(value)
+            self.rules = RuleSet(*values)
+        if self.version < 3:
+            self.rules = self.rules._replace(delayed_effects=0)
+        self.data = data
+        index = _OFFSET.unpack_from(data, len(data) - _OFFSET.size)[0]
+        count = _OFFSET.unpack_from(data, index + 1)[0]
+        self.keyframes = [_OFFSET.unpack_from(data, index + 1 + _OFFSET.size * (i + 1))[0]
+                          for i in range(count)]
+        self.won = bool(data[index - 1])
+        self._end = index
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    @property
+    def turns(self):
+        """Number of turns started in this game"""
+        return len(self.keyframes)
+
+    def _keyframe(self, turn):
+        """(packed bits, stats, offset of the turn's first record)"""
+        pos = self.keyframes[turn - 1]
+        if self.version == 1:
+            _, bits, *stats = _KEYFRAME_V1.unpack_from(self.data, pos)
+            return bits, stats, pos + _KEYFRAME_V1.size
+        _, size = _KEYFRAME.unpack_from(self.data, pos)
+        pos += _KEYFRAME.size
+        bits = int.from_bytes(self.data[pos:pos + size], 'little')
+        stats = _KEYFRAME_STATS.unpack_from(self.data, pos + size)
+        return bits, stats, pos + size + _KEYFRAME_STATS.size
+
+    def state_at(self, turn):
+        """CellState at the start of `turn`, straight from its keyframe"""
+        if not 1 <= turn <= len(self.keyframes):
+            raise IndexError(f"Replay has no turn {turn}")
+        bits, stats, _ = self._keyframe(turn)
+        with rules_in_use(self.rules):
+            cell = unpack_cell(bits)
+        cell.stats = dict(zip(cell.stats, stats))
+        return cell
+
+    def turn_records(self, turn):
+        """(transport mode, events, [(action, subchoice), ...]) logged for `turn`"""
+        pos = self._keyframe(turn)[2]
+        end = self.keyframes[turn] if turn < len(self.keyframes) else self._end
+        mode, events, actions = None, [], []
+        data = self.data
+        while pos < end:
+            tag = data[pos]
+            if tag in (ACTIVE, PASSIVE):
+                mode = ACTIVE_TRANSPORT if tag == ACTIVE else PASSIVE_DIFFUSION
+                pos += 1
+            elif tag == EVENTS_RECORD:
+                count = data[pos + 1]
+                events = [EVENTS[i] for i in data[pos + 2:pos + 2 + count]]
+                pos += 2 + count
+            elif tag == ACTION:
+                code = data[pos + 1]
+                action, choice = code & 15, code >> 4
+                actions.append((action, RIBOSOME_CHOICES[choice - 1] if choice else None))
+                pos += 2
+            elif tag == END:
+                break
+            else:
+                raise ValueError(f"Corrupt replay log at byte {pos}")
+        return mode, events, actions
+
+    def play(self, start_turn=1, on_turn=None):
+        """
+        Fast-forward the game from the keyframe of start_turn to the end
+        using the logged choices and events. on_turn(cell, records, lost,
+        reason) is called after each turn. Returns (cell, won, reason).
+        """
+        cell = self.state_at(start_turn)
+        reason = ""
+        with rules_in_use(self.rules):
+            for turn in range(start_turn, self.turns + 1):
+                records = self.turn_records(turn)
+                lost, reason = _replay_turn(cell, *records)
+                if on_turn is not None:
+                    on_turn(cell, records, lost, reason)
+                if lost:
+                    return cell, False, reason
+            return cell, cell.check_win_condition(), reason
+
+
+def _replay_turn(cell, mode, events, actions):
+    """play_turn with logged choices and events instead of a policy and RNG"""
+    apply_import(cell, mode)
+    for event in events:
+        apply_event(cell, event)
+
+    lost, reason = cell.check_lose_conditions()
+    if lost:
+        return lost, reason
+
+    for action, subchoice in actions:
+        apply_action(cell, action, subchoice)
+    apply_maintenance(cell)
+
+    lost, reason = cell.check_lose_conditions()
+    if not lost:
+        cell.turn += 1
+    return lost, reason
+
+# ============================================================================
+# RESULTS DATABASE
+#    Finished games go into a local SQLite database: one row per game with
+#    who played, the rules, the outcome, the end-of-game stats and the
+#    final packed state. The database runs in WAL mode, so simulation
+#    workers can each insert their own games while queries read. Rows
+#    are buffered and written RESULTS_BATCH at a time, one transaction per
+#    batch, which also updates a per-policy totals table: win rates read
+#    that table and never scan the games. Indexes on policy, seed, loss
+#    reason and turns survived keep filters and "top runs" queries fast
+#    at tens of millions of rows.
+# ============================================================================
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.db')
+RESULTS_BATCH = 5000
+
+STAT_FIELDS = tuple(CellState().stats)
+
+_RESULTS_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS rulesets (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,      -- rules_hash()
+    rules TEXT NOT NULL             -- RuleSet fields as JSON
+);
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    finished REAL NOT NULL,         -- Unix time
+    source TEXT NOT NULL,           -- 'game', 'serve' or 'simulate'
+    policy TEXT NOT NULL,           -- POLICIES name, 'human' or 'script'
+    rules_id INTEGER NOT NULL REFERENCES rulesets (id),
+    seed INTEGER,                   -- Event seed
+    game INTEGER NOT NULL,          -- EventStream game number within the seed
+    won INTEGER NOT NULL,
+    loss_reason TEXT,               -- 'health', 'membrane' or 'atp'; NULL if won
+    turns_survived INTEGER NOT NULL,
+    final_state BLOB NOT NULL,      -- pack_cell() bits, little-endian
+    {", ".join(f"{name} INTEGER NOT NULL" for name in STAT_FIELDS)}
+);
+CREATE INDEX IF NOT EXISTS games_policy ON games (policy, turns_survived);
+CREATE INDEX IF NOT EXISTS games_seed ON games (seed, game);
+CREATE INDEX IF NOT EXISTS games_loss ON games (loss_reason);
+CREATE INDEX IF NOT EXISTS games_turns ON games (turns_survived);
+CREATE TABLE IF NOT EXISTS policy_totals (
+    policy TEXT NOT NULL,
+    rules_id INTEGER NOT NULL REFERENCES rulesets (id),
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    turns INTEGER NOT NULL,         -- Sum of turns survived
+    PRIMARY KEY (policy, rules_id)
+);
+"""
+
+_INSERT_GAME = (f"INSERT INTO games (finished, source, policy, rules_id, seed, game, won, loss_reason, "
+                f"turns_survived, final_state, {', '.join(STAT_FIELDS)}) "
+                f"VALUES ({', '.join('?' * (10 + len(STAT_FIELDS)))})")
+_ADD_TOTALS = ("INSERT INTO policy_totals VALUES (?, ?, ?, ?, ?) "
+               "ON CONFLICT (policy, rules_id) DO UPDATE SET games = games + excluded.games, "
+               "wins = wins + excluded.wins, turns = turns + excluded.turns")
+
+def loss_name(cell, won):
+    """Why a finished game was lost, in check_lose_conditions order (None if won)"""
+    if won:
+        return None
+    if cell.health <= 0:
+        return 'health'
+    if cell.membrane <= 0:
+        return 'membrane'
+    return 'atp'
+
+def player_name(inputs):
+    """games.policy for a game played through an input provider"""
+    if isinstance(inputs, PolicyInput):
+        return next((name for name, cls in POLICIES.items() if type(inputs.policy) is cls),
+                    type(inputs.policy).__name__)
+    return 'script' if isinstance(inputs, ScriptInput) else 'human'
+
+
+class ResultsStore:
+    """
+    The results database at path, created on first use. add() buffers a
+    finished game; every `batch` games (and on flush() or close()) the
+    buffer is written in one transaction. Safe to open from several
+    processes at once: writers wait for each other up to `timeout` seconds.
+    Any thread may use a store, but only one at a time.
+    """
+
+    def __init__(self, path=RESULTS_PATH, batch=RESULTS_BATCH, timeout=60.0):
+        self.path = path
+        self.batch = batch
+        self.db = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.executescript(_RESULTS_SCHEMA)
+        self.rows = []
+        self.totals = {}
+        self._rules_ids = {}
+        self._last_rules = self._last_rules_id = None
+
+    def _rules_id(self, rules):
+        if rules is self._last_rules:
+            return self._last_rules_id
+        rules_id = self._rules_ids.get(rules)
+        if rules_id is None:
+            digest = rules_hash(rules)
+            with self.db:
+                self.db.execute("INSERT OR IGNORE INTO rulesets (hash, rules) VALUES (?, ?)",
+                                (digest, json.dumps(rules._asdict())))
+            rules_id = self._rules_ids[rules] = self.db.execute(
+                "SELECT id FROM rulesets WHERE hash = ?", (digest,)).fetchone()[0]
+        self._last_rules, self._last_rules_id = rules, rules_id
+        return rules_id
+
+    def add(self, cell, won, source, policy, seed=None, game=0):
+        """Buffer one finished game (played under RULES)"""
+        rules_id = self._rules_id(RULES)
+        bits = pack_cell(cell)
+        turns = cell.turn - 1
+        self.rows.append((time.time(), source, policy, rules_id, seed, game, int(won),
+                          loss_name(cell, won), turns, bits.to_bytes((bits.bit_length() + 7) // 8, 'little'),
+                          *cell.stats.values()))
+        totals = self.totals.setdefault((policy, rules_id), [0, 0, 0])
+        totals[0] += 1
+        totals[1] += won
+        totals[2] += turns
+        if len(self.rows) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered games in one transaction"""
+        if not self.rows:
+            return
+        with self.db:
+            self.db.executemany(_INSERT_GAME, self.rows)
+            self.db.executemany(_ADD_TOTALS, [(policy, rules_id, *totals)
+                                              for (policy, rules_id), totals in self.totals.items()])
+        self.rows.clear()
+        self.totals.clear()
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Queries -----------------------------------------------------------------
+
+    def win_rates(self):
+        """[(policy, rules hash, games, wins, mean turns survived)], most games first"""
+        self.flush()
+        return [(policy, digest, games, wins, turns / games) for policy, digest, games, wins, turns
+                in self.db.execute("SELECT policy, hash, games, wins, turns FROM policy_totals "
+                                   "JOIN rulesets ON rulesets.id = rules_id ORDER BY games DESC")]
+
+    def top_runs(self, limit=100, policy=None):
+        """The `limit` games that survived longest (of one policy, if given), as dicts"""
+        self.flush()
+        query = "SELECT * FROM games"
+        args = ()
+        if policy is not None:
+            query += " WHERE policy = ?"
+            args = (policy,)
+        cursor = self.db.execute(query + " ORDER BY turns_survived DESC LIMIT ?", args + (limit,))
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+
+def add_results_arguments(parser):
+    """--results / --no-results, for results_from_args()"""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--results', metavar='FILE', default=RESULTS_PATH,
+                       help="SQLite database finished games are saved to (default results.db)")
+    group.add_argument('--no-results', action='store_true', help="don't save finished games")
+
+def results_from_args(args):
+    """The ResultsStore the command line asks for, or None"""
+    return None if args.no_results else ResultsStore(args.results)
+
+def results_main(argv=None):
+    parser = argparse.ArgumentParser(prog="micromanager.py results",
+                                     description="Win rates and best runs from the results database")
+    parser.add_argument('--results', metavar='FILE', default=RESULTS_PATH)
+    parser.add_argument('--top', type=int, default=10, metavar='N', help="best runs to list (default 10)")
+    parser.add_argument('--policy', help="only list runs of this policy")
+    args = parser.parse_args(argv)
+    with ResultsStore(args.results) as store:
+        print(f"{'policy':<12}{'rules':<18}{'games':>12}{'win rate':>10}{'mean turns':>12}")
+        for policy, digest, games, wins, turns in store.win_rates():
+            print(f"{policy:<12}{digest:<18}{games:>12,}{wins / games:>10.2%}{turns:>12.2f}")
+        print(f"\nTop {args.top} runs:")
+        for run in store.top_runs(args.top, args.policy):
+            outcome = "won" if run['won'] else f"lost ({run['loss_reason']})"
+            print(f"  #{run['id']:<10} {run['policy']:<10} {run['turns_survived']:3d} turns, {outcome}, "
+                  f"seed {run['seed']} game {run['game']}")
+
+# ============================================================================
+# RENDERING
+#    Every screen is built as one string and sent with a single write, so
+#    the terminal is not flushed line by line. Anything that never changes
+#    (menus, headers, dot bars) is built once and reused.
+# ============================================================================
+
+RULE = "=" * 60
+DIVIDER = "-" * 60
+
+@lru_cache(maxsize=None)
+def dot_strings(width):
+    """Every dot bar of this width, indexed by value: ('○○○○○', '●○○○○', ...)"""
+    return tuple("●" * filled + "○" * (width - filled) for filled in range(width + 1))
+
+def _label(ratio):
+    if ratio >= 0.8:
+        return "EXCELLENT"
+    elif ratio >= 0.6:
+        return "GOOD"
+    elif ratio >= 0.4:
+        return "STABLE"
+    elif ratio >= 0.2:
+        return "LOW"
+    return "CRITICAL"
+
+@lru_cache(maxsize=None)
+def status_labels(width):
+    """Status label for every value 0..width"""
+    return tuple(_label(value / width) for value in range(width + 1))
+
+# Scales up to DOT_LIMIT show one dot per unit; larger ones a BAR_CELLS
+# wide bar and a percentage, e.g. '██████░░░░  62%'
+DOT_LIMIT = 10
+BAR_CELLS = 10
+
+@lru_cache(maxsize=None)
+def bar_strings(width):
+    """Every meter bar of this width, indexed by value"""
+    if width <= DOT_LIMIT:
+        return dot_strings(width)
+    return tuple(f"{'█' * (value * BAR_CELLS // width)}{'░' * (BAR_CELLS - value * BAR_CELLS // width)}"
+                 f" {value * 100 // width:3d}%" for value in range(width + 1))
+
+def meter_bar(value, width):
+    """Dots for value out of width, or a compact bar when dots would be too many"""
+    return bar_strings(width)[min(max(value, 0), width)]
+
+def status_label(value, width):
+    """Status label for value out of width"""
+    value = min(max(value, 0), width)
+    if width <= DOT_LIMIT:
+        return status_labels(width)[value]
+    return _label(value / width)
+
+def level(value):
+    """value on the default 0-5 scale, for thresholds that scale with RULES.max_value"""
+    return value * DEFAULT_RULES.max_value // RULES.max_value
+
+def write(text):
+    """Send a rendered screen to the terminal in one go"""
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+def banner(title):
+    """A title between two rules, as at the top of every phase"""
+    return f"\n{RULE}\n{title}\n{RULE}\n"
+
+@lru_cache(maxsize=None)
+def meter_strings(width):
+    """Every status screen meter (bar and status label) of this width, indexed by value"""
+    return tuple(f"{meter_bar(value, width)}  {status_label(value, width)}"
+                 for value in range(width + 1))
+
+def _meter(value):
+    """Dots and status label, as on the status screen"""
+    cap = RULES.max_value
+    return meter_strings(cap)[min(max(value, 0), cap)]
+
+_STATUS_SCREEN = f"""
+{RULE}
+{{title:^60}}
+{RULE}
+
+RESOURCES:
+  ATP (Energy):           {{atp}}
+  GLUCOSE (Fuel):         {{glucose}}
+  AMINO ACIDS (Building): {{amino_acids}}
+  LIPIDS (Membranes):     {{lipids}}
+
+CELL STATUS:
+  CELL HEALTH:            {{health}}
+  MEMBRANE INTEGRITY:     {{membrane}}
+
+
+  WASTE LEVEL: {{waste}} {{waste_status}}
+"""
+
+def render_status(cell):
+    """Full status screen shown at the start of each turn"""
+    rules = RULES
+    waste_status = ("CLEAN" if level(cell.waste) <= 1 else
+                    "MODERATE" if cell.waste < rules.high_waste_at else "HIGH")
+    text = _STATUS_SCREEN.format(
+        title=f"TURN {cell.turn}/{rules.turns}",
+        atp=_meter(cell.atp),
+        glucose=_meter(cell.glucose),
+        amino_acids=_meter(cell.amino_acids),
+        lipids=_meter(cell.lipids),
+        health=_meter(cell.health),
+        membrane=_meter(cell.membrane),
+        waste=cell.display_dots(cell.waste),
+        waste_status=waste_status,
+    )
+    if cell.has_defender:
+        text += "\n  ACTIVE: Defensive Proteins (next event blocked!)\n"
+    if cell.enzyme_boost:
+        text += f"  ACTIVE: Metabolic Enzymes (+{rules.enzyme_atp} ATP bonus this turn!)\n"
+    if cell.golgi_bonus:
+        text += f"  ACTIVE: Golgi Trade Bonus (+{rules.golgi_glucose} Glucose next import!)\n"
+    if cell.effects.queued:
+        text += render_pending(cell)
+    return text + "\n"
+
+_COMPACT_STATUS = """CELL STATUS
+ ATP:       {atp}
+ Glucose:   {glucose}
+ Amino:     {amino_acids}
+ Lipids:    {lipids}
+ Health:    {health}
+ Membrane:  {membrane}
+ {waste:<55}
+
+"""
+
+def render_compact_status(cell):
+    """Compact resource bars shown at the top of the action menu"""
+    dots = cell.display_dots
+    waste = f"Waste: {dots(cell.waste)}"
+    if cell.waste >= RULES.waste_damage_at:
+        waste += " (HIGH!)"
+    return _COMPACT_STATUS.format(
+        atp=dots(cell.atp), glucose=dots(cell.glucose), amino_acids=dots(cell.amino_acids),
+        lipids=dots(cell.lipids), health=dots(cell.health), membrane=dots(cell.membrane),
+        waste=waste,
+    )
+
+def warnings_and_tips(cell):
+    """Contextual (warnings, tips) for the current cell state"""
+    rules = RULES
+    warnings = []
+    tips = []
+
+    # Check for critical conditions
+    atp = level(cell.atp)
+    if atp <= 1:
+        warnings.append("ATP is CRITICAL! Generate energy NOW or enter crisis mode")
+    elif atp <= 2:
+        warnings.append("ATP is LOW! Consider using Mitochondria")
+
+    if cell.waste >= rules.high_waste_at:
+        warnings.append(f"Waste is VERY HIGH! Damaging health each turn (-{rules.high_waste_damage})")
+    elif cell.waste >= rules.waste_damage_at:
+        warnings.append(f"Waste is HIGH (≥{rules.waste_damage_at})! Currently damaging health "
+                        f"(-{rules.waste_damage}/turn)")
+
+    membrane = level(cell.membrane)
+    if membrane <= 1:
+        warnings.append("Membrane CRITICAL! Cell will burst at 0!")
+    elif membrane <= 2:
+        warnings.append("Membrane is LOW! Consider making lipids or repairing")
+
+    if level(cell.health) <= 2:
+        warnings.append("Health is LOW! Make Structural Proteins to recover")
+
+    # Strategic tips
+    if cell.has_defender:
+        tips.append("You have Defensive Protein active - next event blocked!")
+    if cell.enzyme_boost:
+        tips.append(f"Metabolic enzyme ready - next Mitochondria gives +{rules.enzyme_atp} ATP bonus!")
+    if cell.golgi_bonus:
+        tips.append(f"Golgi bonus active - next import gives +{rules.golgi_glucose} Glucose!")
+    if level(cell.glucose) >= 4 and atp >= 3:
+        tips.append("Good resource levels! You're in a strong position")
+
+    return warnings, tips
+
+def render_warnings(cell):
+    """Warnings and tips block of the action menu"""
+    warnings, tips = warnings_and_tips(cell)
+    text = ""
+    if warnings:
+        text += "\n   CRITICAL WARNINGS:\n" + "".join(f"  • {warning}\n" for warning in warnings)
+    if tips:
+        text += "\n  STRATEGIC INFO:\n" + "".join(f"  • {tip}\n" for tip in tips)
+    return text + "\n"
+
+def render_learn(query):
+    """Learn More text for the best match to query, pointing at other matches"""
+    topics = LEARN_MORE.search(query)
+    if not topics:
+        return ("Topic not found. Try: atp, glucose, amino acids, lipids,\n"
+                "mitochondria, ribosomes, smooth er, lysosomes, golgi, membrane\n")
+    text = LEARN_MORE[topics[0]] + "\n"
+    if len(topics) > 1:
+        text += "Also see: " + ", ".join(f"learn {topic}" for topic in topics[1:]) + "\n"
+    return text
+
+def _choice_name(choice):
+    if choice is STOP:
+        return "7. SKIP remaining actions"
+    action, subchoice = choice
+    name = f"{action}. {ACTION_NAMES[action]}"
+    return f"{name} ({subchoice})" if subchoice else name
+
+def render_hint(stats, elapsed):
+    """Search results from HintSearch.best_action(), best choice first"""
+    games = sum(visits for _, visits, _ in stats)
+    text = f"\nHINT: {_choice_name(stats[0][0])}\n\n"
+    text += (f"  From {games:,} simulated futures ({elapsed * 1000:.0f} ms). Score is the\n"
+             f"  average share of the {RULES.turns} turns survived (100% = win):\n\n")
+    for choice, visits, value in stats[:3]:
+        if visits:
+            text += f"  {_choice_name(choice):<32} {visits:>6,} tries, score {value:.0%}\n"
+    return text
+
+def _dots(amount):
+    """' (●●)' after an amount on the menus, or nothing when dots would be too many"""
+    return f" ({'●' * amount})" if 0 < amount <= DOT_LIMIT else ""
+
+def _action_menu(rules):
+    """The organelle menu, with the costs and yields of rules"""
+    r = rules
+    return f"""
+Available Organelles:
+
+1. MITOCHONDRIA
+   Generate energy for other actions
+   → Uses: {r.mito_glucose} Glucose{_dots(r.mito_glucose)} | Produces: {r.mito_atp} ATP{_dots(r.mito_atp)}
+     Good choice when: You're low on ATP
+
+2. RIBOSOMES
+   Build specialized proteins for different jobs
+   → Uses: {r.protein_amino_acids} Amino Acid{_dots(r.protein_amino_acids)} + {r.protein_atp} ATP{_dots(r.protein_atp)}
+     Good choice when: Cell needs defense, repair, or enzyme boost
+
+3. SMOOTH ER
+   Make membrane materials to prevent rupture
+   → Uses: {r.er_glucose} Glucose{_dots(r.er_glucose)} + {r.er_atp} ATP{_dots(r.er_atp)} | Produces: {r.er_lipids} Lipids{_dots(r.er_lipids)}
+     Good choice when: Membrane integrity is dropping
+
+4. LYSOSOMES
+   Earn materials in return for cleaning up waste
+   → Uses: {r.lyso_atp} ATP{_dots(r.lyso_atp)} | Removes: {r.lyso_waste} Waste | Produces: {r.lyso_amino_acids} Amino Acid{_dots(r.lyso_amino_acids)}
+     Good choice when: Waste is ≥ {r.waste_damage_at} (it damages health!)
+
+5. GOLGI APPARATUS
+   Export proteins to get bonus glucose later
+   → Uses: {r.golgi_amino_acids} Amino Acid{_dots(r.golgi_amino_acids)} + {r.golgi_atp} ATP{_dots(r.golgi_atp)} | Next import: +{r.golgi_glucose} Glucose
+     Good choice when: Planning ahead, glucose running low
+
+6. MEMBRANE REPAIR
+   Direct repair of cell wall
+   → Uses: {r.repair_lipids} Lipids{_dots(r.repair_lipids)} | Restores: {r.repair_membrane} Membrane{_dots(r.repair_membrane)}
+     Good choice when: Membrane is CRITICAL
+
+7.   SKIP remaining actions
+"""
+
+def render_action_menu(cell, actions_remaining):
+    """Status, warnings and organelle menu shown before each action"""
+    return (f"\n--- Actions Remaining: {actions_remaining} ---\n"
+            + render_compact_status(cell) + render_warnings(cell) + _ACTION_MENU)
+
+def _action_phase_screen(rules):
+    """Header of the action phase, with the action count and upkeep of rules"""
+    return banner("PHASE 3: ORGANELLE ACTIONS") + f"""
+You can use {rules.actions_per_turn} ORGANELLES this turn.
+
+Choose wisely to keep your cell alive!
+
+  WHAT HAPPENS EACH TURN:
+  ✓ Import nutrients (Phase 1)
+  ✓ Events occur (Phase 2)
+  → Choose {rules.actions_per_turn} organelle actions (Phase 3) ← YOU ARE HERE
+  → Automatic maintenance:
+      • Membrane -{rules.membrane_decay} (natural decay)
+      • ATP -{rules.atp_upkeep} (basic functions)
+"""
+
+def render_action_phase(cell):
+    """Header of the action phase, with what maintenance will cost"""
+    text = _ACTION_PHASE_SCREEN
+    rules = RULES
+    if cell.waste >= rules.waste_damage_at:
+        damage = rules.high_waste_damage if cell.waste >= rules.high_waste_at else rules.waste_damage
+        text += f"      • Waste damaging health (currently -{damage})\n"
+    return text + "\n"
+
+# Resources compared before and after an action: (label, attribute)
+_RESULT_FIELDS = (
+    ("ATP", 'atp'),
+    ("Glucose", 'glucose'),
+    ("Amino Acids", 'amino_acids'),
+    ("Lipids", 'lipids'),
+    ("Waste", 'waste'),
+)
+
+def render_action_result(cell, changes):
+    """Before/after comparison of the resources an action changed (see CellState.changes)"""
+    dots = cell.display_dots
+    lines = [f"\n{DIVIDER}\nRESULT:\n"]
+    for label, name in _RESULT_FIELDS:
+        if name in changes:
+            old, new = changes[name]
+            lines.append(f"    {label}: {dots(old)} → {dots(new)}\n")
+    lines.append(DIVIDER + "\n")
+    return "".join(lines)
+
+def _import_screen(rules):
+    """Transport choice, with the costs and yields of rules"""
+    return banner("PHASE 1: NUTRIENT IMPORT") + f"""
+The cell membrane controls what enters the cell.
+Choose your transport method:
+
+A.   ACTIVE TRANSPORT - Costs {rules.active_cost} ATP
+   Uses ATP-powered pumps to import: {rules.active_glucose} Glucose + {rules.import_amino_acids} Amino Acid
+   (Pumps molecules AGAINST concentration gradient)
+
+B.   PASSIVE DIFFUSION - FREE
+   Molecules naturally flow in: {rules.passive_glucose} Glucose + {rules.import_amino_acids} Amino Acid
+   (Slower, but no energy cost)
+
+"""
+
+def render_import(choice, mode, glucose_gain, aa_gain, golgi_used, cuts=_NO_CUTS):
+    """Outcome of the import phase"""
+    text = ""
+    if mode != choice:
+        text += "  Not enough ATP for active transport!\nFalling back to passive diffusion...\n\n"
+    if mode == ACTIVE_TRANSPORT:
+        text += "\n✓ Active transport engaged!\n"
+    else:
+        text += "\n✓ Passive diffusion occurring...\n"
+    if golgi_used:
+        text += f"  Golgi trade bonus applied! +{RULES.golgi_glucose} extra Glucose\n"
+    if cuts:
+        text += f"  Nutrient shortage! Import cut by {_cut_text(cuts)}\n"
+    return text + f"Imported: {glucose_gain} Glucose, {aa_gain} Amino Acids\n"
+
+def _cut_text(cuts):
+    return ", ".join(f"{cuts[name]} {label}" for label, name in _RESULT_FIELDS if cuts.get(name))
+
+def ordinal(n):
+    """1st, 2nd, 3rd, 4th, ... 11th, 12th, 13th, ... 21st"""
+    if n % 100 in (11, 12, 13):
+        return f"{n}th"
+    return f"{n}{ {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')}"
+
+def render_pending(cell):
+    """Status lines for the delayed cuts a cell is waiting on"""
+    due = {}
+    for (trigger, resource, offset), cut in zip(DELAYED_SLOTS, cell.effects.pending()):
+        if cut:
+            due.setdefault((trigger, offset), {})[resource] = cut
+    lines = []
+    for (trigger, offset), cuts in due.items():
+        which = "next" if offset == 0 else ordinal(offset + 1)
+        use = "import" if trigger == ON_IMPORT else "Mitochondria use"
+        lines.append(f"  PENDING: {which} {use} -{_cut_text(cuts).replace(', ', ', -')}\n")
+    return "".join(lines)
+
+def render_events(results):
+    """Event phase screen for the results of apply_events"""
+    lines = [banner("PHASE 2: CELLULAR EVENTS")]
+    for result in results:
+        lines.append(f"\n  EVENT: {result['name']}\n   {result['description']}\n")
+        if result['blocked']:
+            lines.append("     Defensive Proteins activated! Attack blocked!\n")
+        elif result['damage']:
+            lines.append(f"     No defensive proteins! Health -{result['damage']}\n")
+        elif result['note']:
+            lines.append(result['note'] + "\n")
+
+        #Helpful Hints
+        hint = EVENTS[result['id']].hint
+        if hint:
+            lines.append(_EVENT_HINT_TEXT[hint])
+    return "".join(lines)
+
+_EVENT_HINT_TEXT = {
+    key: "\n      How to respond:\n" + "".join(f"      • {line}\n" for line in hints)
+    for key, hints in EVENT_HINTS.items()
+}
+
+def render_maintenance(changes):
+    """Maintenance phase screen for the changes from apply_maintenance"""
+    return (banner("PHASE 4: CELLULAR MAINTENANCE") + "\nAutomatic processes:\n"
+            + "".join(f"  • {change}\n" for change in changes))
+
+_SUMMARY_SCREEN = """
+🎓 CELL BIOLOGY CONCEPTS YOU APPLIED:
+
+  CELLULAR RESPIRATION
+   You used mitochondria to generate {atp_generated} total ATP
+   Real equation: C₆H₁₂O₆ + 6O₂ → 6CO₂ + 6H₂O + 30 ATP
+
+  PROTEIN SYNTHESIS
+   You synthesized {proteins_made} proteins at ribosomes
+   Process: DNA → mRNA → Protein
+
+  AUTOPHAGY & CELLULAR RECYCLING
+   Lysosomes recycled {waste_cleaned} units of waste
+   This won the 2016 Nobel Prize in Medicine!
+
+  ACTIVE vs PASSIVE TRANSPORT
+   Active transport: {active_transports} times (costs ATP)
+   Passive diffusion: {passive_transports} times (free)
+
+  HOMEOSTASIS
+   You balanced energy, waste, repairs, and defense
+   Real cells do this every second!
+
+"""
+
+def render_summary(cell, won):
+    """Educational end-of-game summary"""
+    title = "  CONGRATULATIONS! YOUR CELL SURVIVED!  " if won else "  GAME OVER  "
+    return (banner(title) + _SUMMARY_SCREEN.format(**cell.stats)
+            + f"{RULE}\nTurns Survived: {cell.turn - 1}/{RULES.turns}\n{RULE}\n")
+
+# ============================================================================
+# INPUT
+#    Where the game's answers come from. Every prompt goes through an input
+#    provider: ask(kind, prompt, cell) for real decisions and pause(prompt)
+#    for "Press ENTER" pacing, which can be switched off. ConsoleInput reads
+#    the keyboard, ScriptInput replays answers from a file or a pipe, and
+#    PolicyInput lets a policy (see RULES ENGINE) play through the terminal.
+# ============================================================================
+
+# Prompt kinds passed to ask()
+ASK_TRANSPORT = 'transport'   # A/B
+ASK_ORGANELLE = 'organelle'   # 1-7, 'status', 'hint' or 'learn <topic>'
+ASK_PROTEIN = 'protein'       # 1/2/3
+ASK_REPAIR = 'repair'         # h/m
+ASK_AGAIN = 'again'           # y/n
+PAUSE = None                  # "Press ENTER" pacing prompts
+
+class ConsoleInput:
+    """Answers typed at the keyboard; pacing prompts wait for ENTER unless pause=False"""
+
+    def __init__(self, pause=True):
+        self.pacing = pause
+
+    def ask(self, kind, prompt, cell=None):
+        return input(prompt)
+
+    def pause(self, prompt):
+        if self.pacing:
+            self.ask(PAUSE, prompt)
+
+class ScriptInput(ConsoleInput):
+    """
+    Answers read from lines of text, one answer per line, each echoed
+    after its prompt. Blank lines answer pacing prompts (unless pause=False,
+    then the script leaves them out) and lines starting with '#' are
+    comments. Raises EOFError when the script runs out, like input().
+    """
+
+    def __init__(self, lines, pause=True):
+        super().__init__(pause)
+        self.lines = (line.rstrip("\r\n") for line in lines if not line.startswith('#'))
+
+    @classmethod
+    def from_file(cls, path, pause=True):
+        """Script from a file, or from stdin if path is '-'"""
+        if path == '-':
+            return cls(sys.stdin, pause)
+        with open(path, encoding='utf-8') as f:
+            return cls(f.readlines(), pause)
+
+    def ask(self, kind, prompt, cell=None):
+        answer = next(self.lines, None)
+        if answer is None:
+            raise EOFError("input script ended")
+        write(f"{prompt}{answer}\n")
+        return answer
+
+# How PolicyInput types each ribosome subchoice: (protein answer, repair answer)
+_SUBCHOICE_ANSWERS = {
+    'enzyme': ('1', None),
+    'health': ('2', 'h'),
+    'membrane': ('2', 'm'),
+    'defense': ('3', None),
+}
+
+class PolicyInput(ConsoleInput):
+    """
+    Answers chosen by a Policy (see BOTS), the same interface
+    play_turn() uses, typed into the menus as a player would. Pacing prompts still wait for ENTER
+    unless pause=False, so a class can step through a bot's game.
+    """
+
+    def __init__(self, policy, rng=None, pause=True):
+        super().__init__(pause)
+        self.policy = policy
+        self.rng = rng or random.Random()
+        self.planned = None
+        self.subchoice = None
+
+    def ask(self, kind, prompt, cell=None):
+        answer = self._answer(kind, cell)
+        write(f"{prompt}{answer}\n")
+        return answer
+
+    def pause(self, prompt):
+        if self.pacing:
+            input(prompt)
+
+    def _answer(self, kind, cell):
+        if kind == ASK_TRANSPORT:
+            self.planned = None
+            return self.policy.transport(PackedCell.from_cell(cell), self.rng)
+        if kind == ASK_ORGANELLE:
+            if self.planned is None:
+                view = PackedCell.from_cell(cell)
+                self.planned = list(self.policy.actions(view, legal_choices(view), self.rng))
+            while self.planned:
+                action, self.subchoice = self.planned.pop(0)
+                if can_act(cell, action):
+                    return str(action)
+            return '7'
+        if kind == ASK_PROTEIN:
+            return _SUBCHOICE_ANSWERS[self.subchoice][0]
+        if kind == ASK_REPAIR:
+            return _SUBCHOICE_ANSWERS[self.subchoice][1]
+        return 'n'
+
+CONSOLE = ConsoleInput()
+
+# ============================================================================
+# ORGANELLE ACTIONS
+# ============================================================================
+
+def _action_screens(rules):
+    """What each organelle does under rules, shown when it is picked"""
+    r = rules
+    repair = (f"+{r.protein_health} Health OR Membrane" if r.protein_health == r.protein_membrane
+              else f"+{r.protein_health} Health OR +{r.protein_membrane} Membrane")
+    return {
+        MITOCHONDRIA: f"""
+  MITOCHONDRIA - Cellular Respiration
+Uses: {r.mito_glucose} Glucose → Produces: {r.mito_atp} ATP
+Converts glucose into usable energy through cellular respiration.
+""",
+        RIBOSOMES: f"""
+  RIBOSOMES - Protein Synthesis
+Uses: {r.protein_amino_acids} Amino Acid + {r.protein_atp} ATP
+
+Choose protein type:
+1. Metabolic Enzymes - Boost next ATP production (+{r.enzyme_atp} ATP)
+2. Structural Proteins - Repair damage ({repair})
+3. Defensive Proteins - Block next harmful event
+""",
+        SMOOTH_ER: f"""
+  SMOOTH ER - Lipid Synthesis
+Uses: {r.er_glucose} Glucose + {r.er_atp} ATP → Produces: {r.er_lipids} Lipids
+Manufactures phospholipids for cell membrane maintenance.
+""",
+        LYSOSOMES: f"""
+  LYSOSOMES - Waste Digestion & Autophagy
+Uses: {r.lyso_atp} ATP → Removes: {r.lyso_waste} Waste, Produces: {r.lyso_amino_acids} Amino Acid
+Breaks down cellular waste and recycles components!
+""",
+        GOLGI: f"""
+  GOLGI APPARATUS - Package & Export Proteins
+Uses: {r.golgi_amino_acids} Amino Acid + {r.golgi_atp} ATP
+Export proteins for trade: Next import gets +{r.golgi_glucose} Glucose bonus!
+""",
+        MEMBRANE_REPAIR: f"""
+  MEMBRANE REPAIR - Phospholipid Replacement
+Uses: {r.repair_lipids} Lipids → Restores: {r.repair_membrane} Membrane Integrity
+Directly repair the phospholipid bilayer.
+""",
+    }
+
+def organelle_steps(cell, action):
+    """Steps of one organelle action (see GAME PHASES); returns whether it worked"""
+    screen = ACTION_SCREENS[action]
+    subchoice = None
+    if action == RIBOSOMES:
+        if not can_act(cell, RIBOSOMES):
+            yield screen + (f"  Not enough resources! Need {RULES.protein_amino_acids} Amino Acid"
+                            f" + {RULES.protein_atp} ATP\n"), None, None
+            return False
+
+        choice = (yield screen, ASK_PROTEIN, "Choose (1/2/3): ").strip()
+        screen = ""
+
+        if choice == '1':
+            subchoice = 'enzyme'
+        elif choice == '2':
+            repair_choice = (yield "", ASK_REPAIR, "Repair Health or Membrane? (h/m): ").strip().lower()
+            subchoice = 'health' if repair_choice == 'h' else 'membrane'
+        elif choice == '3':
+            subchoice = 'defense'
+
+    success, message = apply_action(cell, action, subchoice)
+    yield screen + message + "\n", None, None
+    return success
+
+def action_mitochondria(cell, inputs=CONSOLE):
+    """Mitochondria: Cellular Respiration"""
+    return run_steps(organelle_steps(cell, MITOCHONDRIA), inputs, cell)
+
+def action_ribosomes(cell, inputs=CONSOLE):
+    """Ribosomes: Protein Synthesis"""
+    return run_steps(organelle_steps(cell, RIBOSOMES), inputs, cell)
+
+def action_smooth_er(cell, inputs=CONSOLE):
+    """Smooth ER: Lipid Synthesis"""
+    return run_steps(organelle_steps(cell, SMOOTH_ER), inputs, cell)
+
+def action_lysosomes(cell, inputs=CONSOLE):
+    """Lysosomes: Waste Digestion & Recycling"""
+    return run_steps(organelle_steps(cell, LYSOSOMES), inputs, cell)
+
+def action_golgi(cell, inputs=CONSOLE):
+    """Golgi: Package & Export"""
+    return run_steps(organelle_steps(cell, GOLGI), inputs, cell)
+
+def action_membrane_repair(cell, inputs=CONSOLE):
+    """Membrane: Direct Lipid Repair"""
+    return run_steps(organelle_steps(cell, MEMBRANE_REPAIR), inputs, cell)
+
+# ============================================================================
+# GAME PHASES
+#    Each phase is a generator of steps, so the same game can be played on
+#    the terminal or over a socket (see SERVER). A step is a tuple
+#    (text, kind, prompt): show text, then ask prompt and send the answer
+#    back into the generator. kind is an ASK_* kind, PAUSE or WORK; a
+#    prompt of None means there is nothing to answer. A WORK step's prompt
+#    is a job (function, *args) whose result is the answer, so a server can
+#    run slow work (hint searches) away from its event loop. run_steps()
+#    plays steps on the terminal with an input provider.
+# ============================================================================
+
+WORK = 'work'   # Step kind: the prompt is a job to run, not a question
+
+def run_steps(steps, inputs=CONSOLE, cell=None):
+    """Play steps on the terminal, answering from inputs; returns what the steps return"""
+    answer = None
+    while True:
+        try:
+            text, kind, prompt = steps.send(answer)
+        except StopIteration as stop:
+            return stop.value
+        write(text)
+        answer = None
+        if prompt is None:
+            continue
+        if kind is PAUSE:
+            inputs.pause(prompt)
+            answer = ""
+        elif kind == WORK:
+            answer = prompt[0](*prompt[1:])
+        else:
+            answer = inputs.ask(kind, prompt, cell)
+
+def import_steps(cell):
+    """Phase 1: Import nutrients from environment"""
+    choice = (yield _IMPORT_SCREEN, ASK_TRANSPORT, "Choose (A/B): ").strip().upper()
+    while choice not in (ACTIVE_TRANSPORT, PASSIVE_DIFFUSION):
+        choice = (yield "Invalid choice! Please enter A or B\n", ASK_TRANSPORT, "Choose (A/B): ").strip().upper()
+
+    yield render_import(choice, *apply_import(cell, choice)), PAUSE, "\nPress ENTER to continue..."
+
+def event_steps(cell, rng=random):
+    """Phase 2: Random stress events"""
+    yield render_events(apply_events(cell, rng)), PAUSE, "\nPress ENTER to continue..."
+
+# Menu number of each organelle
+_MENU_ACTIONS = {str(action): action for action in ORGANELLE_ACTIONS}
+
+def action_steps(cell, hints=None):
+    """
+    Phase 3: Player chooses organelle actions
+    hints is the game's HintSearch (or anything else with a job() for
+    hints), so 'hint' can reuse earlier searches.
+    """
+    text = render_action_phase(cell)
+
+    actions_remaining = RULES.actions_per_turn
 
     while actions_remaining > 0:
-        print(f"\n--- Actions Remaining: {actions_remaining} ---")
         #Show status and warnings before each choice
-        show_compact_status()
-        show_warnings_and_tips()
-        print("\nAvailable Organelles:")
-
-        #1. Mitochondria
-        print("\n1. MITOCHONDRIA")
-        print("   Generate energy for other actions")
-        print(f"   → Uses: 1 Glucose ({cell.display_dots(1, 1)}) | Produces: 2 ATP ({cell.display_dots(2, 2)})")
-        print("     Good choice when: You're low on ATP")
-
-        #2. Ribosomes
-        print("\n2. RIBOSOMES")
-        print("   Build specialized proteins for different jobs")
-        print(f"   → Uses: 1 Amino Acid ({cell.display_dots(1, 1)}) + 1 ATP ({cell.display_dots(1, 1)})")
-        print("     Good choice when: Cell needs defense, repair, or enzyme boost")
-
-        #3. Smooth ER
-        print("\n3. SMOOTH ER")
-        print("   Make membrane materials to prevent rupture")
-        print(f"   → Uses: 1 Glucose ({cell.display_dots(1, 1)}) + 1 ATP ({cell.display_dots(1, 1)}) | Produces: 2 Lipids ({cell.display_dots(2, 2)})")
-        print("     Good choice when: Membrane integrity is dropping")
-
-        #4. Lysosomes
-        print("\n4. LYSOSOMES")
-        print("   Earn materials in return for cleaning up waste")
-        print(f"   → Uses: 1 ATP ({cell.display_dots(1, 1)}) | Removes: 2 Waste | Produces: 1 Amino Acid ({cell.display_dots(1, 1)})")
-        print("     Good choice when: Waste is ≥ 3 (it damages health!)")
-
-        #5. Golgi
-        print("\n5. GOLGI APPARATUS")
-        print("   Export proteins to get bonus glucose later")
-        print(f"   → Uses: 1 Amino Acid ({cell.display_dots(1, 1)}) + 1 ATP ({cell.display_dots(1, 1)}) | Next import: +1 Glucose")
-        print("     Good choice when: Planning ahead, glucose running low")
-        
-        # 6. Membrane Repair
-        print("\n6. MEMBRANE REPAIR")
-        print("   Direct repair of cell wall")
-        print(f"   → Uses: 2 Lipids ({cell.display_dots(2, 2)}) | Restores: 1 Membrane ({cell.display_dots(1, 1)})")
-        print("     Good choice when: Membrane is CRITICAL")
-        
-        print("\n7.   SKIP remaining actions")
+        choice = (yield text + render_action_menu(cell, actions_remaining),
+                  ASK_ORGANELLE, "\nChoose organelle (1-7): ").strip().lower()
+        text = ""
 
-        
-        choice = input("\nChoose organelle (1-7): ").strip().lower()
-        
         if choice == 'status':
-            cell.display_status()
+            text = render_status(cell)
             continue
-        
+
         if choice.startswith('learn'):
-            topic = choice.replace('learn', '').strip()
-            if topic in LEARN_MORE:
-                print(LEARN_MORE[topic])
-            else:
-                print("Topic not found. Try: atp, glucose, amino acids, lipids,")
-                print("mitochondria, ribosomes, smooth er, lysosomes, golgi, membrane")
-            input("\nPress ENTER to continue...")
+            yield render_learn(choice[len('learn'):]), PAUSE, "\nPress ENTER to continue..."
             continue
-        
-        #Snapshot before each action
-        before_atp = cell.atp
-        before_glucose = cell.glucose
-        before_aa = cell.amino_acids
-        before_lipids = cell.lipids
-        before_waste = cell.waste
-
-        success = False
-        if choice == '1':
-            success = action_mitochondria(cell)
-        elif choice == '2':
-            success = action_ribosomes(cell)
-        elif choice == '3':
-            success = action_smooth_er(cell)
-        elif choice == '4':
-            success = action_lysosomes(cell)
-        elif choice == '5':
-            success = action_golgi(cell)
-        elif choice == '6':
-            success = action_membrane_repair(cell)
+
+        if choice == 'hint':
+            if hints is None:
+                hints = HintSearch()
+            start = time.perf_counter()
+            _, stats = yield "", WORK, hints.job(cell, actions_remaining)
+            text = render_hint(stats, time.perf_counter() - start)
+            continue
+
+        #Mark the state before each action
+        before = cell.mark()
+
+        if choice in _MENU_ACTIONS:
+            success = yield from organelle_steps(cell, _MENU_ACTIONS[choice])
         elif choice == '7':
-            print("Skipping remaining actions...")
+            yield "Skipping remaining actions...\n", None, None
             break
         else:
-            print("Invalid choice!")
+            text = "Invalid choice!\n"
             continue
-        
+
         if success:
-            show_action_result(before_atp, before_glucose, before_aa, before_lipids, before_waste)
             actions_remaining -= 1
-            input("\nPress ENTER to continue...")
+            yield render_action_result(cell, cell.changes(before)), PAUSE, "\nPress ENTER to continue..."
 
-def maintenance_phase(cell):
+def maintenance_steps(cell):
     """Phase 4: Automatic maintenance and consequences"""
-    print("\n" + "="*60)
-    print("PHASE 4: CELLULAR MAINTENANCE")
-    print("="*60)
-    
-    changes = []
-    
-    # Membrane naturally decays (lipid turnover)
-    cell.membrane = max(0, cell.membrane - 1)
-    changes.append("  Membrane naturally decayed (-1) - lipid turnover")
-    
-    # Base ATP upkeep
-    cell.atp = max(0, cell.atp - 1)
-    changes.append("  Basic cellular functions consumed ATP (-1)")
-    
-    # Waste damage to health
-    if cell.waste >= 4:
-        cell.health = max(0, cell.health - 2)
-        changes.append("  HIGH waste levels damaged cell health (-2)!")
-    elif cell.waste >= 3:
-        cell.health = max(0, cell.health - 1)
-        changes.append("  Waste accumulation damaged health (-1)")
-    
-    print("\nAutomatic processes:")
-    for change in changes:
-        print(f"  • {change}")
-    
-    input("\nPress ENTER to see results...")
+    yield render_maintenance(apply_maintenance(cell)), PAUSE, "\nPress ENTER to see results..."
+
+def import_phase(cell, inputs=CONSOLE):
+    """Phase 1 on the terminal"""
+    run_steps(import_steps(cell), inputs, cell)
+
+def event_phase(cell, rng=random, inputs=CONSOLE):
+    """Phase 2 on the terminal"""
+    run_steps(event_steps(cell, rng), inputs, cell)
+
+def action_phase(cell, inputs=CONSOLE):
+    """Phase 3 on the terminal"""
+    run_steps(action_steps(cell), inputs, cell)
+
+def maintenance_phase(cell, inputs=CONSOLE):
+    """Phase 4 on the terminal"""
+    run_steps(maintenance_steps(cell), inputs, cell)
 
 def end_game_summary(cell, won):
     """Display educational summary"""
-    print("\n" + "="*60)
-    if won:
-        print("  CONGRATULATIONS! YOUR CELL SURVIVED!  ")
-    else:
-        print("  GAME OVER  ")
-    print("="*60)
-    
-    print("\n🎓 CELL BIOLOGY CONCEPTS YOU APPLIED:\n")
-    
-    print("  CELLULAR RESPIRATION")
-    print(f"   You used mitochondria to generate {cell.stats['atp_generated']} total ATP")
-    print("   Real equation: C₆H₁₂O₆ + 6O₂ → 6CO₂ + 6H₂O + 30 ATP\n")
-    
-    print("  PROTEIN SYNTHESIS")
-    print(f"   You synthesized {cell.stats['proteins_made']} proteins at ribosomes")
-    print("   Process: DNA → mRNA → Protein\n")
-    
-    print("  AUTOPHAGY & CELLULAR RECYCLING")
-    print(f"   Lysosomes recycled {cell.stats['waste_cleaned']} units of waste")
-    print("   This won the 2016 Nobel Prize in Medicine!\n")
-    
-    print("  ACTIVE vs PASSIVE TRANSPORT")
-    print(f"   Active transport: {cell.stats['active_transports']} times (costs ATP)")
-    print(f"   Passive diffusion: {cell.stats['passive_transports']} times (free)\n")
-    
-    print("  HOMEOSTASIS")
-    print("   You balanced energy, waste, repairs, and defense")
-    print("   Real cells do this every second!\n")
-    
-    print("="*60)
-    print(f"Turns Survived: {cell.turn - 1}/10")
-    print("="*60)
+    write(render_summary(cell, won))
 
 # ============================================================================
 # MAIN GAME LOOP
@@ -961,99 +2846,849 @@ def end_game_summary(cell, won):
     - Turns 4+: Player is on their own (test understanding)
     """
 
-def main():
-    """Main game loop"""
-    print("="*60)
-    print("  WELCOME TO MICROMANAGER!  ")
-    print("="*60)
-    print("\nYou are the manager of a eukaryotic cell!")
-    print("Your mission: Keep the cell alive for 10 turns.\n")
-    print("You'll manage resources, respond to stress events,")
-    print("and use organelles to maintain cellular homeostasis.\n")
-    print("Type 'learn [topic]' anytime to learn more about cell biology!")
-    print("Type 'status' during actions to check your resources.\n")
-    
-    input("Press ENTER to start your cellular adventure...")
-    
-    # Initialize game
-    cell = CellState()
-    
+def _welcome_screen(rules):
+    return f"""{RULE}
+  WELCOME TO MICROMANAGER!  
+{RULE}
+
+You are the manager of a eukaryotic cell!
+Your mission: Keep the cell alive for {rules.turns} turns.
+
+You'll manage resources, respond to stress events,
+and use organelles to maintain cellular homeostasis.
+
+Type 'learn [topic]' anytime to learn more about cell biology!
+Type 'status' during actions to check your resources.
+Type 'hint' during actions for a suggested organelle.
+
+"""
+
+def _set_screens(rules):
+    """Build the screens that quote rule numbers (menus, costs, game length) for rules"""
+    global _ACTION_MENU, _ACTION_PHASE_SCREEN, _IMPORT_SCREEN, ACTION_SCREENS, _WELCOME_SCREEN
+    _ACTION_MENU = _action_menu(rules)
+    _ACTION_PHASE_SCREEN = _action_phase_screen(rules)
+    _IMPORT_SCREEN = _import_screen(rules)
+    ACTION_SCREENS = _action_screens(rules)
+    _WELCOME_SCREEN = _welcome_screen(rules)
+
+_set_screens(DEFAULT_RULES)
+
+_TUTORIAL_SCREEN = banner("  TUTORIAL - TURN 1") + """
+First, you'll import nutrients from the environment.
+Try ACTIVE TRANSPORT to get more resources (costs ATP).
+Then use organelles to generate energy and build proteins!
+"""
+
+_TURN_TIPS = {
+    2: ("  TIP: Notice your Membrane went down? That's natural!\n"
+        "   Use Smooth ER to make lipids, then repair the membrane.\n\n"),
+    3: ("  TIP: Waste is building up from metabolism.\n"
+        "   Use Lysosomes to clean it and recycle amino acids!\n\n"),
+}
+
+_FAREWELL_SCREEN = """
+  Thank you for playing MicroManager!  
+
+Your cells are doing this RIGHT NOW in your body!
+Every second, billions of cells work together to keep you alive.
+
+"""
+
+_GOODBYE = "\n  Keep learning about the amazing world of cells!  \n"
+
+def game_steps(cell, rng=random, hints=None):
+    """
+    A whole game as steps (see GAME PHASES); returns whether the cell won.
+    hints answers 'hint' (a HintSearch for this game by default).
+    """
+    if hints is None:
+        hints = HintSearch()
+    yield _WELCOME_SCREEN, PAUSE, "Press ENTER to start your cellular adventure..."
+
     # Tutorial message for turn 1
     if cell.turn == 1:
-        print("\n" + "="*60)
-        print("  TUTORIAL - TURN 1")
-        print("="*60)
-        print("\nFirst, you'll import nutrients from the environment.")
-        print("Try ACTIVE TRANSPORT to get more resources (costs ATP).")
-        print("Then use organelles to generate energy and build proteins!")
-        input("\nPress ENTER to begin...")
-    
+        yield _TUTORIAL_SCREEN, PAUSE, "\nPress ENTER to begin..."
+
     # Main game loop
     while True:
+        # Nothing from past turns gets rolled back
+        cell.forget()
+
         # Display current status
-        cell.display_status()
-        
+        status = render_status(cell)
+
         # Check win condition
         if cell.check_win_condition():
-            end_game_summary(cell, won=True)
-            break
-        
+            yield status + render_summary(cell, True), None, None
+            return True
+
         # Tutorial hints
-        if cell.turn == 2:
-            print("  TIP: Notice your Membrane went down? That's natural!")
-            print("   Use Smooth ER to make lipids, then repair the membrane.\n")
-        elif cell.turn == 3:
-            print("  TIP: Waste is building up from metabolism.")
-            print("   Use Lysosomes to clean it and recycle amino acids!\n")
-        
+        yield status + _TURN_TIPS.get(cell.turn, ""), None, None
+
         # Phase 1: Import nutrients
-        import_phase(cell)
-        
+        yield from import_steps(cell)
+
         # Phase 2: Events
-        event_phase(cell)
-        
+        yield from event_steps(cell, rng)
+
         # Check lose condition after events
         lost, reason = cell.check_lose_conditions()
         if lost:
-            print("\n" + "="*60)
-            print(f"  {reason}")
-            print("="*60)
-            end_game_summary(cell, won=False)
-            break
-        
+            yield banner(f"  {reason}") + render_summary(cell, False), None, None
+            return False
+
         # Phase 3: Player actions
-        action_phase(cell)
-        
+        yield from action_steps(cell, hints)
+
         # Phase 4: Maintenance
-        maintenance_phase(cell)
-        
+        yield from maintenance_steps(cell)
+
         # Check lose condition after maintenance
         lost, reason = cell.check_lose_conditions()
         if lost:
-            print("\n" + "="*60)
-            print(f"  {reason}")
-            print("="*60)
-            end_game_summary(cell, won=False)
-            break
-        
+            yield banner(f"  {reason}") + render_summary(cell, False), None, None
+            return False
+
         # Advance to next turn
         cell.turn += 1
-    
-    # End game
-    print("\n  Thank you for playing MicroManager!  ")
-    print("\nYour cells are doing this RIGHT NOW in your body!")
-    print("Every second, billions of cells work together to keep you alive.\n")
-    
-    # Offer to play again
-    again = input("Play again? (y/n): ").strip().lower()
-    if again == 'y':
-        main()
+
+def main(seed=None, record=None, inputs=CONSOLE, results=None):
+    """
+    Main game loop
+    seed replays the same events as an earlier game (every game played
+    this session, if the player plays again); record is a file path to
+    save a replay log of each game to, numbered from the second game on
+    (game.mmr, game-2.mmr, ...); inputs is the input provider answering
+    the prompts (see INPUT); results is a ResultsStore to save the
+    finished games to.
+    """
+    games = 0
+    while True:
+        games += 1
+        game_seed = new_seed() if seed is None else seed
+
+        # Initialize game
+        cell = JournaledCell()
+        if record:
+            cell.recorder = ReplayRecorder(game_seed)
+
+        won = run_steps(game_steps(cell, EventStream(game_seed)), inputs, cell)
+        if results is not None:
+            results.add(cell, won, 'game', player_name(inputs), game_seed)
+            results.flush()
+
+        # End game
+        print(f"\nGame seed: {game_seed}  (python micromanager.py --seed {game_seed} to replay these events)")
+        if cell.recorder is not None:
+            path = _numbered_path(record, games)
+            cell.recorder.finish(cell, won)
+            cell.recorder.save(path)
+            print(f"Replay log saved to {path}")
+
+        write(_FAREWELL_SCREEN)
+
+        # Offer to play again
+        try:
+            again = inputs.ask(ASK_AGAIN, "Play again? (y/n): ").strip().lower()
+        except EOFError:
+            again = 'n'
+        if again != 'y':
+            write(_GOODBYE)
+            return
+
+def _numbered_path(path, n):
+    """path for the first game of a session, path with -n before the extension after that"""
+    if n == 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}-{n}{ext}"
+
+# ============================================================================
+# SIMULATION
+#    Monte Carlo tournaments: many headless games per policy, spread over
+#    a process pool. Game g of a seed always gets EventStream(seed, g), so
+#    every policy faces the same events in it. Games are split into
+#    fixed-size chunks, each with its own seeded RNG for the policy, so
+#    results only depend on the seed (not on how many workers ran them).
+#    Workers send back counters, never per-game objects.
+# ============================================================================
+
+POLICIES = {
+    'random': RandomPolicy,
+    'greedy': GreedyPolicy,
+    'lookahead': LookaheadPolicy,
+}
+
+SIMULATION_CHUNK = 1000
+
+def _chunk_rng(seed, chunk):
+    """Independent RNG stream for one chunk of games"""
+    digest = hashlib.sha256(f"{seed}:{chunk}".encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+def _simulate_chunk(policy_name, seed, chunk, n_games, rules=None, results=None):
+    """
+    Play one chunk of games (under rules, if given) and return only
+    summary counters. With a results database path, the games are also
+    saved there from this process.
+    """
+    store = ResultsStore(results) if results else None
+    with rules_in_use(rules or RULES):
+        policy = POLICIES[policy_name]()
+        rng = _chunk_rng(seed, chunk)
+        wins = 0
+        reasons = {}
+        turns_survived = [0] * (RULES.turns + 1)
+        stats = dict.fromkeys(CellState().stats, 0)
+        first = chunk * SIMULATION_CHUNK
+        for game in range(first, first + n_games):
+            cell, won, reason = play_game(policy, rng, events=EventStream(seed, game))
+            if won:
+                wins += 1
+            else:
+                reasons[reason] = reasons.get(reason, 0) + 1
+            turns_survived[cell.turn - 1] += 1
+            for key, value in cell.stats.items():
+                stats[key] += value
+            if store is not None:
+                store.add(cell, won, 'simulate', policy_name, seed, game)
+        if store is not None:
+            store.close()
+    if PROFILER is not None:
+        PROFILER.flush()  # Worker processes skip atexit
+    return policy_name, wins, reasons, turns_survived, stats
+
+def _paired_chunk(names, seed, chunk, n_games, rules=None):
+    """
+    Play one chunk of games with two policies, each game on the same
+    events for both. Returns sums of the turns survived, their squares
+    and the differences (first minus second) and their squares, and
+    how often each policy lasted longer
+    """
+    with rules_in_use(rules or RULES):
+        players = [(POLICIES[name](), _chunk_rng(seed, chunk)) for name in names]
+        sums = [0] * 6  # a, a², b, b², a - b, (a - b)²
+        longer = [0, 0]
+        first = chunk * SIMULATION_CHUNK
+        for game in range(first, first + n_games):
+            a, b = (play_game(policy, rng, events=EventStream(seed, game))[0].turn - 1
+                    for policy, rng in players)
+            for i, value in enumerate((a, b, a - b)):
+                sums[2 * i] += value
+                sums[2 * i + 1] += value * value
+            if a != b:
+                longer[a < b] += 1
+    if PROFILER is not None:
+        PROFILER.flush()  # Worker processes skip atexit
+    return sums, longer
+
+def compare_policies(a, b, games=10000, workers=None, seed=0, rules=None):
+    """
+    Paired comparison of two policies on common random numbers: game g
+    of the seed has the same events for both (as in simulate(), whose
+    results for either policy this reproduces). Returns the mean
+    difference in turns survived (a minus b) with its 95% confidence
+    interval, the standard error unpaired runs of the same size would
+    have had, and how many games each policy lasted longer.
+    """
+    for name in (a, b):
+        if name not in POLICIES:
+            raise ValueError(f"Unknown policy: {name!r}")
+    rules = rules or RULES
+    tasks = [((a, b), seed, chunk, min(SIMULATION_CHUNK, games - start), rules)
+             for chunk, start in enumerate(range(0, games, SIMULATION_CHUNK))]
+    if workers == 1:
+        outputs = [_paired_chunk(*task) for task in tasks]
+    else:
+        with _worker_pool(workers) as pool:
+            outputs = list(pool.map(_paired_chunk, *zip(*tasks)))
+
+    sums = [sum(column) for column in zip(*(chunk_sums for chunk_sums, _ in outputs))]
+    longer = [sum(column) for column in zip(*(chunk_longer for _, chunk_longer in outputs))]
+    def variance(total, squares):
+        return max(squares / games - (total / games) ** 2, 0.0) * games / max(games - 1, 1)
+    mean = sums[4] / games
+    stderr = math.sqrt(variance(sums[4], sums[5]) / games)
+    return {
+        'games': games,
+        'mean_difference': mean,
+        'ci': (mean - 1.96 * stderr, mean + 1.96 * stderr),
+        'stderr': stderr,
+        'unpaired_stderr': math.sqrt((variance(sums[0], sums[1]) + variance(sums[2], sums[3])) / games),
+        'longer': {a: longer[0], b: longer[1]},
+    }
+
+def print_comparison(a, b, comparison):
+    low, high = comparison['ci']
+    print(f"\n{a} vs {b}, {comparison['games']:,} games on the same events:")
+    print(f"  {a} survives {comparison['mean_difference']:+.3f} turns "
+          f"(95% CI {low:+.3f} to {high:+.3f})")
+    print(f"  standard error {comparison['stderr']:.4f} paired, "
+          f"{comparison['unpaired_stderr']:.4f} if the events were independent")
+    print(f"  lasted longer: {a} in {comparison['longer'][a]:,} games, "
+          f"{b} in {comparison['longer'][b]:,}")
+
+def _wilson_interval(wins, games, z=1.96):
+    """95% confidence interval for a win rate"""
+    if games == 0:
+        return 0.0, 0.0
+    p = wins / games
+    center = (p + z * z / (2 * games)) / (1 + z * z / games)
+    spread = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    return max(0.0, center - spread), min(1.0, center + spread)
+
+def simulate(policies=('random',), games=10000, workers=None, seed=0, rules=None, results=None):
+    """
+    Play `games` full games with each named policy (see POLICIES), under
+    a RuleSet if given (default: RULES). results is the path of a
+    results database to save every game to (see RESULTS DATABASE).
+    Returns {policy: summary} with win rate, confidence interval,
+    loss reasons, turns survived histogram and mean stats.
+    """
+    rules = rules or RULES
+    if results:
+        ResultsStore(results).close()  # Create it before the workers race to
+    tasks = []
+    for name in policies:
+        if name not in POLICIES:
+            raise ValueError(f"Unknown policy: {name!r}")
+        for chunk, start in enumerate(range(0, games, SIMULATION_CHUNK)):
+            tasks.append((name, seed, chunk, min(SIMULATION_CHUNK, games - start), rules, results))
+
+    totals = {name: {'games': 0, 'wins': 0, 'losses': {}, 'turns_survived': [0] * (rules.turns + 1),
+                     'stats': dict.fromkeys(CellState().stats, 0)} for name in policies}
+
+    if workers == 1:
+        outputs = (_simulate_chunk(*task) for task in tasks)
+        _reduce(totals, outputs)
+    else:
+        with _worker_pool(workers) as pool:
+            _reduce(totals, pool.map(_simulate_chunk, *zip(*tasks)))
+
+    for result in totals.values():
+        n = result['games']
+        result['win_rate'] = result['wins'] / n if n else 0.0
+        result['win_rate_ci'] = _wilson_interval(result['wins'], n)
+        result['mean_stats'] = {key: value / n for key, value in result.pop('stats').items()}
+    return totals
+
+def _reduce(totals, outputs):
+    for name, wins, reasons, turns_survived, stats in outputs:
+        result = totals[name]
+        result['games'] += sum(turns_survived)
+        result['wins'] += wins
+        for reason, count in reasons.items():
+            result['losses'][reason] = result['losses'].get(reason, 0) + count
+        result['turns_survived'] = [a + b for a, b in zip(result['turns_survived'], turns_survived)]
+        for key, value in stats.items():
+            result['stats'][key] += value
+
+def print_simulation_report(results):
+    """Print a simulate() result table"""
+    for name, result in results.items():
+        low, high = result['win_rate_ci']
+        print("\n" + "="*60)
+        print(f"POLICY: {name}  ({result['games']:,} games)")
+        print("="*60)
+        print(f"  Win rate: {result['win_rate']:.2%}  (95% CI {low:.2%} - {high:.2%})")
+        print("\n  Causes of death:")
+        for reason, count in sorted(result['losses'].items(), key=lambda item: -item[1]):
+            print(f"    {count / result['games']:7.2%}  {reason.strip()}")
+        print("\n  Turns survived:")
+        for turns, count in enumerate(result['turns_survived']):
+            if count:
+                print(f"    {turns:2d}: {count / result['games']:7.2%}")
+        print("\n  Average stats per game:")
+        for key, value in result['mean_stats'].items():
+            print(f"    {key:<20} {value:6.2f}")
+
+def add_rule_arguments(parser):
+    """--scale and --turns options for a command that plays games"""
+    parser.add_argument('--scale', type=int, default=1, metavar='N',
+                        help="multiply every resource amount by N (e.g. 200 for 0-1000 meters)")
+    parser.add_argument('--turns', type=int, metavar='N',
+                        help=f"game length (default {DEFAULT_RULES.turns})")
+
+def rules_from_args(parser, args):
+    """Switch to the RuleSet asked for by add_rule_arguments() options"""
+    try:
+        use_rules(scaled_rules(args.scale, args.turns))
+    except ValueError as e:
+        parser.error(str(e))
+
+def simulate_main(argv=None):
+    """Command line: python micromanager.py simulate [options]"""
+    parser = argparse.ArgumentParser(prog="micromanager.py simulate",
+                                     description="Run Monte Carlo games for one or more policies")
+    parser.add_argument('policies', nargs='*', default=['random'],
+                        help=f"policies to compare ({', '.join(POLICIES)})")
+    parser.add_argument('-n', '--games', type=int, default=10000)
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--paired', action='store_true',
+                        help="also compare each policy with the first on the same events")
+    add_rule_arguments(parser)
+    add_results_arguments(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    rules_from_args(parser, args)
+    if args.profile:
+        enable_profiling(args.profile)
+
+    start = time.perf_counter()
+    results = simulate(args.policies, args.games, args.workers, args.seed,
+                       results=None if args.no_results else args.results)
+    print_simulation_report(results)
+    if args.paired:
+        for other in args.policies[1:]:
+            print_comparison(args.policies[0], other,
+                             compare_policies(args.policies[0], other, args.games, args.workers,
+                                              args.seed, rules=RULES))
+    print(f"\nSimulated in {time.perf_counter() - start:.2f}s")
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+
+def _describe_turn(cell, records, lost, reason):
+    """One-line summary of a replayed turn"""
+    mode, events, actions = records
+    choices = [ACTION_NAMES[action] + (f"({subchoice})" if subchoice else "")
+               for action, subchoice in actions]
+    print(f"Turn {cell.turn if lost else cell.turn - 1:2d}: "
+          f"{'ACTIVE' if mode == ACTIVE_TRANSPORT else 'PASSIVE'} | "
+          f"{', '.join(event.name.strip() for event in events)} | "
+          f"{', '.join(choices) or 'no actions'}")
+    if lost:
+        print(f"         {reason}")
+
+def replay_main(argv=None):
+    """Command line: python micromanager.py replay LOG... [--turn N]"""
+    parser = argparse.ArgumentParser(prog="micromanager.py replay",
+                                     description="Fast-forward through recorded games")
+    parser.add_argument('logs', nargs='+', help="replay log files")
+    parser.add_argument('--turn', type=int, help="show the cell at the start of this turn")
+    parser.add_argument('--summary', action='store_true',
+                        help="one line per game (for checking many logs)")
+    args = parser.parse_args(argv)
+
+    for path in args.logs:
+        replay = Replay.load(path)
+        with rules_in_use(replay.rules):
+            _show_replay(path, replay, args)
+
+def _show_replay(path, replay, args):
+    if args.summary:
+        cell, won, reason = replay.play()
+        outcome = "SURVIVED" if won else reason.strip()
+        print(f"{path}: seed {replay.seed}, {cell.turn - 1} turns, {outcome}")
+    elif args.turn:
+        print(f"{path} (seed {replay.seed})")
+        replay.state_at(args.turn).display_status()
     else:
-        print("\n  Keep learning about the amazing world of cells!  ")
+        print(f"{path} (seed {replay.seed})")
+        cell, won, _ = replay.play(on_turn=_describe_turn)
+        end_game_summary(cell, won)
+
+# ============================================================================
+# SERVER
+#    A whole class on one machine: a line-based TCP server (telnet or nc)
+#    where every connection is a coroutine playing its own game_steps() on
+#    one shared event loop, with no thread per player. Output is only sent
+#    when a session stops to ask something, and the session then waits for
+#    the client to take it (drain) before reading the answer, so a client
+#    that stops reading holds up its own game and nobody else's. Sessions
+#    that go quiet for too long are closed. Hints (WORK steps) are searched
+#    in a pool of worker processes and finished games are saved by one
+#    results thread, so neither stalls the loop.
+# ============================================================================
+
+SERVER_IDLE_TIMEOUT = 600          # Seconds to wait for an answer (or a drain)
+SERVER_LINE_LIMIT = 1024           # Longest accepted answer, in bytes
+SERVER_WRITE_BUFFER = 64 * 1024    # Unsent bytes per session before drain() waits
+SERVER_HINT_WORKERS = 2            # Hint worker processes
+
+_worker_hints = None   # A hint worker's HintSearch, shared by the games it serves
+
+def _start_hint_worker(rules, budget, profile):
+    """Pool initializer: search hints by the server's rules and budget"""
+    global HINT_BUDGET
+    use_rules(rules)
+    HINT_BUDGET = budget
+    _start_worker(profile)
+
+def _pooled_best_action(bits, actions_left):
+    """HintSearch.best_action() for a packed cell, in a hint worker"""
+    global _worker_hints
+    if _worker_hints is None:
+        _worker_hints = HintSearch()
+    return _worker_hints.best_action(unpack_cell(bits), actions_left)
+
+class _PooledHints:
+    """Hints for a served game, as jobs for the server's hint workers"""
+
+    def job(self, cell, actions_left):
+        return _pooled_best_action, pack_cell(cell), actions_left
+
+async def _ask(reader, writer, text, idle_timeout):
+    """Send text, then wait for one line back"""
+    writer.write(text.encode())
+    try:
+        await asyncio.wait_for(writer.drain(), idle_timeout)
+    except asyncio.TimeoutError:
+        writer.transport.abort()
+        raise ConnectionResetError("client stopped reading")
+    line = await asyncio.wait_for(reader.readline(), idle_timeout)
+    if not line:
+        raise EOFError("client disconnected")
+    return line.decode('utf-8', 'replace').rstrip("\r\n")
+
+async def _play_steps(steps, reader, writer, pause, idle_timeout, executor=None):
+    """run_steps() for a socket, running WORK jobs in executor; returns what the steps return"""
+    pending = []
+    answer = None
+    while True:
+        try:
+            text, kind, prompt = steps.send(answer)
+        except StopIteration as stop:
+            writer.write("".join(pending).encode())
+            return stop.value
+        pending.append(text)
+        answer = ""
+        if kind == WORK:
+            answer = await asyncio.get_running_loop().run_in_executor(executor, *prompt)
+            continue
+        if prompt is None or (kind is PAUSE and not pause):
+            continue
+        answer = await _ask(reader, writer, "".join(pending) + prompt, idle_timeout)
+        pending.clear()
+
+def _save_game(results, cell, won, seed):
+    """Save one served game, in the server's results thread"""
+    results.add(cell, won, 'serve', 'human', seed)
+    results.flush()
+
+async def _serve_session(reader, writer, pause, idle_timeout, results=None, hint_pool=None,
+                         results_thread=None):
+    """One connected player: games until they stop, time out or disconnect"""
+    try:
+        while True:
+            seed = new_seed()
+            cell = JournaledCell()
+            steps = game_steps(cell, EventStream(seed), _PooledHints())
+            won = await _play_steps(steps, reader, writer, pause, idle_timeout, hint_pool)
+            if results is not None:
+                await asyncio.get_running_loop().run_in_executor(results_thread, _save_game,
+                                                                  results, cell, won, seed)
+            again = await _ask(reader, writer,
+                               f"\nGame seed: {seed}\n{_FAREWELL_SCREEN}Play again? (y/n): ",
+                               idle_timeout)
+            if again.strip().lower() != 'y':
+                writer.write(_GOODBYE.encode())
+                break
+    except asyncio.TimeoutError:
+        writer.write(b"\n\nNo answer for a while - session closed.\n")
+    except (EOFError, ValueError, ConnectionError):
+        pass  # Client left, or sent a line longer than SERVER_LINE_LIMIT
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+async def serve(host='127.0.0.1', port=8023, pause=True,
+                idle_timeout=SERVER_IDLE_TIMEOUT, max_sessions=10000, ready=None, results=None,
+                hint_workers=SERVER_HINT_WORKERS):
+    """
+    Serve games until cancelled. Connections past max_sessions are turned
+    away. ready, if given, is an asyncio.Event set once the server listens.
+    Finished games are saved to results (a ResultsStore), if given, by a
+    thread of its own. Hints are searched by hint_workers processes,
+    HINT_BUDGET seconds each.
+    """
+    active = 0
+    hint_pool = ProcessPoolExecutor(max_workers=hint_workers, initializer=_start_hint_worker,
+                                    initargs=(RULES, HINT_BUDGET, PROFILER.path if PROFILER is not None else None))
+    results_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix='results')
+
+    async def handle(reader, writer):
+        nonlocal active
+        if active >= max_sessions:
+            writer.write(b"Server full - please try again later.\n")
+            writer.close()
+            return
+        writer.transport.set_write_buffer_limits(high=SERVER_WRITE_BUFFER)
+        active += 1
+        try:
+            await _serve_session(reader, writer, pause, idle_timeout, results, hint_pool, results_thread)
+        finally:
+            active -= 1
+
+    try:
+        server = await asyncio.start_server(handle, host, port, limit=SERVER_LINE_LIMIT, backlog=1024)
+        for sock in server.sockets:
+            print(f"Serving MicroManager on {sock.getsockname()[0]}:{sock.getsockname()[1]}")
+        if ready is not None:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+    finally:
+        hint_pool.shutdown(wait=False, cancel_futures=True)
+        results_thread.shutdown()  # Saves still queued finish before results can be closed
+
+def serve_main(argv=None):
+    global HINT_BUDGET
+    parser = argparse.ArgumentParser(prog="micromanager.py serve",
+                                     description="Host MicroManager games over TCP (connect with telnet or nc)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8023)
+    parser.add_argument('--idle-timeout', type=float, default=SERVER_IDLE_TIMEOUT,
+                        help=f"seconds before a silent session is closed (default {SERVER_IDLE_TIMEOUT})")
+    parser.add_argument('--max-sessions', type=int, default=10000)
+    parser.add_argument('--no-pause', action='store_true',
+                        help="skip the 'Press ENTER' prompts between phases")
+    parser.add_argument('--hint-budget', type=float, default=HINT_BUDGET * 1000, metavar='MS',
+                        help=f"how long 'hint' may search (default {HINT_BUDGET * 1000:.0f} ms)")
+    parser.add_argument('--hint-workers', type=int, default=SERVER_HINT_WORKERS, metavar='N',
+                        help=f"processes searching hints, off the event loop (default {SERVER_HINT_WORKERS})")
+    add_rule_arguments(parser)
+    add_results_arguments(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    rules_from_args(parser, args)
+    if args.profile:
+        enable_profiling(args.profile)
+    HINT_BUDGET = args.hint_budget / 1000
+    results = results_from_args(args)
+    try:
+        asyncio.run(serve(args.host, args.port, not args.no_pause,
+                          args.idle_timeout, args.max_sessions, results=results,
+                          hint_workers=args.hint_workers))
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+    finally:
+        if results is not None:
+            results.close()
+
+# ============================================================================
+# PROFILING
+#    Opt-in timing of the phases, organelle actions and engine functions.
+#    enable_profiling() swaps each function in PROFILED for a wrapper that
+#    records wall time, resource changes and event ids into a ring buffer,
+#    written out as JSON lines whenever it fills and at exit. The phases
+#    are step generators (see GAME PHASES), so for them only the time spent
+#    inside the phase counts, not the time waiting for the player. Nothing is
+#    wrapped unless it is called, so normal play and simulation pay nothing.
+#    Commands turn it on with --profile FILE (default $MICROMANAGER_PROFILE);
+#    importing the module never does. Simulation workers are started
+#    profiling to the same file.
+# ============================================================================
+
+PROFILED = (
+    'play_turn', 'apply_import', 'apply_events', 'apply_action', 'apply_maintenance',
+    'import_steps', 'event_steps', 'action_steps', 'maintenance_steps', 'organelle_steps',
+)
+
+_PROFILED_FIELDS = ('atp', 'glucose', 'amino_acids', 'lipids', 'health', 'membrane', 'waste')
+
+# Extra details recorded for some functions: name -> detail(args, result)
+_PROFILE_DETAILS = {
+    'apply_import': lambda args, result: {'mode': result[0]},
+    'apply_events': lambda args, result: {'events': [event['id'] for event in result]},
+    'apply_action': lambda args, result: {'action': ACTION_NAMES[args[0]], 'ok': result[0]},
+    'organelle_steps': lambda args, result: {'action': ACTION_NAMES[args[0]], 'ok': result},
+}
+
+PROFILER = None
+
+class Profiler:
+    """Ring buffer of call records, flushed to path as JSON lines"""
+
+    def __init__(self, path=None, size=4096):
+        self.path = path
+        self.size = size
+        self.records = [None] * size
+        self.count = 0      # Records made so far
+        self.flushed = 0    # Records already written to path
+
+    def record(self, entry):
+        self.records[self.count % self.size] = entry
+        self.count += 1
+        if self.path and self.count - self.flushed == self.size:
+            self.flush()
+
+    def recent(self):
+        """Records still in the buffer, oldest first"""
+        start = max(self.count - self.size, 0)
+        return [self.records[i % self.size] for i in range(start, self.count)]
+
+    def flush(self):
+        """Append unwritten records to path (records that were overwritten are lost)"""
+        start = max(self.flushed, self.count - self.size)
+        if self.path and start < self.count:
+            lines = "".join(json.dumps(self.records[i % self.size]) + "\n"
+                            for i in range(start, self.count))
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+        self.flushed = self.count
+
+def _profiled(name, func, profiler):
+    """func wrapped to record each call in profiler"""
+    detail = _PROFILE_DETAILS.get(name)
+    clock = time.perf_counter
+
+    def finish(cell, turn, before, elapsed, args, result):
+        # The pid of the process making the call: wrappers made before a
+        # fork (simulate's pool workers) are shared by every child
+        entry = {'name': name, 'pid': os.getpid(), 'turn': turn, 'us': round(elapsed * 1e6, 2)}
+        delta = {field: getattr(cell, field) - old
+                 for field, old in zip(_PROFILED_FIELDS, before) if getattr(cell, field) != old}
+        if delta:
+            entry['delta'] = delta
+        if detail is not None:
+            entry.update(detail(args, result))
+        profiler.record(entry)
+
+    if inspect.isgeneratorfunction(func):
+        @wraps(func)
+        def wrapper(cell, *args, **kwargs):
+            before = [getattr(cell, field) for field in _PROFILED_FIELDS]
+            turn = cell.turn
+            steps = func(cell, *args, **kwargs)
+            elapsed = 0.0
+            answer = None
+            while True:
+                start = clock()
+                try:
+                    step = steps.send(answer)
+                except StopIteration as stop:
+                    finish(cell, turn, before, elapsed + clock() - start, args, stop.value)
+                    return stop.value
+                elapsed += clock() - start
+                answer = yield step
+    else:
+        @wraps(func)
+        def wrapper(cell, *args, **kwargs):
+            before = [getattr(cell, field) for field in _PROFILED_FIELDS]
+            turn = cell.turn
+            start = clock()
+            result = func(cell, *args, **kwargs)
+            finish(cell, turn, before, clock() - start, args, result)
+            return result
+
+    wrapper.unprofiled = func
+    return wrapper
+
+def enable_profiling(path=None, size=4096):
+    """Start recording every call to the PROFILED functions. Returns the Profiler"""
+    global PROFILER
+    if PROFILER is not None:
+        return PROFILER
+    PROFILER = Profiler(path, size)
+    module = sys.modules[__name__]
+    for name in PROFILED:
+        setattr(module, name, _profiled(name, getattr(module, name), PROFILER))
+    if path:
+        atexit.register(PROFILER.flush)
+    return PROFILER
+
+def add_profile_argument(parser):
+    """--profile option of a command, for enable_profiling()"""
+    parser.add_argument('--profile', metavar='FILE', default=os.environ.get('MICROMANAGER_PROFILE'),
+                        help="record call timings as JSON lines (default $MICROMANAGER_PROFILE)")
+
+def _start_worker(profile):
+    """Pool initializer: profile a worker to its parent's file, if the parent profiles"""
+    if profile is None:
+        return
+    if PROFILER is not None:
+        PROFILER.flushed = PROFILER.count  # Forked with the parent's records, which the parent writes
+    enable_profiling(profile)
+
+def _worker_pool(workers):
+    """ProcessPoolExecutor for simulation chunks"""
+    return ProcessPoolExecutor(max_workers=workers, initializer=_start_worker,
+                               initargs=(PROFILER.path if PROFILER is not None else None,))
+
+def profile_report(path):
+    """Per-function calls, total and mean time, and mean resource changes"""
+    totals = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            key = f"{entry['name']} {entry['action']}" if 'action' in entry else entry['name']
+            calls, us, deltas = totals.get(key, (0, 0.0, {}))
+            for field, change in entry.get('delta', {}).items():
+                deltas[field] = deltas.get(field, 0) + change
+            totals[key] = (calls + 1, us + entry['us'], deltas)
+
+    lines = [f"{'function':<34}{'calls':>10}{'total ms':>12}{'mean µs':>10}  mean changes"]
+    for key, (calls, us, deltas) in sorted(totals.items(), key=lambda item: -item[1][1]):
+        changes = " ".join(f"{field} {total / calls:+.2f}" for field, total in deltas.items())
+        lines.append(f"{key:<34}{calls:>10,}{us / 1000:>12.1f}{us / calls:>10.2f}  {changes}")
+    return "\n".join(lines)
+
+def profile_main(argv=None):
+    """Command line: python micromanager.py profile FILE"""
+    parser = argparse.ArgumentParser(prog="micromanager.py profile",
+                                     description="Summarize a profile written with --profile")
+    parser.add_argument('file')
+    args = parser.parse_args(argv)
+    print(profile_report(args.file))
 
 # ============================================================================
 # RUN
 # ============================================================================
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if sys.argv[1:2] == ["simulate"]:
+        simulate_main(sys.argv[2:])
+    elif sys.argv[1:2] == ["replay"]:
+        replay_main(sys.argv[2:])
+    elif sys.argv[1:2] == ["serve"]:
+        serve_main(sys.argv[2:])
+    elif sys.argv[1:2] == ["profile"]:
+        profile_main(sys.argv[2:])
+    elif sys.argv[1:2] == ["results"]:
+        results_main(sys.argv[2:])
+    else:
+        parser = argparse.ArgumentParser(description="MicroManager - A Strategy Game of Organelles and Energy",
+                                         epilog="Also: 'simulate', 'replay', 'serve', 'profile' and 'results' subcommands "
+                                                "(see --help on each)")
+        parser.add_argument('--seed', type=int, help="replay the events of an earlier game")
+        parser.add_argument('--record', metavar='FILE', help="save a replay log of each game (FILE, then FILE-2, ...)")
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument('--script', metavar='FILE',
+                            help="read answers from a file, one per line ('-' for stdin)")
+        source.add_argument('--policy', choices=sorted(POLICIES), help="let a bot play")
+        parser.add_argument('--no-pause', action='store_true',
+                            help="skip the 'Press ENTER' prompts between phases")
+        parser.add_argument('--hint-budget', type=float, default=HINT_BUDGET * 1000, metavar='MS',
+                            help=f"how long 'hint' may search (default {HINT_BUDGET * 1000:.0f} ms)")
+        add_rule_arguments(parser)
+        add_results_arguments(parser)
+        add_profile_argument(parser)
+        args = parser.parse_args()
+        rules_from_args(parser, args)
+        if args.profile:
+            enable_profiling(args.profile)
+        HINT_BUDGET = args.hint_budget / 1000
+
+        pause = not args.no_pause
+        if args.script:
+            inputs = ScriptInput.from_file(args.script, pause)
+        elif args.policy:
+            inputs = PolicyInput(POLICIES[args.policy](), pause=pause)
+        else:
+            inputs = ConsoleInput(pause)
+        results = results_from_args(args)
+        try:
+            main(args.seed, args.record, inputs, results)
+        except EOFError:
+            print("\nInput ended.")
+        finally:
+            if results is not None:
+                results.close()
\ No newline at end of file
@@ -0,0 +1,371 @@
+"""
+MicroManager - Optimal Play Solver
+Works out the best possible strategy and the exact chance of survival.
+
+Every resource in the game is 0-5, there are only 10 turns and a few
+flags, so the whole game is a small finite decision problem. The solver
+runs expectimax as dynamic programming over it:
+
+1. Forward pass: starting from a new CellState, find every state that
+   can be reached on each turn (under any choices and any events), with
+   the transitions between them. Transitions are computed for all states
+   of a turn at once with the vectorized rules in batch.py.
+2. Backward pass: from turn 10 down to turn 1, the player's choices
+   (transport mode, then up to 3 organelle actions) take the best
+   outcome and events take the probability-weighted average over
+   event_distribution().
+
+The solution is cached on disk, keyed by a hash of the rules, so it is
+only recomputed when the rules change.
+
+Requires NumPy.
+
+Example:
+    python solver.py
+"""
+
+import hashlib
+import inspect
+import os
+import sys
+import time
+
+import numpy as np
+
+import batch
+import micromanager as mm
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.solver_cache')
+
+# Player choices inside the action phase: every organelle, with each
+# ribosome protein type counted as its own choice
+CHOICES = tuple(
+    (action, subchoice)
+    for action in mm.ORGANELLE_ACTIONS
+    for subchoice in (mm.RIBOSOME_CHOICES if action == mm.RIBOSOMES else (None,))
+)
+STOP = -1  # Policy entry for "skip remaining actions"
+
+# ============================================================================
+# STATE INDEX
+#    Every state that matters for survival as one int: the seven 0-5
+#    resources in base 6, then the three flags and the ATP crisis counter,
+#    then the pending delayed cuts. A cut only ever takes away one use's
+#    yield, so cuts past the most that use can yield play the same and
+#    are stored as that most (CUT_LIMITS), each a digit in base limit + 1.
+#    Cuts due at an import after the last turn's never play and are dropped.
+# ============================================================================
+
+N_CUTS = len(mm.DELAYED_SLOTS)
+
+def _cut_limits():
+    """Largest cut that still matters at each of mm.DELAYED_SLOTS"""
+    rules = mm.DEFAULT_RULES
+    most = {(mm.ON_IMPORT, 'glucose'): rules.active_glucose + rules.golgi_glucose,
+            (mm.ON_IMPORT, 'amino_acids'): rules.import_amino_acids,
+            (mm.ON_MITOCHONDRIA, 'atp'): rules.mito_atp + rules.enzyme_atp}
+    return tuple(most[trigger, resource] for trigger, resource, _ in mm.DELAYED_SLOTS)
+
+CUT_LIMITS = np.array(_cut_limits(), dtype=np.int8)
+# Imports that must still come for each slot's cut to be used (0 if not an import cut)
+CUT_IMPORTS = np.array([offset + 1 if trigger == mm.ON_IMPORT else 0
+                        for trigger, _, offset in mm.DELAYED_SLOTS])
+N_STATES = 6 ** len(batch.RESOURCES) * 8 * 2 * int(np.prod(CUT_LIMITS.astype(np.int64) + 1))
+
+def encode(cells):
+    """
+    State index of every cell in a CellBatch, which has had this turn's
+    import; -1 for cells that died
+    """
+    index = np.zeros(cells.n, dtype=np.int64)
+    cuts = np.minimum(cells.cuts, CUT_LIMITS)
+    cuts[:, CUT_IMPORTS > mm.DEFAULT_RULES.turns - cells.turn] = 0
+    digits = [(6, getattr(cells, name)) for name in batch.RESOURCES]
+    digits += [(8, cells.flags), (2, cells.atp_crisis_turns)]
+    digits += [(int(limit) + 1, cuts[:, slot]) for slot, limit in enumerate(CUT_LIMITS)]
+    for base, digit in digits:
+        index *= base
+        index += digit
+    index[~cells.alive] = -1
+    return index
+
+def decode(index, turn):
+    """CellBatch holding the states at these indexes"""
+    index = np.asarray(index, dtype=np.int64)
+    cells = batch.CellBatch(len(index))
+    cells.turn = turn
+    for slot in reversed(range(N_CUTS)):
+        base = int(CUT_LIMITS[slot]) + 1
+        cells.cuts[:, slot] = index % base
+        index = index // base
+    cells.atp_crisis_turns[:] = index % 2
+    index = index // 2
+    cells.flags[:] = index % 8
+    index = index // 8
+    for name in reversed(batch.RESOURCES):
+        getattr(cells, name)[:] = index % 6
+        index = index // 6
+    return cells
+
+def state_index(cell, imported=True):
+    """
+    State index of a single CellState in its action phase, or with
+    imported=False at the start of its turn (indexed like the end of
+    the turn before, which is where the solver reaches it from)
+    """
+    cells = batch.CellBatch.from_cells([cell])
+    if not imported:
+        cells.turn -= 1
+    return int(encode(cells)[0])
+
+# ============================================================================
+# RULES HASH
+# ============================================================================
+
+def rules_hash():
+    """Hash of the source of every rule the solution depends on"""
+    digest = hashlib.sha256()
+    digest.update(inspect.getsource(batch).encode())
+    for part in (mm.CellState.__init__, mm.CellState.check_win_condition,
+                 mm.event_distribution, mm.get_event_for_turn):
+        digest.update(inspect.getsource(part).encode())
+    for turn in range(1, 11):
+        for p, events in mm.event_distribution(turn):
+            digest.update(repr((p, [event.id for event in events])).encode())
+    digest.update(repr(mm.EVENTS).encode())
+    digest.update(repr(mm.DEFAULT_RULES).encode())
+    digest.update(repr((CHOICES, mm.ACTIONS_PER_TURN)).encode())
+    return digest.hexdigest()[:16]
+
+# ============================================================================
+# SOLVER
+# ============================================================================
+
+def _unique(index):
+    """Sorted distinct state indexes, without the -1 of lost games"""
+    index = np.sort(index, axis=None)
+    keep = np.empty(len(index), dtype=bool)
+    keep[:1] = True
+    np.not_equal(index[1:], index[:-1], out=keep[1:])
+    keep &= index >= 0
+    return index[keep]
+
+def _lookup(states, index):
+    """Positions of index in the sorted array states (-1 stays -1)"""
+    pos = np.searchsorted(states, np.maximum(index, 0))
+    return np.where(index >= 0, pos, -1)
+
+def _values_at(values, pos):
+    """values[pos], with 0 (a lost game) wherever pos is -1"""
+    return np.where(pos >= 0, values[np.maximum(pos, 0)], 0.0)
+
+
+class Solution:
+    """
+    Optimal policy and survival probability for every reachable state.
+
+    For each turn (1-10):
+      states[turn]      sorted state indexes at the start of the turn
+      values[turn]      survival probability of each, with perfect play
+      transport[turn]   best transport mode of each (True = active)
+      action_states[turn][left]   sorted states in the action phase with
+                                  `left` actions remaining
+      action_choice[turn][left]   index into CHOICES, or STOP
+    """
+
+    def __init__(self):
+        self.states = {}
+        self.values = {}
+        self.transport = {}
+        self.action_states = {}
+        self.action_choice = {}
+
+    def _find(self, states, cell, imported=True):
+        index = state_index(cell, imported)
+        pos = int(np.searchsorted(states, index))
+        if pos == len(states) or states[pos] != index:
+            raise KeyError("State is not reachable from a new game")
+        return pos
+
+    def survival_probability(self, cell):
+        """Chance to win from the start of cell's current turn"""
+        if cell.check_win_condition():
+            return 1.0
+        return float(self.values[cell.turn][self._find(self.states[cell.turn], cell, False)])
+
+    def best_transport(self, cell):
+        pos = self._find(self.states[cell.turn], cell, False)
+        return mm.ACTIVE_TRANSPORT if self.transport[cell.turn][pos] else mm.PASSIVE_DIFFUSION
+
+    def best_action(self, cell, actions_left):
+        """Best (action, subchoice) during the action phase, or None to stop"""
+        pos = self._find(self.action_states[cell.turn][actions_left], cell)
+        choice = self.action_choice[cell.turn][actions_left][pos]
+        return None if choice == STOP else CHOICES[choice]
+
+    def save(self, path):
+        arrays = {}
+        for turn in self.states:
+            arrays[f"states_{turn}"] = self.states[turn]
+            arrays[f"values_{turn}"] = self.values[turn]
+            arrays[f"transport_{turn}"] = self.transport[turn]
+            for left in self.action_states[turn]:
+                arrays[f"action_states_{turn}_{left}"] = self.action_states[turn][left]
+                arrays[f"action_choice_{turn}_{left}"] = self.action_choice[turn][left]
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        solution = cls()
+        with np.load(path) as arrays:
+            for turn in range(1, 11):
+                solution.states[turn] = arrays[f"states_{turn}"]
+                solution.values[turn] = arrays[f"values_{turn}"]
+                solution.transport[turn] = arrays[f"transport_{turn}"]
+                solution.action_states[turn] = {}
+                solution.action_choice[turn] = {}
+                for left in range(mm.ACTIONS_PER_TURN + 1):
+                    solution.action_states[turn][left] = arrays[f"action_states_{turn}_{left}"]
+                    solution.action_choice[turn][left] = arrays[f"action_choice_{turn}_{left}"]
+        return solution
+
+
+def _explore_turn(turn, states):
+    """
+    Forward pass for one turn: every transition out of `states`.
+    Returns a dict of the intermediate state sets and transition arrays.
+    """
+    n = len(states)
+    graph = {'states': states}
+
+    # Phase 1: both transport modes
+    start = decode(states, turn)
+    graph['imports'] = []
+    for active in (True, False):
+        cells = start.copy()
+        cells.apply_import(np.full(n, active))
+        graph['imports'].append(encode(cells))
+    imported = _unique(np.concatenate(graph['imports']))
+    graph['imported'] = imported
+
+    # Phase 2: every event outcome, then the lose check. Outcomes whose
+    # events have identical effects are merged and only simulated once.
+    outcomes = {}
+    for p, events in mm.event_distribution(turn):
+        indexes = tuple(event.id for event in events)
+        effects = tuple((event.health, event.membrane, event.waste, event.sets, event.blockable,
+                         event.delayed) for event in events)
+        total, _ = outcomes.get(effects, (0.0, indexes))
+        outcomes[effects] = (total + p, indexes)
+
+    start = decode(imported, turn)
+    graph['events'] = []
+    for p, indexes in outcomes.values():
+        cells = start.copy()
+        for i in indexes:
+            cells.apply_event(np.full(len(imported), i, dtype=np.int8))
+        cells.check_lose_conditions()
+        graph['events'].append((p, encode(cells)))
+    level = _unique(np.concatenate([after for _, after in graph['events']]))
+
+    # Phase 3: organelle choices, one level per action remaining
+    graph['levels'] = {mm.ACTIONS_PER_TURN: level}
+    graph['choices'] = {}
+    for left in range(mm.ACTIONS_PER_TURN, 0, -1):
+        start = decode(level, turn)
+        afters = []
+        for action, subchoice in CHOICES:
+            cells = start.copy()
+            sub = mm.RIBOSOME_CHOICES.index(subchoice) if subchoice else 0
+            legal = cells.apply_actions(np.full(len(level), action, dtype=np.int8),
+                                        np.full(len(level), sub, dtype=np.int8))
+            afters.append(np.where(legal, encode(cells), -1))
+        graph['choices'][left] = afters
+        level = _unique(np.concatenate(afters))
+        graph['levels'][left - 1] = level
+
+    # Phase 4: maintenance and the lose check, from any action level
+    ending = _unique(np.concatenate(list(graph['levels'].values())))
+    cells = decode(ending, turn)
+    cells.apply_maintenance()
+    cells.check_lose_conditions()
+    graph['ending'] = ending
+    graph['maintenance'] = encode(cells)
+    return graph
+
+
+def _solve_turn(graph, next_states, next_values, solution, turn):
+    """Backward pass for one turn, given the values of the next turn"""
+    # Phase 4: surviving maintenance leads to the next turn
+    end_values = _values_at(next_values, _lookup(next_states, graph['maintenance']))
+
+    # Phase 3: stop (go to maintenance) or take the best legal choice
+    solution.action_states[turn] = {}
+    solution.action_choice[turn] = {}
+    values = None
+    for left in range(mm.ACTIONS_PER_TURN + 1):
+        level = graph['levels'][left]
+        best = end_values[_lookup(graph['ending'], level)]
+        choice = np.full(len(level), STOP, dtype=np.int8)
+        if left > 0:
+            below = graph['levels'][left - 1]
+            for c, after in enumerate(graph['choices'][left]):
+                value = np.where(after >= 0, _values_at(values, _lookup(below, after)), -1.0)
+                better = value > best
+                best = np.where(better, value, best)
+                choice[better] = c
+        solution.action_states[turn][left] = level
+        solution.action_choice[turn][left] = choice
+        values = best
+
+    # Phase 2: average over events
+    level = graph['levels'][mm.ACTIONS_PER_TURN]
+    imported_values = np.zeros(len(graph['imported']))
+    for p, after in graph['events']:
+        imported_values += p * _values_at(values, _lookup(level, after))
+
+    # Phase 1: best transport mode
+    active, passive = (imported_values[_lookup(graph['imported'], after)]
+                       for after in graph['imports'])
+    solution.states[turn] = graph['states']
+    solution.values[turn] = np.maximum(active, passive)
+    solution.transport[turn] = active > passive
+
+
+def solve(cache_dir=CACHE_DIR, use_cache=True):
+    """Solve the game from a new CellState. Returns a Solution"""
+    if mm.RULES != mm.DEFAULT_RULES:
+        raise ValueError("The solver only models the default rules (see batch.py)")
+    path = os.path.join(cache_dir, f"solution-{rules_hash()}.npz")
+    if use_cache and os.path.exists(path):
+        return Solution.load(path)
+
+    # Forward: reachable states and transitions, turn by turn
+    graphs = {}
+    states = np.array([state_index(mm.CellState(), imported=False)], dtype=np.int64)
+    for turn in range(1, 11):
+        graphs[turn] = _explore_turn(turn, states)
+        states = _unique(graphs[turn]['maintenance'])
+
+    # Backward: every state that survives turn 10 has won
+    solution = Solution()
+    next_values = np.ones(len(states))
+    for turn in range(10, 0, -1):
+        _solve_turn(graphs.pop(turn), states, next_values, solution, turn)
+        states, next_values = solution.states[turn], solution.values[turn]
+
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        solution.save(path)
+    return solution
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    solution = solve(use_cache='--no-cache' not in sys.argv)
+    elapsed = time.perf_counter() - start
+    cell = mm.CellState()
+    turn_states = sum(len(states) for states in solution.states.values())
+    print(f"Solved in {elapsed:.2f}s ({turn_states:,} reachable turn states)")
+    print(f"Best possible survival chance: {solution.survival_probability(cell):.4%}")
+    print(f"Best opening transport: {solution.best_transport(cell)}")
@@ -0,0 +1,184 @@
+"""
+MicroManager - Rule Sweeps
+Measures how rule changes move the win rate, for balancing.
+
+Each command-line argument varies one RuleSet field over a list of
+values (1,2,3) or an inclusive range (0:2); every combination is a grid
+point. Each point is simulated with each reference policy, one point per
+worker process. Results are cached on disk keyed by the rules hash (the
+RuleSet values plus the engine code that reads them), the policy, the
+number of games and the seed, so widening a grid only simulates the new
+points.
+
+Example:
+    python sweep.py mito_atp=1:3 membrane_decay=0,1
+    python sweep.py er_lipids=1:3 --policies greedy lookahead -n 50000 --json sweep.json
+"""
+
+import argparse
+import hashlib
+import inspect
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import micromanager as mm
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sweep_cache.json')
+REFERENCE_POLICIES = ('greedy', 'lookahead')
+
+# ============================================================================
+# GRID
+# ============================================================================
+
+def parse_axis(spec):
+    """'field=1,2,3' or 'field=0:2' -> (field, values)"""
+    field, _, values = spec.partition('=')
+    if field not in mm.RuleSet._fields:
+        raise ValueError(f"Unknown rule: {field!r} (see micromanager.RuleSet)")
+    if ':' in values:
+        low, high = values.split(':')
+        return field, tuple(range(int(low), int(high) + 1))
+    return field, tuple(int(value) for value in values.split(','))
+
+def grid(axes, base=mm.DEFAULT_RULES):
+    """Every combination of the axes as a RuleSet, in order"""
+    fields = [field for field, _ in axes]
+    for values in itertools.product(*(values for _, values in axes)):
+        yield base._replace(**dict(zip(fields, values)))
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+def point_key(rules, policy, games, seed):
+    """Cache key of one simulated point"""
+    digest = hashlib.sha256(mm.rules_hash(rules).encode())
+    digest.update(inspect.getsource(mm.POLICIES[policy]).encode())
+    digest.update(repr((policy, games, seed)).encode())
+    return digest.hexdigest()[:24]
+
+def load_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_cache(cache, path):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+# ============================================================================
+# SWEEP
+# ============================================================================
+
+def _evaluate(rules, policy, games, seed):
+    """One grid point with one policy, in a worker process"""
+    result = mm.simulate((policy,), games, workers=1, seed=seed, rules=rules)[policy]
+    survived = result['turns_survived']
+    return {
+        'win_rate': result['win_rate'],
+        'win_rate_ci': list(result['win_rate_ci']),
+        'mean_turns': sum(turns * count for turns, count in enumerate(survived)) / result['games'],
+        'losses': result['losses'],
+    }
+
+def sweep(axes, policies=REFERENCE_POLICIES, games=10000, seed=0, workers=None,
+          cache_path=CACHE_PATH, progress=None):
+    """
+    Evaluate every grid point with every policy. Returns a list of
+    (rules, {policy: result}) in grid order, and the number of
+    (point, policy) pairs that had to be simulated. progress, if given,
+    is called with (done, total) as pairs finish.
+    """
+    points = list(grid(axes))
+    cache = load_cache(cache_path) if cache_path else {}
+    results = [(rules, {}) for rules in points]
+
+    todo = {}
+    for i, rules in enumerate(points):
+        mm.check_rules(rules)
+        for policy in policies:
+            key = point_key(rules, policy, games, seed)
+            if key in cache:
+                results[i][1][policy] = cache[key]
+            else:
+                todo[key] = (i, rules, policy)
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_evaluate, rules, policy, games, seed): key
+                       for key, (_, rules, policy) in todo.items()}
+            for done, future in enumerate(as_completed(futures), 1):
+                key = futures[future]
+                i, _, policy = todo[key]
+                results[i][1][policy] = cache[key] = future.result()
+                if cache_path:
+                    save_cache(cache, cache_path)  # Keep finished points if interrupted
+                if progress:
+                    progress(done, len(todo))
+    return results, len(todo)
+
+
+def print_sweep(axes, policies, results):
+    fields = [field for field, _ in axes]
+    header = "".join(f"{field:>16}" for field in fields)
+    header += "".join(f"{policy + ' win':>16}{'turns':>7}" for policy in policies)
+    print(header)
+    for rules, by_policy in results:
+        row = "".join(f"{getattr(rules, field):>16}" for field in fields)
+        for policy in policies:
+            result = by_policy[policy]
+            row += f"{result['win_rate']:>16.2%}{result['mean_turns']:>7.2f}"
+        print(row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Win rates of MicroManager rule variants")
+    parser.add_argument('axes', nargs='+', metavar='FIELD=VALUES',
+                        help="a RuleSet field and its values, e.g. mito_atp=1,2,3 or mito_atp=1:3")
+    parser.add_argument('--policies', nargs='+', default=list(REFERENCE_POLICIES),
+                        choices=sorted(mm.POLICIES))
+    parser.add_argument('-n', '--games', type=int, default=10000, help="games per point and policy")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--json', metavar='FILE', help="also write the results as JSON")
+    args = parser.parse_args(argv)
+    try:
+        axes = [parse_axis(spec) for spec in args.axes]
+    except ValueError as e:
+        parser.error(str(e))
+
+    def progress(done, total):
+        print(f"\r  {done}/{total} simulated", end="", file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    try:
+        for rules in grid(axes):
+            mm.check_rules(rules)
+    except ValueError as e:
+        parser.error(str(e))
+    results, simulated = sweep(axes, args.policies, args.games, args.seed, args.workers,
+                               None if args.no_cache else CACHE_PATH, progress)
+    if simulated:
+        print(file=sys.stderr)
+    print_sweep(axes, args.policies, results)
+    print(f"\n{len(results)} points, {simulated} simulated, "
+          f"{len(results) * len(args.policies) - simulated} from cache, "
+          f"in {time.perf_counter() - start:.2f}s")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([{'rules': rules._asdict(), 'results': by_policy}
+                       for rules, by_policy in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+import analytics
+import micromanager as mm
+
+
+def test_transitions_chain_turn_to_turn():
+    last = None
+    for t in analytics.transitions(200, 'random', seed=1):
+        if last is not None and t.game == last.game:
+            assert (t.turn, t.before) == (last.turn + 1, last.after)
+        else:
+            assert t.turn == 1 and t.before == mm.PackedCell.from_cell(mm.CellState())
+        assert len(t.actions) <= mm.RULES.actions_per_turn
+        assert bool(t.reason) == t.lost
+        last = t
+
+
+def test_stats_agree_with_simulate():
+    games, seed = 500, 2
+    stats = analytics.analyze(games, 'greedy', seed)
+    summary = mm.simulate(['greedy'], games, workers=1, seed=seed)['greedy']
+    assert (stats.games, stats.wins) == (games, summary['wins'])
+    assert {reason: sum(counts) for reason, counts in stats.deaths.items()} == summary['losses']
+    # Cells that started each turn: everyone who survived the turns before it
+    started = [games - sum(summary['turns_survived'][:turn - 1]) for turn in range(1, 11)]
+    assert list(stats.turns[1:]) == started
+    for turn in range(1, 11):
+        if stats.turns[turn]:
+            assert sum(stats.distribution('atp', turn)) == pytest.approx(1.0)
+
+
+def test_stats_are_sized_from_the_rules_in_play():
+    with mm.rules_in_use(mm.scaled_rules(20, turns=15)):
+        stats = analytics.analyze(50, 'greedy')
+        assert len(stats.distribution('atp', 1)) == 101
+        assert list(stats.report()['turns'])[0] == 1
+
+
+def test_quantile_sketch_tracks_quantiles_and_merges():
+    rng = random.Random(0)
+    values = [rng.random() for _ in range(100000)]
+    sketch, other = analytics.QuantileSketch(), analytics.QuantileSketch(seed=1)
+    for value in values[:50000]:
+        sketch.add(value)
+    for value in values[50000:]:
+        other.add(value)
+    sketch.merge(other)
+    assert sketch.count == len(values)
+    assert sum(len(level) for level in sketch.levels) < 2000
+    for q in (0.1, 0.5, 0.9):
+        assert sketch.quantile(q) == pytest.approx(q, abs=0.02)
+    assert analytics.QuantileSketch().quantile(0.5) is None
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import api
+import micromanager as mm
+
+
+def test_token_round_trip():
+    tokens = api.Tokens(b'secret')
+    cell = mm.CellState()
+    mm.apply_event(cell, mm.EVENTS[9])
+    cell.atp, cell.turn, cell.golgi_bonus = 1, 6, True
+    cell.stats['proteins_made'] = 300
+    game = api.Game(cell, 1 << 63, api.ACTIONS, 2)
+    loaded = tokens.load(tokens.dump(game))
+    assert (loaded.seed, loaded.phase, loaded.actions_left) == (1 << 63, api.ACTIONS, 2)
+    assert mm.pack_cell(loaded.cell) == mm.pack_cell(cell)
+    assert loaded.cell.stats == cell.stats
+
+
+@pytest.mark.parametrize('token', ('', '!!!', 'AAAA'))
+def test_malformed_token_is_rejected(token):
+    with pytest.raises(ValueError):
+        api.Tokens(b'secret').load(token)
+
+
+def test_token_from_other_secret_is_rejected():
+    token = api.Tokens(b'secret').dump(api.Game(mm.CellState(), 0))
+    with pytest.raises(ValueError, match="signature"):
+        api.Tokens(b'other').load(token)
+
+
+def token_values(token):
+    data = api.base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))[:-api.TOKEN_MAC_SIZE]
+    values, pos = [], 1
+    while pos < len(data):
+        value, pos = mm._read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def test_tokens_hide_the_seed():
+    tokens = api.Tokens(b'secret')
+    seed = 123456789
+    first, second = (tokens.dump(api.Game(mm.CellState(), seed)) for _ in range(2))
+    assert seed not in token_values(first) and seed not in token_values(second)
+    assert token_values(first)[3] != token_values(second)[3]
+    assert tokens.load(first).seed == tokens.load(second).seed == seed
+
+
+def test_steps_play_the_seeded_game():
+    games = api.GameAPI(b'secret')
+    token = games.new_game({'seed': 5})['token']
+    status, response = games.handle('POST', '/step', json.dumps({'token': token, 'action': 'B'}))
+    assert status == 200
+
+    cell = mm.CellState()
+    mm.apply_import(cell, mm.PASSIVE_DIFFUSION)
+    mm.apply_events(cell, mm.EventStream(5, 0))
+    assert mm.pack_cell(games.tokens.load(response['token']).cell) == mm.pack_cell(cell)
+
+
+def test_active_transport_without_atp_is_refused():
+    games = api.GameAPI(b'secret')
+    cell = mm.CellState()
+    cell.atp = mm.RULES.active_cost - 1
+    token = games.tokens.dump(api.Game(cell, 0))
+    assert games.state({'token': token})['legal'] == [mm.PASSIVE_DIFFUSION]
+    status, response = games.handle('POST', '/step', json.dumps({'token': token, 'action': 'A'}))
+    assert status == 409 and 'ATP' in response['error']
@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import batch
+import micromanager as mm
+
+LOSS_REASONS = {batch.LOST_HEALTH: 'health', batch.LOST_MEMBRANE: 'membrane', batch.LOST_ATP: 'atp'}
+
+
+def random_cells(n, seed):
+    """Cells with random resources, flags and pending cuts on turn 5"""
+    rng = random.Random(seed)
+    cells = []
+    for _ in range(n):
+        cell = mm.CellState()
+        for name in batch.RESOURCES:
+            setattr(cell, name, rng.randint(0, 5))
+        cell.health, cell.membrane = rng.randint(1, 5), rng.randint(1, 5)
+        cell.has_defender, cell.enzyme_boost, cell.golgi_bonus = (rng.random() < 0.5 for _ in range(3))
+        cell.effects.load([rng.randint(0, 2) for _ in mm.DELAYED_SLOTS])
+        cell.turn = 5
+        cells.append(cell)
+    return cells
+
+
+def same_cells(cells, cell_batch):
+    return [mm.pack_cell(cell) for cell in cells] == [
+        mm.pack_cell(cell_batch.to_cell(i)) for i in range(cell_batch.n)]
+
+
+@pytest.mark.parametrize('active', (True, False))
+def test_import_matches_engine(active):
+    cells = random_cells(300, 0)
+    cell_batch = batch.CellBatch.from_cells(cells)
+    cell_batch.apply_import(np.full(len(cells), active))
+    for cell in cells:
+        mm.apply_import(cell, mm.ACTIVE_TRANSPORT if active else mm.PASSIVE_DIFFUSION)
+    assert same_cells(cells, cell_batch)
+
+
+def test_events_match_engine():
+    for event in mm.EVENTS:
+        cells = random_cells(100, event.id)
+        cell_batch = batch.CellBatch.from_cells(cells)
+        cell_batch.apply_event(np.full(len(cells), event.id, dtype=np.int8))
+        for cell in cells:
+            mm.apply_event(cell, event)
+        assert same_cells(cells, cell_batch), event.name
+
+
+@pytest.mark.parametrize('choice', mm.ORGANELLE_CHOICES)
+def test_actions_match_engine(choice):
+    action, subchoice = choice
+    cells = random_cells(300, action)
+    cell_batch = batch.CellBatch.from_cells(cells)
+    sub = mm.RIBOSOME_CHOICES.index(subchoice) if subchoice else 0
+    legal = cell_batch.apply_actions(np.full(len(cells), action, dtype=np.int8),
+                                     np.full(len(cells), sub, dtype=np.int8))
+    assert legal.tolist() == [bool(mm.apply_action(cell, action, subchoice)[0]) for cell in cells]
+    assert same_cells(cells, cell_batch)
+
+
+def test_maintenance_matches_engine():
+    cells = random_cells(300, 1)
+    cell_batch = batch.CellBatch.from_cells(cells)
+    cell_batch.apply_maintenance()
+    for cell in cells:
+        mm.apply_maintenance(cell)
+    assert same_cells(cells, cell_batch)
+
+
+def test_greedy_games_match_engine():
+    seed, n = 3, 500
+    cell_batch = batch.CellBatch(n)
+    policy = batch.GreedyBatchPolicy()
+    while cell_batch.turn <= mm.RULES.turns and cell_batch.alive.any():
+        cell_batch.play_turn(policy, np.random.default_rng(0), seed)
+
+    for game in range(n):
+        cell, won, _ = mm.play_game(mm.GreedyPolicy(), events=mm.EventStream(seed, game))
+        reason = LOSS_REASONS.get(int(cell_batch.loss_reason[game]))
+        assert (bool(cell_batch.won()[game]), reason) == (won, mm.loss_name(cell, won)), game
+        assert cell_batch.turns_survived[game] == (cell.turn - 1 if not won else mm.RULES.turns), game
+        assert {name: int(getattr(cell_batch, name)[game]) for name in batch.STATS} == cell.stats, game
+
+
+def test_random_policy_weights_choices_like_the_engine():
+    cells = batch.CellBatch(90000)
+    cells.atp[:], cells.amino_acids[:], cells.waste[:] = 5, 5, 3  # Every choice is legal
+    actions, subchoices = batch.RandomBatchPolicy().action(cells, np.random.default_rng(0))
+    picked = {choice: 0 for choice in mm.ORGANELLE_CHOICES}
+    for action, sub in zip(actions.tolist(), subchoices.tolist()):
+        picked[action, mm.RIBOSOME_CHOICES[sub] if action == mm.RIBOSOMES else None] += 1
+    share = 1 / len(mm.ORGANELLE_CHOICES)
+    for choice, count in picked.items():
+        assert count / cells.n == pytest.approx(share, abs=0.01), choice
+
+
+def test_seeded_runs_do_not_depend_on_chunk_size():
+    assert batch.run_games(3000, seed=4) == batch.run_games(3000, seed=4, chunk_size=1000)
@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+import micromanager as mm
+
+
+def cell_with(**fields):
+    cell = mm.CellState()
+    for name, value in fields.items():
+        setattr(cell, name, value)
+    return cell
+
+
+@pytest.mark.parametrize('name', sorted(mm.POLICIES))
+def test_bots_only_plan_choices_that_succeed(name):
+    policy = mm.POLICIES[name]()
+    rng = random.Random(0)
+    for game in range(30):
+        cell = mm.CellState()
+        while not cell.check_win_condition():
+            view = mm.PackedCell.from_cell(cell)
+            trial = mm.unpack_cell(view.bits)
+            plan = policy.actions(view, mm.legal_choices(view), rng)
+            if name != 'random':  # Random shuffles every legal choice, as fallbacks
+                for choice in plan:
+                    assert mm.apply_action(trial, *choice)[0], choice
+            if mm.play_turn(cell, policy, rng, mm.EventStream(3, game))[0]:
+                break
+
+
+def test_transport_follows_the_active_cost():
+    view = mm.PackedCell.from_cell(cell_with(atp=1))
+    assert mm.Policy().transport(view, None) == mm.ACTIVE_TRANSPORT
+    with mm.rules_in_use(mm.DEFAULT_RULES._replace(active_cost=2)):
+        assert mm.Policy().transport(view, None) == mm.PASSIVE_DIFFUSION
+        assert mm.GreedyPolicy().transport(mm.PackedCell.from_cell(cell_with(atp=3)), None) \
+            == mm.PASSIVE_DIFFUSION
+
+
+def test_state_score_prices_waste_by_the_rules_in_play():
+    assert mm.state_score(cell_with(waste=3)) < mm.state_score(cell_with(waste=1))
+    with mm.rules_in_use(mm.DEFAULT_RULES._replace(waste_damage_at=5, high_waste_at=5)):
+        assert mm.state_score(cell_with(waste=3)) == mm.state_score(cell_with(waste=1))
+
+
+def test_lookahead_wins_a_known_game():
+    # Game 2986 of seed 1 is the first of 20,000 the lookahead bot wins
+    cell, won, _ = mm.play_game(mm.LookaheadPolicy(), events=mm.EventStream(1, 2986))
+    assert won and cell.turn == mm.RULES.turns + 1
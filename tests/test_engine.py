@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+import micromanager as mm
+
+
+def random_cell(rng):
+    cell = mm.CellState()
+    for name in mm.PACKED_FIELDS:
+        setattr(cell, name, rng.randint(0, mm.RULES.max_value))
+    cell.enzyme_boost = rng.random() < 0.5
+    return cell
+
+
+def test_active_transport_costs_atp_and_falls_back_without_it():
+    cell = mm.CellState()
+    atp, glucose = cell.atp, cell.glucose
+    assert mm.apply_import(cell, mm.ACTIVE_TRANSPORT)[0] == mm.ACTIVE_TRANSPORT
+    assert cell.atp == atp - mm.RULES.active_cost
+    assert cell.glucose == glucose + mm.RULES.active_glucose
+
+    cell = mm.CellState()
+    cell.atp = mm.RULES.active_cost - 1
+    assert mm.apply_import(cell, mm.ACTIVE_TRANSPORT)[0] == mm.PASSIVE_DIFFUSION
+    assert cell.stats['passive_transports'] == 1
+
+
+def test_unknown_transport_mode_is_rejected():
+    with pytest.raises(ValueError):
+        mm.apply_import(mm.CellState(), 'C')
+
+
+def test_can_act_matches_apply_action():
+    rng = random.Random(0)
+    for _ in range(500):
+        cell = random_cell(rng)
+        for action, subchoice in mm.ORGANELLE_CHOICES:
+            before = mm.pack_cell(cell), dict(cell.stats)
+            legal = mm.can_act(cell, action)
+            success, _ = mm.apply_action(cell, action, subchoice)
+            assert success == legal
+            if success:
+                cell = mm.unpack_cell(before[0])
+                cell.stats = before[1]
+            else:
+                assert (mm.pack_cell(cell), cell.stats) == before  # A failed action changes nothing
+
+
+def test_energy_crisis_after_consecutive_turns_without_atp():
+    cell = mm.CellState()
+    cell.atp = 0
+    for _ in range(1, mm.RULES.crisis_turns):
+        assert cell.check_lose_conditions() == (False, "")
+    assert cell.check_lose_conditions()[0]
+
+
+class EagerPolicy(mm.Policy):
+    """Asks for every legal choice, twice over"""
+
+    def actions(self, view, legal, rng):
+        return list(legal) * 2
+
+
+def test_play_turn_uses_at_most_actions_per_turn(monkeypatch):
+    used = []
+    apply_action = mm.apply_action
+
+    def counting(cell, action, subchoice=None):
+        success, message = apply_action(cell, action, subchoice)
+        used.append(success)
+        return success, message
+
+    monkeypatch.setattr(mm, 'apply_action', counting)
+    mm.play_turn(mm.CellState(), EagerPolicy(), random.Random(0))
+    assert 0 < sum(used) <= mm.RULES.actions_per_turn
+
+
+def test_headless_games_print_nothing(capsys):
+    rng = random.Random(0)
+    for _ in range(50):
+        cell, won, reason = mm.play_game(mm.RandomPolicy(), rng)
+        assert won or reason
+        assert won == cell.check_win_condition()
+    assert capsys.readouterr() == ('', '')
@@ -0,0 +1,82 @@
+import numpy as np
+
+import env as gym
+import micromanager as mm
+
+TURN = gym.OBSERVATION.index('turn')
+CHOOSING = gym.OBSERVATION.index('choosing_transport')
+
+
+def play(env, steps, seed=0):
+    """Random legal actions for steps steps; returns every step's output"""
+    rng = np.random.default_rng(seed)
+    observation, info = env.reset()
+    outputs = []
+    for _ in range(steps):
+        output = env.step(gym.sample_actions(info['action_mask'], rng))
+        info = output[4]
+        outputs.append(output)
+    return observation, outputs
+
+
+def test_reset_starts_on_the_transport_choice():
+    env = gym.VectorEnv(8, seed=3)
+    observation, info = env.reset()
+    assert observation.shape == (8, len(gym.OBSERVATION)) and observation.dtype == np.float32
+    assert (observation[:, TURN] == 1).all() and (observation[:, CHOOSING] == 1).all()
+    mask = info['action_mask']
+    assert mask.shape == (8, gym.N_ACTIONS)
+    assert mask[:, gym.PASSIVE].all() and not mask[:, gym.FIRST_CHOICE:].any()
+
+
+def test_illegal_actions_change_nothing():
+    env = gym.VectorEnv(4)
+    observation, info = env.reset()
+    illegal = np.full(4, gym.END_TURN)
+    assert not info['action_mask'][:, gym.END_TURN].any()
+    after, reward, terminated, truncated, info = env.step(illegal)
+    assert (after == observation).all()
+    assert not reward.any() and not terminated.any() and not truncated.any()
+
+
+def test_masks_match_the_engine():
+    env = gym.VectorEnv(16, seed=1)
+    _, outputs = play(env, 30)
+    mask = outputs[-1][4]['action_mask']
+    for row, game in zip(mask, env.games):
+        if game.choosing_transport:
+            assert row[gym.ACTIVE] == (game.cell.atp >= mm.RULES.active_cost)
+            continue
+        for i, choice in enumerate(gym.CHOICES):
+            assert row[gym.FIRST_CHOICE + i] == mm.can_act(game.cell, choice[0])
+
+
+def test_finished_games_start_over():
+    env = gym.VectorEnv(32, seed=2)
+    _, outputs = play(env, 200)
+    finished = 0
+    for observation, reward, terminated, truncated, info in outputs:
+        done = terminated | truncated
+        finished += done.sum()
+        assert (info['won'] == (reward > 0)).all()
+        assert (reward[~terminated] == 0).all()
+        assert (observation[done, TURN] == 1).all() and (observation[done, CHOOSING] == 1).all()
+        assert (info['final_observation'][done, TURN] >= 1).all()
+        assert not info['final_observation'][~done].any()
+    assert finished > 0
+
+
+def test_subprocess_envs_match_one_process():
+    local = gym.VectorEnv(6, seed=4)
+    split = gym.SubprocVectorEnv(6, seed=4, workers=2)
+    try:
+        expected, expected_outputs = play(local, 60)
+        observation, outputs = play(split, 60)
+    finally:
+        split.close()
+    assert (observation == expected).all()
+    for output, expected_output in zip(outputs, expected_outputs):
+        for value, expected_value in zip(output[:4], expected_output[:4]):
+            assert (value == expected_value).all()
+        for key, value in output[4].items():
+            assert (value == expected_output[4][key]).all()
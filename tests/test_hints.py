@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import micromanager as mm
+from test_server import TRANSPORT_PROMPT, connect, run_with_server
+
+ORGANELLE_PROMPT = b"Choose organelle (1-7): "
+
+
+def test_hints_rank_legal_choices_by_visits():
+    cell = mm.CellState()
+    mm.apply_import(cell, mm.PASSIVE_DIFFUSION)
+    choice, stats = mm.HintSearch(budget=0.05, seed=1).best_action(cell, mm.RULES.actions_per_turn)
+    legal = set(mm.legal_choices(mm.PackedCell.from_cell(cell))) | {mm.STOP}
+    assert choice == stats[0][0]
+    assert {stat[0] for stat in stats} <= legal
+    visits = [stat[1] for stat in stats]
+    assert visits == sorted(visits, reverse=True) and sum(visits) > 0
+
+
+def test_hint_is_a_work_step():
+    cell = mm.JournaledCell()
+    mm.apply_import(cell, mm.PASSIVE_DIFFUSION)
+    steps = mm.action_steps(cell, mm.HintSearch(budget=0.01, seed=1))
+    next(steps)
+    text, kind, job = steps.send("hint")
+    assert kind == mm.WORK
+    text, kind, prompt = steps.send(job[0](*job[1:]))
+    assert kind == mm.ASK_ORGANELLE and "HINT:" in text
+
+
+def test_pooled_hints_match_the_cell():
+    cell = mm.CellState()
+    mm.apply_import(cell, mm.PASSIVE_DIFFUSION)
+    function, *args = mm._PooledHints().job(cell, 2)
+    assert function is mm._pooled_best_action
+    assert args == [mm.pack_cell(cell), 2]
+
+
+def test_hints_do_not_hold_up_other_sessions(capsys, monkeypatch):
+    monkeypatch.setattr(mm, 'HINT_BUDGET', 1.0)
+
+    async def client(port):
+        (reader1, writer1), (reader2, writer2) = await connect(port), await connect(port)
+        for reader, writer in ((reader1, writer1), (reader2, writer2)):
+            await reader.readuntil(TRANSPORT_PROMPT)
+            writer.write(b"B\n")
+            await reader.readuntil(ORGANELLE_PROMPT)
+        writer1.write(b"hint\n")
+        await asyncio.sleep(0.1)
+        start = time.perf_counter()
+        writer2.write(b"status\n")
+        await reader2.readuntil(ORGANELLE_PROMPT)
+        answered = time.perf_counter() - start
+        hint = await reader1.readuntil(ORGANELLE_PROMPT)
+        for writer in (writer1, writer2):
+            writer.close()
+        return answered, hint
+
+    answered, hint = run_with_server(client, pause=False)
+    assert answered < 0.5
+    assert b"HINT:" in hint
@@ -0,0 +1,35 @@
+import micromanager as mm
+
+
+def test_journal_undo_restores_every_field():
+    cell = mm.JournaledCell()
+    before = mm.pack_cell(cell), dict(cell.stats), cell.effects.pending()
+    mark = cell.mark()
+    mm.apply_import(cell, mm.ACTIVE_TRANSPORT)
+    mm.apply_event(cell, mm.EVENTS[9])  # SEVERE STARVATION: queues delayed cuts
+    mm.apply_action(cell, mm.MITOCHONDRIA)
+    assert cell.changes(mark)
+    cell.undo(mark)
+    assert (mm.pack_cell(cell), dict(cell.stats), cell.effects.pending()) == before
+    assert cell.changes(mark) == {}
+
+
+def test_journal_undo_removes_new_keys():
+    cell = mm.JournaledCell()
+    mark = cell.mark()
+    cell.note = "added after the mark"
+    cell.stats['new_stat'] = 1
+    assert cell.changes(mark)['note'] == (None, "added after the mark")
+    cell.undo(mark)
+    assert not hasattr(cell, 'note')
+    assert 'new_stat' not in cell.stats
+
+
+def test_undo_to_an_inner_mark_keeps_earlier_changes():
+    cell = mm.JournaledCell()
+    mm.apply_import(cell, mm.PASSIVE_DIFFUSION)
+    imported = mm.pack_cell(cell)
+    mark = cell.mark()
+    mm.apply_action(cell, mm.MITOCHONDRIA)
+    cell.undo(mark)
+    assert mm.pack_cell(cell) == imported
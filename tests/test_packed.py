@@ -0,0 +1,48 @@
+import random
+
+import micromanager as mm
+
+
+def random_cell(rng):
+    cell = mm.CellState()
+    for name in mm.PACKED_FIELDS:
+        setattr(cell, name, rng.randint(0, mm.RULES.max_value))
+    for name in mm.PACKED_FLAGS:
+        setattr(cell, name, rng.random() < 0.5)
+    cell.atp_crisis_turns = rng.randint(0, mm.RULES.crisis_turns - 1)
+    cell.turn = rng.randint(1, mm.RULES.turns + 1)
+    cell.effects.load([rng.randint(0, 3) for _ in mm.DELAYED_SLOTS])
+    return cell
+
+
+def test_pack_cell_round_trip():
+    rng = random.Random(0)
+    for _ in range(200):
+        cell = random_cell(rng)
+        bits = mm.pack_cell(cell)
+        again = mm.unpack_cell(bits)
+        assert mm.pack_cell(again) == bits
+        assert again.effects.pending() == cell.effects.pending()
+        for name in mm.PACKED_FIELDS + mm.PACKED_FLAGS + ('atp_crisis_turns', 'turn'):
+            assert getattr(again, name) == getattr(cell, name), name
+
+
+def test_packed_view_reads_and_replaces_fields():
+    cell = random_cell(random.Random(1))
+    view = mm.PackedCell.from_cell(cell)
+    for name in mm.PACKED_FIELDS + mm.PACKED_FLAGS + ('atp_crisis_turns', 'turn'):
+        assert getattr(view, name) == getattr(cell, name), name
+    changed = view.replace(atp=0, has_defender=not cell.has_defender)
+    assert (changed.atp, changed.has_defender, changed.glucose) == (0, not cell.has_defender, cell.glucose)
+    assert view == mm.PackedCell.from_cell(cell) and hash(view) == hash(mm.PackedCell(view.bits))
+
+
+def test_action_mask_matches_can_act():
+    rng = random.Random(2)
+    for _ in range(500):
+        cell = random_cell(rng)
+        view = mm.PackedCell.from_cell(cell)
+        for action in mm.ORGANELLE_ACTIONS:
+            assert view.can_act(action) == mm.can_act(cell, action), action
+        assert set(mm.legal_choices(view)) == {choice for choice in mm.ORGANELLE_CHOICES
+                                               if mm.can_act(cell, choice[0])}
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+import micromanager as mm
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(args, **env):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env={**os.environ, **env},
+                          capture_output=True, text=True, check=True).stdout
+
+
+def test_profiler_ring_buffer_flushes_when_full(tmp_path):
+    path = tmp_path / 'profile.jsonl'
+    profiler = mm.Profiler(str(path), size=4)
+    for i in range(6):
+        profiler.record({'i': i})
+    assert [record['i'] for record in profiler.recent()] == [2, 3, 4, 5]
+    assert [json.loads(line)['i'] for line in path.read_text().splitlines()] == [0, 1, 2, 3]
+    profiler.flush()
+    assert [json.loads(line)['i'] for line in path.read_text().splitlines()] == list(range(6))
+
+
+def test_import_does_not_turn_profiling_on(tmp_path):
+    path = tmp_path / 'profile.jsonl'
+    out = run(['-c', "import micromanager as mm; print(mm.PROFILER, mm.play_turn.__name__)"],
+              MICROMANAGER_PROFILE=str(path))
+    assert out.split() == ['None', 'play_turn']
+    assert not path.exists()
+
+
+def test_simulate_profiles_its_workers(tmp_path):
+    path = tmp_path / 'profile.jsonl'
+    run(['micromanager.py', 'simulate', 'random', '-n', '300', '-w', '2', '--no-results',
+         '--profile', str(path)])
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    games = [entry for entry in entries if entry['name'] == 'play_turn']
+    assert games and all(entry['pid'] != os.getpid() for entry in games)
+    assert sum(entry['turn'] == 1 for entry in games) == 300  # Every game once, none twice
+    assert 'play_turn' in run(['micromanager.py', 'profile', str(path)])
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+import micromanager as mm
+
+
+def record_game(seed, game=0):
+    recorder = mm.ReplayRecorder(seed)
+    cell, won, reason = mm.play_game(mm.RandomPolicy(), random.Random(seed), recorder,
+                                     mm.EventStream(seed, game))
+    return recorder, cell, won, reason
+
+
+def test_replay_round_trip():
+    for seed in range(20):
+        recorder, cell, won, reason = record_game(seed)
+        replay = mm.Replay(bytes(recorder.data))
+        assert (replay.seed, replay.won, replay.turns) == (seed, won, min(cell.turn, mm.RULES.turns))
+        replayed, replay_won, replay_reason = replay.play()
+        assert (mm.pack_cell(replayed), replayed.stats) == (mm.pack_cell(cell), cell.stats)
+        assert (replay_won, replay_reason) == (won, reason)
+
+
+def test_replay_starts_from_any_keyframe(tmp_path):
+    recorder, cell, _, _ = record_game(3)
+    path = tmp_path / 'game.mmr'
+    recorder.save(path)
+    replay = mm.Replay.load(path)
+    for turn in range(1, replay.turns + 1):
+        assert mm.pack_cell(replay.play(turn)[0]) == mm.pack_cell(cell)
+    with pytest.raises(IndexError):
+        replay.state_at(replay.turns + 1)
+
+
+def test_seeded_games_repeat():
+    assert mm.pack_cell(record_game(7, 2)[1]) == mm.pack_cell(record_game(7, 2)[1])
+
+
+def test_other_files_are_rejected():
+    with pytest.raises(ValueError):
+        mm.Replay(b'not a replay log at all')
@@ -0,0 +1,75 @@
+import random
+import sqlite3
+import threading
+
+import micromanager as mm
+from test_server import connect, run_with_server
+
+
+def finished_games(n, policy=mm.GreedyPolicy):
+    for game in range(n):
+        cell, won, _ = mm.play_game(policy(), random.Random(game), events=mm.EventStream(0, game))
+        yield cell, won, game
+
+
+def test_games_are_written_in_batches(tmp_path):
+    path = str(tmp_path / 'results.db')
+    with mm.ResultsStore(path, batch=3) as store:
+        for cell, won, game in finished_games(4):
+            store.add(cell, won, 'simulate', 'greedy', 0, game)
+        assert len(store.rows) == 1
+        with sqlite3.connect(path) as db:
+            assert db.execute("SELECT COUNT(*) FROM games").fetchone()[0] == 3
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT COUNT(*) FROM games").fetchone()[0] == 4
+
+
+def test_queries_sum_every_flush(tmp_path):
+    path = str(tmp_path / 'results.db')
+    games = list(finished_games(10))
+    for start in (0, 5):
+        with mm.ResultsStore(path) as store:
+            for cell, won, game in games[start:start + 5]:
+                store.add(cell, won, 'simulate', 'greedy', 0, game)
+    with mm.ResultsStore(path) as store:
+        [(policy, digest, count, wins, turns)] = store.win_rates()
+        assert (policy, digest, count) == ('greedy', mm.rules_hash(mm.RULES), 10)
+        assert wins == sum(won for _, won, _ in games)
+        assert turns == sum(cell.turn - 1 for cell, _, _ in games) / 10
+        top = store.top_runs(3, policy='greedy')
+    best = sorted((cell.turn - 1 for cell, _, _ in games), reverse=True)[:3]
+    assert [run['turns_survived'] for run in top] == best
+    run = top[0]
+    cell = games[run['game']][0]
+    assert mm.unpack_cell(int.from_bytes(run['final_state'], 'little')).turn == cell.turn
+
+
+def test_a_store_can_be_handed_to_another_thread(tmp_path):
+    store = mm.ResultsStore(str(tmp_path / 'results.db'))
+    (cell, won, game), = finished_games(1)
+    thread = threading.Thread(target=mm._save_game, args=(store, cell, won, game))
+    thread.start()
+    thread.join()
+    assert store.win_rates()[0][2] == 1
+    store.close()
+
+
+def test_served_games_are_saved(tmp_path, capsys):
+    store = mm.ResultsStore(str(tmp_path / 'results.db'))
+
+    async def client(port):
+        reader, writer = await connect(port)
+        text = b""
+        while not text.endswith(b"Play again? (y/n): "):
+            text += await reader.readuntil(b": ")
+            if text.endswith(b"Choose (A/B): "):
+                writer.write(b"B\n")
+            elif text.endswith(b"Choose organelle (1-7): "):
+                writer.write(b"7\n")
+        writer.write(b"n\n")
+        await reader.read()
+
+    run_with_server(client, pause=False, results=store)
+    [run] = store.top_runs()
+    store.close()
+    assert (run['source'], run['policy']) == ('serve', 'human')
@@ -0,0 +1,93 @@
+import asyncio
+import socket
+
+import pytest
+
+import micromanager as mm
+
+TRANSPORT_PROMPT = b"Choose (A/B): "
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def run_with_server(client, **options):
+    """Run the coroutine client(port) against a serve() on a free port"""
+    async def main():
+        port = free_port()
+        ready = asyncio.Event()
+        server = asyncio.create_task(mm.serve('127.0.0.1', port, ready=ready, **options))
+        await ready.wait()
+        try:
+            return await asyncio.wait_for(client(port), 30)
+        finally:
+            server.cancel()
+            try:
+                await server
+            except asyncio.CancelledError:
+                pass
+    return asyncio.run(main())
+
+
+async def connect(port):
+    return await asyncio.open_connection('127.0.0.1', port)
+
+
+def test_sessions_play_their_own_games(capsys):
+    async def client(port):
+        (reader1, writer1), (reader2, writer2) = await connect(port), await connect(port)
+        for reader in (reader1, reader2):
+            await reader.readuntil(TRANSPORT_PROMPT)
+        writer1.write(b"X\n")
+        writer2.write(b"B\n")
+        wrong = await reader1.readuntil(TRANSPORT_PROMPT)
+        played = await reader2.readuntil(b"Choose organelle (1-7): ")
+        for writer in (writer1, writer2):
+            writer.close()
+        return wrong, played
+
+    wrong, played = run_with_server(client, pause=False)
+    assert b"Invalid choice! Please enter A or B" in wrong
+    assert b"PASSIVE DIFFUSION" in played.upper() and b"Invalid choice" not in played
+
+
+def test_server_turns_away_sessions_past_the_limit(capsys):
+    async def client(port):
+        reader1, writer1 = await connect(port)
+        await reader1.readuntil(TRANSPORT_PROMPT)
+        reader2, writer2 = await connect(port)
+        answer = await reader2.read()
+        writer1.close()
+        return answer
+
+    assert run_with_server(client, pause=False, max_sessions=1) == b"Server full - please try again later.\n"
+
+
+def test_silent_sessions_are_closed(capsys):
+    async def client(port):
+        reader, writer = await connect(port)
+        return await reader.read()
+
+    text = run_with_server(client, pause=False, idle_timeout=0.2)
+    assert text.endswith(b"No answer for a while - session closed.\n")
+
+
+def test_whole_game_over_the_socket(capsys):
+    async def client(port):
+        reader, writer = await connect(port)
+        text = b""
+        while b"Play again? (y/n): " not in text:
+            text += await reader.readuntil(b": ")
+            if text.endswith(TRANSPORT_PROMPT):
+                writer.write(b"B\n")
+            elif text.endswith(b"Choose organelle (1-7): "):
+                writer.write(b"7\n")
+        writer.write(b"n\n")
+        return text + await reader.read()
+
+    text = run_with_server(client, pause=False)
+    assert b"Game seed: " in text
+    assert text.endswith(mm._GOODBYE.encode())
@@ -0,0 +1,86 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import batch
+import micromanager as mm
+import solver
+
+
+def test_encode_decode_round_trip():
+    cells = batch.CellBatch(6)
+    cells.turn = 4
+    cells.atp[:] = range(6)
+    cells.waste[:] = [5, 4, 3, 2, 1, 0]
+    cells.flags[:] = [0, batch.DEFENDER, batch.ENZYME, batch.GOLGI, 7, 0]
+    cells.atp_crisis_turns[:] = [1, 0, 0, 0, 0, 1]
+    cells.cuts[:] = [[min(i, limit) for limit in solver.CUT_LIMITS] for i in range(6)]
+    decoded = solver.decode(solver.encode(cells), cells.turn)
+    for name in batch.RESOURCES + ('flags', 'atp_crisis_turns', 'cuts'):
+        assert (getattr(decoded, name) == getattr(cells, name)).all(), name
+
+
+def test_cuts_that_cannot_play_share_a_state():
+    cell = mm.CellState()
+    cell.turn = 3
+    bigger = mm.unpack_cell(mm.pack_cell(cell))
+    bigger.effects.load([5] * len(mm.DELAYED_SLOTS))
+    capped = mm.unpack_cell(mm.pack_cell(cell))
+    capped.effects.load(solver.CUT_LIMITS.tolist())
+    assert solver.state_index(bigger) == solver.state_index(capped)
+
+    # On the last turn, after its import, no import cut can play any more
+    for one in (bigger, capped, cell):
+        one.turn = mm.RULES.turns
+    pending = [0 if trigger == mm.ON_IMPORT else limit
+               for (trigger, _, _), limit in zip(mm.DELAYED_SLOTS, solver.CUT_LIMITS.tolist())]
+    cell.effects.load(pending)
+    assert solver.state_index(capped) == solver.state_index(cell)
+    assert solver.state_index(capped, imported=False) != solver.state_index(cell, imported=False)
+
+
+def _best_finish(bits, left):
+    """Win chance of a cell after its last turn's events, playing the best actions"""
+    cell = mm.unpack_cell(bits)
+    mm.apply_maintenance(cell)
+    best = 0.0 if cell.check_lose_conditions()[0] else 1.0
+    if left:
+        for choice in mm.legal_choices(mm.PackedCell(bits)):
+            cell = mm.unpack_cell(bits)
+            mm.apply_action(cell, *choice)
+            best = max(best, _best_finish(mm.pack_cell(cell), left - 1))
+    return best
+
+
+def _last_turn_win_chance(start):
+    """Brute-force expectimax over the last turn on the engine itself"""
+    best = 0.0
+    for mode in (mm.ACTIVE_TRANSPORT, mm.PASSIVE_DIFFUSION):
+        imported = mm.unpack_cell(mm.pack_cell(start))
+        mm.apply_import(imported, mode)
+        total = 0.0
+        for p, events in mm.event_distribution(mm.RULES.turns):
+            cell = mm.unpack_cell(mm.pack_cell(imported))
+            for event in events:
+                mm.apply_event(cell, event)
+            if not cell.check_lose_conditions()[0]:
+                total += p * _best_finish(mm.pack_cell(cell), mm.RULES.actions_per_turn)
+        best = max(best, total)
+    return best
+
+
+@pytest.fixture(scope='module')
+def solution():
+    return solver.solve()  # About a minute the first time, then read from .solver_cache
+
+
+def test_new_game_survival(solution):
+    assert solution.survival_probability(mm.CellState()) == pytest.approx(0.002168, abs=5e-7)
+
+
+def test_last_turn_matches_brute_force(solution):
+    turn = mm.RULES.turns
+    states = solution.states[turn]
+    for pos in np.linspace(0, len(states) - 1, 40).astype(int):
+        cell = solver.decode(states[pos:pos + 1], turn).to_cell(0)
+        assert solution.survival_probability(cell) == pytest.approx(_last_turn_win_chance(cell)), cell
@@ -0,0 +1,40 @@
+import pytest
+
+import micromanager as mm
+import sweep
+
+
+def test_parse_axis_lists_and_ranges():
+    assert sweep.parse_axis('mito_atp=1,3') == ('mito_atp', (1, 3))
+    assert sweep.parse_axis('membrane_decay=0:2') == ('membrane_decay', (0, 1, 2))
+    with pytest.raises(ValueError, match="Unknown rule"):
+        sweep.parse_axis('mito_atpp=1')
+
+
+def test_grid_varies_every_combination():
+    points = list(sweep.grid([('mito_atp', (1, 2)), ('turns', (5, 6, 7))]))
+    assert len(points) == 6
+    assert points[1] == mm.DEFAULT_RULES._replace(mito_atp=1, turns=6)
+    assert {(rules.mito_atp, rules.turns) for rules in points} == {(a, t) for a in (1, 2) for t in (5, 6, 7)}
+
+
+def test_check_rules_names_every_limit():
+    with pytest.raises(ValueError, match="actions_per_turn at least 0"):
+        mm.check_rules(mm.DEFAULT_RULES._replace(actions_per_turn=-1))
+    with pytest.raises(ValueError, match="max_value, turns and crisis_turns must be at least 1"):
+        mm.check_rules(mm.DEFAULT_RULES._replace(turns=0))
+
+
+def test_sweep_caches_points(tmp_path):
+    axes = [('mito_atp', (2, 3))]
+    cache = str(tmp_path / 'cache.json')
+    results, simulated = sweep.sweep(axes, ('greedy',), games=200, workers=1, cache_path=cache)
+    assert simulated == 2
+    assert [rules.mito_atp for rules, _ in results] == [2, 3]
+    expected = mm.simulate(('greedy',), 200, workers=1, rules=results[1][0])['greedy']['win_rate']
+    assert results[1][1]['greedy']['win_rate'] == expected
+
+    wider, simulated = sweep.sweep([('mito_atp', (2, 3, 4))], ('greedy',), games=200, workers=1,
+                                   cache_path=cache)
+    assert simulated == 1
+    assert wider[:2] == results
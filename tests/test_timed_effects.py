@@ -0,0 +1,49 @@
+import micromanager as mm
+import solver
+
+
+def test_timed_effects_take_cuts_when_due():
+    effects = mm.TimedEffects()
+    effects.schedule(mm.Delayed(mm.ON_IMPORT, 'glucose', 2, 2))
+    effects.schedule(mm.Delayed(mm.ON_IMPORT, 'amino_acids', 1, 1))
+    assert effects.queued == 3
+    assert effects.take(mm.ON_MITOCHONDRIA) == {}
+    assert effects.take(mm.ON_IMPORT) == {'glucose': 2, 'amino_acids': 1}
+    assert effects.take(mm.ON_IMPORT) == {'glucose': 2}
+    assert effects.take(mm.ON_IMPORT) == {}
+    assert effects.queued == 0
+
+
+def test_timed_effects_pending_and_load_round_trip():
+    effects = mm.TimedEffects()
+    effects.schedule(mm.Delayed(mm.ON_IMPORT, 'glucose', 2, 2))
+    effects.take(mm.ON_IMPORT)
+    effects.schedule(mm.Delayed(mm.ON_MITOCHONDRIA, 'atp', 1, 1))
+    pending = effects.pending()
+    assert pending[mm.DELAYED_SLOTS.index((mm.ON_IMPORT, 'glucose', 0))] == 2
+    assert pending[mm.DELAYED_SLOTS.index((mm.ON_IMPORT, 'glucose', 1))] == 0
+    loaded = mm.TimedEffects()
+    loaded.load(pending)
+    assert loaded.pending() == pending
+    assert loaded.take(mm.ON_IMPORT) == effects.take(mm.ON_IMPORT)
+
+
+def test_starvation_cuts_the_next_two_imports():
+    starved, fed = mm.CellState(), mm.CellState()
+    mm.apply_event(starved, mm.EVENTS[9])
+    cuts = [mm.apply_import(starved, mm.PASSIVE_DIFFUSION)[4] for _ in range(3)]
+    for _ in range(3):
+        mm.apply_import(fed, mm.PASSIVE_DIFFUSION)
+    assert cuts == [{'glucose': 2, 'amino_acids': 1}] * 2 + [{}]
+    assert starved.effects.queued == 0
+    assert starved.glucose < fed.glucose and starved.amino_acids < fed.amino_acids
+
+
+def test_cuts_past_one_use_index_alike():
+    limit = int(solver.CUT_LIMITS[mm.DELAYED_SLOTS.index((mm.ON_IMPORT, 'glucose', 0))])
+    cells = []
+    for cut in (limit, limit + 2):
+        cell = mm.CellState()
+        cell.effects.schedule(mm.Delayed(mm.ON_IMPORT, 'glucose', cut, 1))
+        cells.append(cell)
+    assert solver.state_index(cells[0]) == solver.state_index(cells[1])
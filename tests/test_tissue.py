@@ -0,0 +1,52 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import batch
+import tissue
+
+
+class IdlePolicy:
+    """Passive diffusion and no actions, so only the events change the cells"""
+
+    def transport(self, cells, rng):
+        return np.zeros(cells.n, dtype=bool)
+
+    def action(self, cells, rng):
+        return np.zeros(cells.n, dtype=np.int8), np.zeros(cells.n, dtype=np.int8)
+
+
+def within(distance, size=9):
+    """Sites at most distance steps from the middle of a size x size grid"""
+    rows, cols = np.indices((size, size))
+    return abs(rows - size // 2) + abs(cols - size // 2) <= distance
+
+
+def test_infection_spreads_to_neighbors_each_turn():
+    t = tissue.Tissue(9, 9, seed=0, vessel_density=0, spread=1.0, infected=0)
+    t.infection[4, 4] = tissue.INFECTIOUS_TURNS
+    t.cells.membrane[:] = 5  # Nothing repairs it, and membrane wear is a gentle event
+    for turn in (1, 2):
+        t.play_turn(IdlePolicy())
+        assert ((t.infection > 0) == within(turn)).all()
+    assert t.grid('alive').all()
+
+
+def test_defenders_stop_the_spread():
+    t = tissue.Tissue(9, 9, seed=0, vessel_density=0, spread=1.0, infected=0)
+    t.infection[4, 4] = tissue.INFECTIOUS_TURNS
+    t.cells.flags |= batch.DEFENDER
+    t.play_turn(IdlePolicy())
+    assert (t.infection > 0).sum() == 1
+    # The four neighbors each used up their defender blocking it
+    assert not (t.grid('flags')[within(1) & ~within(0)] & batch.DEFENDER).any()
+
+
+def test_diffuse_conserves_each_pool():
+    before = np.random.default_rng(0).random((2, 7, 11)).astype(np.float32) * 10
+    pools, alone = before.copy(), before[1].copy()
+    tissue.diffuse(pools)
+    tissue.diffuse(alone)
+    assert np.allclose(pools.sum(axis=(1, 2)), before.sum(axis=(1, 2)), rtol=1e-5)
+    assert (pools.std(axis=(1, 2)) < before.std(axis=(1, 2))).all()
+    assert np.array_equal(pools[1], alone)
@@ -0,0 +1,343 @@
+"""
+MicroManager - Tissue Mode
+A grid of cells living off a shared extracellular environment.
+
+Every site of a rows x cols grid holds one cell (a row of a CellBatch,
+so any of them can be copied out as a CellState) and a patch of
+extracellular fluid with its own glucose and amino acid pools. Each turn:
+
+1. Blood vessels (a few random sites) top their patch back up, and the
+   pools diffuse between neighboring sites.
+2. Cells import as usual, but only what their own patch holds: glucose
+   and amino acids taken in are removed from the pool, so crowded or
+   distant cells go hungry.
+3. Events are sampled per cell as in batch.py. On top of those, cells
+   next to an infected cell catch Pathogen Detected! with probability
+   PATHOGEN_SPREAD per infected neighbor, so infections spread as
+   fronts across the tissue. A few cells (INITIAL_INFECTED) start out
+   infected, so the fronts are already moving before the moderate
+   events bring pathogens of their own.
+4. Actions and maintenance run as in batch.py.
+
+Everything is a whole-grid array operation, mostly in buffers the
+Tissue keeps between turns, so a 1000 x 1000 tissue advances a turn in
+around half a second. census() reports population
+stats: survival fraction, infections, pools and waste hotspots.
+
+Cells play by the default rules, like batch.py. Requires NumPy.
+
+Example:
+    python tissue.py 1000 1000
+    python tissue.py 200 300 --seed 4 --hotspots 10
+    python tissue.py 500 500 --policy greedy --spread 0.5
+"""
+
+import argparse
+import time
+from functools import lru_cache
+
+import numpy as np
+
+import batch
+import micromanager as mm
+
+# Extracellular pools, in resource units per site
+START_GLUCOSE = 3.0
+START_AMINO_ACIDS = 2.0
+VESSEL_DENSITY = 0.02     # Share of sites next to a blood vessel
+VESSEL_GLUCOSE = 12.0     # Level a vessel tops its patch up to every turn
+VESSEL_AMINO_ACIDS = 6.0
+VESSEL_LEVELS = np.array([VESSEL_GLUCOSE, VESSEL_AMINO_ACIDS], dtype=np.float32)[:, None, None]
+DIFFUSION = 0.2           # Share of the difference exchanged with each neighbor per step
+DIFFUSION_STEPS = 4       # Diffusion steps per turn
+
+# Infection
+PATHOGEN = 7              # Pathogen Detected! (mm.EVENTS[7])
+INFECTIOUS = (7, 11)      # Events that leave a cell infected: Pathogen Detected!, VIRAL ATTACK!
+INFECTIOUS_TURNS = 2      # Turns an infected cell can pass it on
+PATHOGEN_SPREAD = 0.35    # Chance per infected neighbor and turn
+INITIAL_INFECTED = 0.002  # Share of cells infected when the tissue is made
+
+# INFECTING[event + 1]: the event (or NO_EVENT) leaves the cell infected
+INFECTING = np.isin(np.arange(-1, len(mm.EVENTS)), INFECTIOUS)
+
+HOTSPOT_TILE = 25         # Side of the square tiles hotspots are reported for
+
+# ============================================================================
+# DIFFUSION
+# ============================================================================
+
+def diffuse(pool, rate=DIFFUSION, steps=DIFFUSION_STEPS, work=None):
+    """
+    Spread pools between 4-neighbors in place. pool is a rows x cols grid
+    or a stack of them (..., rows, cols), each diffused on its own. Every
+    step moves rate times the difference across each edge, along both
+    axes at once; the grid border is closed, so totals are conserved.
+    work is an optional array of two buffers shaped like pool to compute
+    in, so repeated calls allocate nothing.
+    """
+    if not 0 <= rate <= 0.25:
+        raise ValueError(f"Diffusion rate must be between 0 and 0.25, got {rate}")
+    if work is None:
+        work = np.empty((2,) + pool.shape, dtype=pool.dtype)
+    keep = _kept_share(pool.shape[-2:], rate, pool.dtype)
+    src, dst, moved = pool, work[0], work[1]
+    for _ in range(steps):
+        # dst = what each site keeps + rate * each of its neighbors
+        np.multiply(src, keep, out=dst)
+        np.multiply(src, rate, out=moved)
+        dst[..., 1:, :] += moved[..., :-1, :]
+        dst[..., :-1, :] += moved[..., 1:, :]
+        dst[..., :, 1:] += moved[..., :, :-1]
+        dst[..., :, :-1] += moved[..., :, 1:]
+        src, dst = dst, src
+    if src is not pool:
+        pool[...] = src
+
+@lru_cache(maxsize=8)
+def _kept_share(shape, rate, dtype):
+    """Share of its pool a site keeps per diffusion step: 1 - rate per neighbor"""
+    keep = np.full(shape, 1 - 4 * rate, dtype=dtype)
+    keep[[0, -1], :] += rate
+    keep[:, [0, -1]] += rate
+    return keep
+
+def neighbor_count(grid, out=None):
+    """Number of 4-neighbors of each site where the bool grid is True (into out if given)"""
+    count = np.zeros(grid.shape, dtype=np.int8) if out is None else out
+    count[...] = 0
+    count[1:] += grid[:-1]
+    count[:-1] += grid[1:]
+    count[:, 1:] += grid[:, :-1]
+    count[:, :-1] += grid[:, 1:]
+    return count
+
+# ============================================================================
+# TISSUE
+# ============================================================================
+
+class Tissue:
+    """
+    rows x cols cells (a CellBatch, site (r, c) at index r * cols + c)
+    and their extracellular environment:
+
+      pools                      float32 (2, rows, cols): units available
+                                 per site, glucose_pool and amino_pool
+      vessels                    bool grid of sites a blood vessel feeds
+      infection                  int8 grid, turns left being infectious
+    """
+
+    def __init__(self, rows, cols, seed=None, vessel_density=VESSEL_DENSITY,
+                 spread=PATHOGEN_SPREAD, infected=INITIAL_INFECTED):
+        self.rows, self.cols = rows, cols
+        self.rng = np.random.default_rng(seed)
+        self.cells = batch.CellBatch(rows * cols)
+        self.pools = np.empty((2, rows, cols), dtype=np.float32)
+        self.glucose_pool, self.amino_pool = self.pools
+        self.glucose_pool[...] = START_GLUCOSE
+        self.amino_pool[...] = START_AMINO_ACIDS
+        self.vessels = self.rng.random((rows, cols)) < vessel_density
+        self.infection = np.zeros((rows, cols), dtype=np.int8)
+        self.infection[self.rng.random((rows, cols)) < infected] = INFECTIOUS_TURNS
+        # Chance to catch the pathogen with 0-4 infected neighbors
+        self.catch_chance = (1 - (1 - spread) ** np.arange(5)).astype(np.float32)
+
+        # Scratch space reused every turn
+        self._diffusion = np.empty((2,) + self.pools.shape, dtype=np.float32)
+        self._imported = np.empty((2, rows * cols), dtype=np.int8)
+        self._taken = np.empty(rows * cols, dtype=np.float32)
+        self._neighbors = np.empty((rows, cols), dtype=np.int8)
+
+    @property
+    def turn(self):
+        return self.cells.turn
+
+    def grid(self, name):
+        """A CellBatch array (e.g. 'waste', 'alive') as a rows x cols view"""
+        return getattr(self.cells, name).reshape(self.rows, self.cols)
+
+    def cell(self, row, col):
+        """The cell at a site, as a CellState"""
+        return self.cells.to_cell(row * self.cols + col)
+
+    # ------------------------------------------------------------------------
+    # Turn phases
+    # ------------------------------------------------------------------------
+
+    def supply(self):
+        """Vessels top up their patches, then the pools diffuse (both at once)"""
+        np.maximum(self.pools, VESSEL_LEVELS, out=self.pools, where=self.vessels)
+        diffuse(self.pools, work=self._diffusion)
+
+    def apply_import(self, active):
+        """CellBatch.apply_import, limited to the whole units each site's pool holds"""
+        cells = self.cells
+        wanted, taken = self._imported, self._taken
+        wanted[0] = cells.glucose
+        wanted[1] = cells.amino_acids
+        cells.apply_import(active)
+        for inside, gained, pool in zip((cells.glucose, cells.amino_acids), wanted, self.pools):
+            pool = pool.reshape(-1)
+            np.subtract(inside, gained, out=gained)
+            np.floor(pool, out=taken)
+            np.minimum(taken, gained, out=taken)
+            pool -= taken
+            # Give back what the pool could not supply
+            np.subtract(gained, taken, out=gained, casting='unsafe')
+            inside -= gained
+
+    def apply_events(self):
+        """
+        Sampled events, then the pathogen spreading from infected neighbors.
+        Returns the (n, 2) event ids, with the pathogen in the second slot
+        where it was free
+        """
+        cells = self.cells
+        alive = self.grid('alive')
+        infectious = (self.infection > 0) & alive
+        chance = self.catch_chance[neighbor_count(infectious, out=self._neighbors)]
+        exposed = self.rng.random((self.rows, self.cols), dtype=np.float32) < chance
+        exposed &= alive
+        exposed = exposed.reshape(-1)
+
+        events = batch.sample_events(cells.turn, cells.n, self.rng)
+        events[~cells.alive] = batch.NO_EVENT
+        # The pathogen comes after the sampled events: in the free second
+        # slot if there is one, else in a pass of its own
+        passes = [events[:, 0], events[:, 1]]
+        free = passes[1] == batch.NO_EVENT
+        passes[1][exposed & free] = PATHOGEN
+        crowded = exposed & ~free
+        if crowded.any():
+            passes.append(np.where(crowded, PATHOGEN, batch.NO_EVENT).astype(events.dtype))
+        caught = np.zeros(cells.n, dtype=bool)
+        for event in passes:
+            defended = cells._flag(batch.DEFENDER)
+            cells.apply_event(event)
+            caught |= INFECTING[event + 1] & ~defended
+
+        np.subtract(self.infection, 1, out=self.infection, where=self.infection > 0)
+        self.infection[caught.reshape(self.rows, self.cols)] = INFECTIOUS_TURNS
+        return events
+
+    def play_turn(self, policy):
+        """One turn for the whole tissue, in the same order as CellBatch.play_turn"""
+        cells = self.cells
+        self.supply()
+        self.apply_import(policy.transport(cells, self.rng))
+        self.apply_events()
+        cells.check_lose_conditions()
+        for _ in range(mm.ACTIONS_PER_TURN):
+            actions, subchoices = policy.action(cells, self.rng)
+            cells.apply_actions(actions, subchoices)
+        cells.apply_maintenance()
+        cells.check_lose_conditions()
+        self.infection *= self.grid('alive')
+        cells.turns_survived[cells.alive] = cells.turn
+        cells.turn += 1
+
+    def over(self):
+        return self.cells.turn > mm.DEFAULT_RULES.turns or not self.cells.alive.any()
+
+    def run(self, policy=None, on_turn=None):
+        """Play until the last turn or until every cell has died"""
+        policy = policy or batch.RandomBatchPolicy()
+        while not self.over():
+            self.play_turn(policy)
+            if on_turn is not None:
+                on_turn(self)
+        return self
+
+    # ------------------------------------------------------------------------
+    # Population stats
+    # ------------------------------------------------------------------------
+
+    def hotspots(self, count=5, tile=HOTSPOT_TILE):
+        """
+        The count tiles (tile x tile sites) with the highest mean waste
+        among their living cells, as (row, col, mean waste, living cells)
+        with row and col the tile's top-left site.
+        """
+        alive = self.grid('alive')
+        starts = np.arange(0, self.rows, tile), np.arange(0, self.cols, tile)
+        def tile_sums(grid):
+            return np.add.reduceat(np.add.reduceat(grid, starts[0], axis=0), starts[1], axis=1)
+        living = tile_sums(alive.astype(np.int32))
+        waste = tile_sums(np.where(alive, self.grid('waste'), 0).astype(np.int32))
+        mean = np.divide(waste, living, out=np.zeros(waste.shape), where=living > 0)
+        top = np.argsort(mean, axis=None)[::-1][:count]
+        return [(int(starts[0][i // mean.shape[1]]), int(starts[1][i % mean.shape[1]]),
+                 float(mean.flat[i]), int(living.flat[i]))
+                for i in top if living.flat[i]]
+
+    def census(self, hotspots=5):
+        """Population stats as a JSON-friendly dict"""
+        cells = self.cells
+        alive = cells.alive
+        living = int(alive.sum())
+        losses = np.bincount(cells.loss_reason, minlength=len(batch.LOSS_NAMES))
+        return {
+            'turn': cells.turn - 1,
+            'cells': cells.n,
+            'survival': living / cells.n,
+            'infected': int(((self.infection > 0) & self.grid('alive')).sum()) / cells.n,
+            'losses': {batch.LOSS_NAMES[i]: int(losses[i]) for i in range(1, len(batch.LOSS_NAMES))},
+            'mean': {name: float(getattr(cells, name)[alive].mean()) if living else 0.0
+                     for name in batch.RESOURCES},
+            'pool': {'glucose': float(self.glucose_pool.mean()),
+                     'amino_acids': float(self.amino_pool.mean())},
+            'hotspots': self.hotspots(hotspots),
+        }
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def print_census(census):
+    mean = census['mean']
+    print(f"Turn {census['turn']:2d}: {census['survival']:7.2%} alive, "
+          f"{census['infected']:6.2%} infected | "
+          f"pool glucose {census['pool']['glucose']:5.2f}, amino {census['pool']['amino_acids']:5.2f} | "
+          f"mean ATP {mean['atp']:.2f}, waste {mean['waste']:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate a MicroManager tissue")
+    parser.add_argument('rows', type=int, nargs='?', default=1000)
+    parser.add_argument('cols', type=int, nargs='?', default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--policy', default='random', choices=sorted(batch.POLICIES),
+                        help="how every cell plays (default random)")
+    parser.add_argument('--vessels', type=float, default=VESSEL_DENSITY,
+                        help=f"share of sites fed by a blood vessel (default {VESSEL_DENSITY})")
+    parser.add_argument('--spread', type=float, default=PATHOGEN_SPREAD,
+                        help=f"pathogen spread chance per infected neighbor (default {PATHOGEN_SPREAD})")
+    parser.add_argument('--infected', type=float, default=INITIAL_INFECTED,
+                        help=f"share of cells infected at the start (default {INITIAL_INFECTED})")
+    parser.add_argument('--hotspots', type=int, default=5, help="waste hotspots to list at the end")
+    args = parser.parse_args(argv)
+
+    tissue = Tissue(args.rows, args.cols, args.seed, args.vessels, args.spread, args.infected)
+    print(f"{args.rows} x {args.cols} tissue, {int(tissue.vessels.sum()):,} vessel sites")
+    start = time.perf_counter()
+    turns = 0
+
+    def report(tissue):
+        nonlocal turns
+        turns += 1
+        print_census(tissue.census(hotspots=0))
+
+    tissue.run(batch.POLICIES[args.policy](), on_turn=report)
+    elapsed = time.perf_counter() - start
+    census = tissue.census(args.hotspots)
+    print(f"\nLosses: {census['losses']}")
+    print(f"Waste hotspots ({HOTSPOT_TILE}x{HOTSPOT_TILE} tiles, living cells only):")
+    for row, col, waste, living in census['hotspots']:
+        print(f"  rows {row}-{row + HOTSPOT_TILE - 1}, cols {col}-{col + HOTSPOT_TILE - 1}: "
+              f"mean waste {waste:.2f} ({living} cells)")
+    print(f"\n{turns} turns in {elapsed:.2f}s ({elapsed / max(turns, 1):.3f}s per turn, "
+          f"stats included)")
+
+
+if __name__ == "__main__":
+    main()